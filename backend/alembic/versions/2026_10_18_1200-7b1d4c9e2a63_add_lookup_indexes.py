@@ -0,0 +1,36 @@
+"""add_lookup_indexes
+
+Revision ID: 7b1d4c9e2a63
+Revises: ca20728c080d
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1d4c9e2a63'
+down_revision: Union[str, None] = 'ca20728c080d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Messages of a conversation in order (pages, summaries, history)
+    op.create_index("ix_messages_conversation_id_created_at", "messages", ["conversation_id", "created_at"])
+    # Results of messages, by type
+    op.create_index("ix_results_message_id_type", "results", ["message_id", "type"])
+    # Charts linked to a query (get_chart_from_sql_query)
+    op.create_index("ix_results_linked_id_type", "results", ["linked_id", "type"])
+    # Conversation summaries, newest first
+    op.create_index("ix_conversations_created_at_id", "conversations", ["created_at", "id"])
+    # connections.dsn is indexed by its unique constraint already
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversations_created_at_id", table_name="conversations")
+    op.drop_index("ix_results_linked_id_type", table_name="results")
+    op.drop_index("ix_results_message_id_type", table_name="results")
+    op.drop_index("ix_messages_conversation_id_created_at", table_name="messages")
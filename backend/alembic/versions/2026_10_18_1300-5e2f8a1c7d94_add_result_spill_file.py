@@ -0,0 +1,38 @@
+"""add_result_spill_file
+
+Revision ID: 5e2f8a1c7d94
+Revises: 7b1d4c9e2a63
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2f8a1c7d94'
+down_revision: Union[str, None] = '7b1d4c9e2a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("results", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("spill_file", sa.String(), nullable=True))
+        batch_op.create_index("ix_results_spill_file", ["spill_file"])
+
+    # Files of the results stored so far, contents of results written to files are never compressed
+    op.execute(
+        """
+        UPDATE results SET spill_file = json_extract(content, '$.spill.file')
+        WHERE type = 'SQL_QUERY_RUN_RESULT' AND typeof(content) = 'text' AND content LIKE '%"spill":{%'
+        """
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("results", schema=None) as batch_op:
+        batch_op.drop_index("ix_results_spill_file")
+        batch_op.drop_column("spill_file")
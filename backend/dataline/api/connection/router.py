@@ -179,3 +179,13 @@ async def refresh_connection_schema(
 
     updated_connection = await connection_service.refresh_connection_schema(session, connection_id)
     return SuccessResponse(data=updated_connection)
+
+
+@router.delete("/connection/{connection_id}/query-cache")
+async def invalidate_query_cache(
+    connection_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    connection_service: Annotated[ConnectionService, Depends(ConnectionService)],
+) -> SuccessResponse[None]:
+    await connection_service.invalidate_query_cache(session, connection_id)
+    return SuccessResponse()
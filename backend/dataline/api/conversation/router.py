@@ -2,11 +2,12 @@ import logging
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Body, Depends, BackgroundTasks
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, Query
 from fastapi.responses import StreamingResponse
 
 from dataline.models.conversation.schema import (
     ConversationOut,
+    ConversationSummaryPageOut,
     ConversationWithMessagesWithResultsOut,
     CreateConversationIn,
     UpdateConversationRequest,
@@ -18,7 +19,8 @@ from dataline.old_models import SuccessListResponse, SuccessResponse
 from dataline.repositories.base import AsyncSession, get_session
 from dataline.services.connection import ConnectionService
 from dataline.services.conversation import ConversationService
-from dataline.services.llm_flow.toolkit import execute_sql_query
+from dataline.services.llm_flow.query_executor import query_executor
+from dataline.services.llm_flow.toolkit import aexecute_sql_query
 from dataline.services.llm_flow.utils import DatalineSQLDatabase as SQLDatabase
 from dataline.utils.posthog import posthog_capture
 from dataline.utils.utils import generate_with_errors
@@ -49,16 +51,33 @@ async def conversations(
     )
 
 
+@router.get("/conversations/summary")
+async def conversation_summaries(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    conversation_service: Annotated[ConversationService, Depends()],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+) -> SuccessResponse[ConversationSummaryPageOut]:
+    page = await conversation_service.get_conversation_summaries(session, cursor=cursor, limit=limit)
+    return SuccessResponse(data=page)
+
+
 @router.get("/conversation/{conversation_id}/messages")
 async def get_conversation_messages(
     conversation_id: UUID,
     session: Annotated[AsyncSession, Depends(get_session)],
     conversation_service: Annotated[ConversationService, Depends()],
     background_tasks: BackgroundTasks,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    before: UUID | None = None,
 ) -> SuccessListResponse[MessageWithResultsOut]:
-    background_tasks.add_task(posthog_capture, "conversation_opened")
-    conversation = await conversation_service.get_conversation_with_messages(session, conversation_id=conversation_id)
-    messages = [MessageWithResultsOut.model_validate(message) for message in conversation.messages]
+    """
+    Messages of the conversation, oldest first. With `limit`, only the last `limit` messages, pass the id of the
+    first (oldest) of them as `before` for the messages before these.
+    """
+    if before is None:
+        background_tasks.add_task(posthog_capture, "conversation_opened")
+    messages = await conversation_service.get_messages_page(session, conversation_id, limit=limit, before=before)
     return SuccessListResponse(data=messages)
 
 
@@ -132,8 +151,9 @@ async def execute_sql(
     conversation_service: Annotated[ConversationService, Depends()],
     connection_service: Annotated[ConnectionService, Depends()],
     background_tasks: BackgroundTasks,
-    limit: int = 10,
+    limit: Annotated[int, Query(ge=1)] = 10,
     execute: bool = True,
+    use_cache: bool = False,
 ) -> SuccessResponse[ResultOut]:
     background_tasks.add_task(posthog_capture, "sql_executed", {"conversation_id": str(conversation_id)})
 
@@ -146,16 +166,11 @@ async def execute_sql(
     connection = await connection_service.get_connection(session, connection_id)
 
     # Refresh chart data
-    db = SQLDatabase.from_dataline_connection(connection)
-    query_run_data = execute_sql_query(db, sql)
+    db = await query_executor.arun(connection.dsn, SQLDatabase.from_dataline_connection, connection)
+    query_run_data = await aexecute_sql_query(db, sql, limit=limit, use_cache=use_cache)
 
     # Execute query
-    result = SQLQueryRunResult(
-        columns=query_run_data.columns,
-        rows=query_run_data.rows,
-        for_chart=False,
-        linked_id=linked_id,
-    )
+    result = SQLQueryRunResult.from_query_run_data(query_run_data, linked_id=linked_id)
 
     return SuccessResponse(data=result.serialize_result())
 
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+
+from dataline.models.metrics.schema import MetricsOut
+from dataline.old_models import SuccessResponse
+from dataline.services.llm_flow.engine_registry import engine_registry
+from dataline.services.llm_flow.export_stream import export_metrics
+from dataline.services.llm_flow.query_executor import export_executor, query_executor
+from dataline.services.llm_flow.result_cache import query_result_cache
+from dataline.services.llm_flow.single_flight import query_single_flight
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+async def get_metrics() -> SuccessResponse[MetricsOut]:
+    return SuccessResponse(
+        data=MetricsOut(
+            engines=engine_registry.stats(),
+            query_executor=query_executor.stats(),
+            export_executor=export_executor.stats(),
+            query_result_cache=query_result_cache.stats(),
+            query_coalescing=query_single_flight.stats(),
+            exports=export_metrics.stats(),
+        )
+    )
@@ -1,10 +1,11 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Body, Depends, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Body, Depends, BackgroundTasks, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse
 
-from dataline.models.result.schema import ChartRefreshOut
+from dataline.config import config
+from dataline.models.result.schema import ChartRefreshOut, ResultPageOut
 from dataline.old_models import SuccessResponse
 from dataline.repositories.base import AsyncSession, get_session
 from dataline.services.result import ResultService
@@ -36,21 +37,94 @@ async def refresh_chart_result_data(
     session: Annotated[AsyncSession, Depends(get_session)],
     result_service: Annotated[ResultService, Depends(ResultService)],
     background_tasks: BackgroundTasks,
+    use_cache: bool = False,
 ) -> SuccessResponse[ChartRefreshOut]:
     background_tasks.add_task(posthog_capture, "chart_refreshed")
-    chart_data = await result_service.refresh_chart_result_data(session, chart_id=result_id)
+    chart_data = await result_service.refresh_chart_result_data(session, chart_id=result_id, use_cache=use_cache)
     return SuccessResponse(data=chart_data)
 
 
+@router.get("/result/{result_id}/rows")
+async def get_result_rows(
+    result_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    result_service: Annotated[ResultService, Depends(ResultService)],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=config.query_result_max_rows)] = config.result_page_size,
+    sort_by: str | None = None,
+    descending: bool = False,
+    key: str | None = None,
+    filters: Annotated[list[str] | None, Query(alias="filter")] = None,
+    live: bool = False,
+) -> SuccessResponse[ResultPageOut]:
+    page = await result_service.get_result_page(
+        session,
+        result_id,
+        cursor=cursor,
+        limit=limit,
+        sort_by=sort_by,
+        descending=descending,
+        key=key,
+        filters=filters or [],
+        live=live,
+    )
+    return SuccessResponse(data=page)
+
+
 @router.get("/result/{result_id}/export-csv")
 async def export_results_csv(
     result_id: UUID,
     session: Annotated[AsyncSession, Depends(get_session)],
     result_service: Annotated[ResultService, Depends(ResultService)],
     background_tasks: BackgroundTasks,
+    accept_encoding: Annotated[str, Header()] = "",
 ) -> StreamingResponse:
     background_tasks.add_task(posthog_capture, "results_exported_csv")
+    # Compressed on the fly when the client accepts it, CSV usually shrinks several times
+    gzip = "gzip" in accept_encoding.lower()
+    try:
+        return await result_service.export_results_as_csv(session, result_id, gzip=gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.get("/result/{result_id}/export-xlsx")
+async def export_results_xlsx(
+    result_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    result_service: Annotated[ResultService, Depends(ResultService)],
+    background_tasks: BackgroundTasks,
+) -> StreamingResponse:
+    background_tasks.add_task(posthog_capture, "results_exported_xlsx")
+    try:
+        return await result_service.export_results_as_xlsx(session, result_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.get("/result/{result_id}/export-parquet")
+async def export_results_parquet(
+    result_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    result_service: Annotated[ResultService, Depends(ResultService)],
+    background_tasks: BackgroundTasks,
+) -> StreamingResponse:
+    background_tasks.add_task(posthog_capture, "results_exported_parquet")
+    try:
+        return await result_service.export_results_as_arrow(session, result_id, "parquet")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.get("/result/{result_id}/export-arrow")
+async def export_results_arrow(
+    result_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    result_service: Annotated[ResultService, Depends(ResultService)],
+    background_tasks: BackgroundTasks,
+) -> StreamingResponse:
+    background_tasks.add_task(posthog_capture, "results_exported_arrow")
     try:
-        return await result_service.export_results_as_csv(session, result_id)
+        return await result_service.export_results_as_arrow(session, result_id, "arrow")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
@@ -9,6 +9,7 @@ from fastapi.responses import JSONResponse
 from dataline.api.auth.router import router as auth_router
 from dataline.api.connection.router import router as connection_router
 from dataline.api.conversation.router import router as conversation_router
+from dataline.api.metrics.router import router as metrics_router
 from dataline.api.result.router import router as result_router
 from dataline.api.settings.router import router as settings_router
 from dataline.auth import authenticate
@@ -58,6 +59,7 @@ class App(fastapi.FastAPI):
         self.include_router(connection_router, dependencies=common_dependencies)
         self.include_router(conversation_router, dependencies=common_dependencies)
         self.include_router(result_router, dependencies=common_dependencies)
+        self.include_router(metrics_router, dependencies=common_dependencies)
 
         # Handle 500s separately to play well with TestClient and allow re-raising in tests
         self.add_exception_handler(NotFoundError, handle_exceptions)
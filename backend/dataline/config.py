@@ -44,6 +44,54 @@ class Config(BaseSettings):
 
     spa_mode: bool = False
 
+    # Connection pooling for user databases (see EngineRegistry)
+    engine_pool_size: int = 5
+    engine_max_overflow: int = 10
+    engine_pool_recycle: int = 1800  # seconds
+    engine_idle_timeout: int = 600  # seconds before an unused engine is disposed
+
+    # Only reflect user database tables when the LLM asks for their schema
+    lazy_table_reflection: bool = True
+    # Reflect tables with a few catalog queries per schema instead of the per-table inspector
+    bulk_table_reflection: bool = True
+    # Schemas introspected concurrently, each worker holds a pooled connection (keep below engine_pool_size)
+    reflection_max_workers: int = 4
+    # Reflected metadata is written to disk this long after it changed, changes in between are written together
+    metadata_cache_write_delay: float = 5.0  # seconds
+
+    # Threads running queries against user databases (see QueryExecutor)
+    query_executor_max_workers: int = 16
+    # Queries running at once per connection, others wait in a queue
+    query_max_concurrency_per_connection: int = 4
+    # Await queries with SQLAlchemy's async engines where an async driver is installed (see ASYNC_DRIVERS)
+    async_user_queries: bool = True
+    # Budget of rows and (serialized) bytes kept per query result, rows are streamed until one is used up
+    query_result_max_rows: int = 10_000
+    query_result_max_bytes: int = 16 * 1024 * 1024
+    # Seconds a statement may run on a user database before it is aborted (0 to disable), connections can override it
+    query_statement_timeout: int = 300
+    # Results of repeated queries are reused for this many seconds (0 to disable), see QueryResultCache
+    query_result_cache_ttl: int = 300
+    query_result_cache_max_bytes: int = 64 * 1024 * 1024
+    # Identical queries running at the same time share one execution, see SingleFlight
+    query_coalescing: bool = True
+    # Stored query results larger than this (estimated bytes) are written to files under data_directory instead of
+    # the results table (0 keeps all of them in the table), see write_result_file
+    result_spill_threshold_bytes: int = 1024 * 1024
+    # Stored result contents at least this long are compressed in the app database (0 stores all of them as text),
+    # see ResultContentType
+    result_compression_min_bytes: int = 1024
+    # Rows per page of a result, the first page of results written to files is sent with the message
+    result_page_size: int = 1000
+    # Exports are encoded in chunks of about this many bytes, at most export_queue_chunks of them wait for the
+    # client before the query stops fetching rows, see stream_csv_export
+    export_chunk_bytes: int = 1024 * 1024
+    export_queue_chunks: int = 8
+    # Exports hold a worker for as long as the download lasts, they run on an executor of their own
+    # (see export_executor) so slow downloads don't take the slots of other queries
+    export_max_workers: int = 4
+    export_max_concurrency_per_connection: int = 2
+
     # CORS settings
     allowed_origins: str = (
         "http://localhost:7377,http://localhost:5173,http://0.0.0.0:7377,http://0.0.0.0:5173,http://127.0.0.1:7377,http://127.0.0.1:5173"  # comma separated list of origins
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import socket
@@ -18,6 +19,10 @@ from dataline.app import App
 from dataline.config import IS_BUNDLED, config
 from dataline.old_models import SuccessResponse
 from dataline.sentry import maybe_init_sentry
+from dataline.services.llm_flow.engine_registry import engine_registry
+from dataline.services.llm_flow.metadata_cache import metadata_cache
+from dataline.services.llm_flow.query_executor import export_executor, query_executor
+from dataline.services.result import compress_stored_results
 from dataline.utils.posthog import posthog_capture
 
 logging.basicConfig(level=logging.INFO)
@@ -59,8 +64,18 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
     await posthog_capture("dataline_started")
 
+    # Results stored before they were compressed, compressed in the background
+    compression = asyncio.create_task(compress_stored_results())
+
     yield
 
+    # On shutdown
+    compression.cancel()
+    query_executor.shutdown()
+    export_executor.shutdown()
+    metadata_cache.flush()
+    await engine_registry.adispose_all()
+
 
 app = App(lifespan=lifespan)  # type: ignore
 
@@ -21,6 +21,8 @@ class ConnectionSchema(BaseModel):
 
 class ConnectionOptions(BaseModel):
     schemas: list[ConnectionSchema]
+    # Seconds before statements are aborted, None uses the configured default and 0 disables it
+    statement_timeout: Optional[int] = Field(default=None, ge=0)
 
 
 class Connection(BaseModel):
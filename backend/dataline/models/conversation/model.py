@@ -4,7 +4,7 @@ from uuid import UUID
 
 from dataline.models.base import DBModel, UUIDMixin
 from dataline.models.connection.model import ConnectionModel
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if TYPE_CHECKING:
@@ -13,6 +13,7 @@ if TYPE_CHECKING:
 
 class ConversationModel(DBModel, UUIDMixin, kw_only=True):
     __tablename__ = "conversations"
+    __table_args__ = (Index("ix_conversations_created_at_id", "created_at", "id"),)
     connection_id: Mapped[UUID] = mapped_column(ForeignKey(ConnectionModel.id, ondelete="CASCADE"))
     name: Mapped[str] = mapped_column("name", String, nullable=False)
     created_at: Mapped[datetime] = mapped_column("created_at", String)
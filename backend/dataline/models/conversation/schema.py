@@ -1,8 +1,13 @@
+import base64
+import binascii
 from datetime import datetime
-from typing import TYPE_CHECKING, Self
+from typing import TYPE_CHECKING, Literal, Self
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict
+from pydantic import ValidationError as PydanticValidationError
+
+from dataline.errors import ValidationError
 
 from dataline.models.llm_flow.enums import QueryResultType
 from dataline.models.llm_flow.schema import (
@@ -44,6 +49,38 @@ class UpdateConversationRequest(BaseModel):
     name: str
 
 
+class ConversationSummaryOut(ConversationOut):
+    message_count: int
+    last_message_at: datetime | None = None
+    last_message_role: Literal["ai", "human"] | None = None
+    # First characters of the last message
+    last_message_preview: str | None = None
+
+
+class ConversationCursor(BaseModel):
+    """Position after the last conversation of a page, newest conversations come first."""
+
+    # As stored, compared with the stored values
+    created_at: str
+    id: UUID
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.model_dump_json().encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "ConversationCursor":
+        try:
+            return cls.model_validate_json(base64.urlsafe_b64decode(token.encode()))
+        except (binascii.Error, PydanticValidationError) as e:
+            raise ValidationError("Invalid conversation cursor") from e
+
+
+class ConversationSummaryPageOut(BaseModel):
+    conversations: list[ConversationSummaryOut]
+    # Pass as `cursor` for the next page, None on the last page
+    next_cursor: str | None = None
+
+
 def render_stored_results(results: list[ResultModel]) -> list[ResultOut]:
     rendered_results = []
     for result in results:
@@ -1,15 +1,27 @@
 import abc
+import asyncio
+import logging
 from datetime import datetime
 from typing import Any, ClassVar, List, Self
 from uuid import UUID, uuid4
 
-from pydantic import BaseModel, Field, SecretStr
+from pydantic import BaseModel, Field, PrivateAttr, SecretStr
 
+from dataline.config import config
 from dataline.models.llm_flow.enums import QueryResultType
 from dataline.models.result.model import ResultModel
-from dataline.models.result.schema import ResultCreate, ResultOut
+from dataline.models.result.schema import PageCursor, ResultCreate, ResultOut
 from dataline.repositories.base import AsyncSession
 from dataline.repositories.result import ResultRepository
+from dataline.utils.columnar import ColumnarResult
+from dataline.utils.result_files import (
+    SUFFIX,
+    ResultFile,
+    result_files_directory,
+    write_result_file,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class QueryOptions(BaseModel):
@@ -33,10 +45,17 @@ class StorableResultMixin(BaseModel, abc.ABC):
     result_id: UUID | None = None
 
     @abc.abstractmethod
+    async def to_result_create(self, message_id: UUID, linked_id: UUID | None = None) -> ResultCreate:
+        """
+        The row to store this result as. Its id is generated up front and set as `result_id`, so that results can be
+        linked to each other and stored together with ResultRepository.create_many.
+        """
+        pass
+
     async def store_result(
         self, session: AsyncSession, result_repo: ResultRepository, message_id: UUID, linked_id: UUID | None = None
     ) -> ResultModel:
-        pass
+        return await result_repo.create(session, await self.to_result_create(message_id, linked_id))
 
     @classmethod
     @abc.abstractmethod
@@ -62,12 +81,39 @@ class RenderableResultMixin(abc.ABC):
 class QueryRunData(BaseModel):  # type: ignore[misc]
     columns: list[str]
     rows: list[list[Any] | Any]  # type: ignore[misc]
+    # Whether rows were left out because of a row limit
+    has_more: bool = False
+    # Estimated serialized size of the rows, not stored
+    byte_count: int = Field(default=0, exclude=True)
+
+    @classmethod
+    def from_columnar(cls, data: ColumnarResult, has_more: bool = False, byte_count: int = 0) -> Self:
+        # Rows as lists, like the rows of stored results
+        rows = [list(row) for row in zip(*data.arrays)]
+        return cls(columns=data.columns, rows=rows, has_more=has_more, byte_count=byte_count)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.rows)
+
+    def columnar(self) -> ColumnarResult:
+        """The rows column by column, see ColumnarResult."""
+        return ColumnarResult.from_rows(self.columns, self.rows)
+
+
+class SpilledResult(BaseModel):
+    # Name of the file under result_files_directory()
+    file: str
+    num_rows: int
+    size_bytes: int
 
 
 class SQLQueryRunResultContent(BaseModel):
     data: QueryRunData
     is_secure: bool
     for_chart: bool
+    # Set when the rows were written to a file instead of data.rows
+    spill: SpilledResult | None = None
 
 
 class SQLQueryRunResult(QueryRunData, QueryResultSchema, RenderableResultMixin, StorableResultMixin):  # type: ignore[misc]
@@ -78,48 +124,102 @@ class SQLQueryRunResult(QueryRunData, QueryResultSchema, RenderableResultMixin,
 
     for_chart: bool = False
 
+    # Rows of a stored result that were written to a file, read when serialized
+    _spill: SpilledResult | None = PrivateAttr(default=None)
+
+    @classmethod
+    def from_query_run_data(
+        cls, data: QueryRunData, linked_id: UUID, for_chart: bool = False, is_secure: bool = False
+    ) -> Self:
+        """The result of a query run."""
+        return cls(
+            columns=data.columns,
+            rows=data.rows,
+            has_more=data.has_more,
+            byte_count=data.byte_count,
+            linked_id=linked_id,
+            for_chart=for_chart,
+            is_secure=is_secure,
+        )
+
+    @property
+    def total_rows(self) -> int:
+        return self._spill.num_rows if self._spill is not None else self.num_rows
+
     def serialize_result(self) -> ResultOut:
+        # Rows are serialized once with the response, not copied by model_dump
+        content = self.model_dump(exclude={"ephemeral_id", "linked_id", "created_at", "rows"})
+        content["total_rows"] = self.total_rows
+        if self._spill is None:
+            # Not kept on the result, it would hold every row twice
+            content["rows"] = self.rows
+        else:
+            # Only the first page of rows written to a file, the others are fetched by page (see ResultService)
+            content["rows"] = self.read_rows(0, config.result_page_size).rows()
+            if len(content["rows"]) < self.total_rows:
+                content["next_cursor"] = PageCursor(offset=len(content["rows"])).encode()
         return ResultOut(
-            content=self.model_dump(exclude={"ephemeral_id", "linked_id", "created_at"}),
+            content=content,
             type=self.result_type.value,
             result_id=self.result_id,
             linked_id=self.linked_id,
             created_at=datetime.now(),
         )
 
-    async def store_result(
-        self, session: AsyncSession, result_repo: ResultRepository, message_id: UUID, linked_id: UUID | None = None
-    ) -> ResultModel:
+    def read_rows(self, start: int = 0, stop: int | None = None) -> ColumnarResult:
+        """Rows `start` to `stop` of the result, read from its file if it was written to one."""
+        if self._spill is None:
+            return self.columnar().slice(start, stop)
+        try:
+            with ResultFile(result_files_directory() / self._spill.file) as file:
+                return file.read(start, stop)
+        except FileNotFoundError:
+            logger.warning("Rows of a stored result are missing, %s was deleted", self._spill.file)
+            return ColumnarResult(self.columns)
+
+    async def to_result_create(self, message_id: UUID, linked_id: UUID | None = None) -> ResultCreate:
+        spill = None
+        threshold = config.result_spill_threshold_bytes
+        if threshold and self.byte_count > threshold:
+            # Large results are kept out of the app database
+            spill = await asyncio.to_thread(self._write_rows_file)
+        # Rows written to a file are left out
+        data = self if spill is None else QueryRunData(columns=self.columns, rows=[], has_more=self.has_more)
+        content = SQLQueryRunResultContent(data=data, is_secure=self.is_secure, for_chart=self.for_chart, spill=spill)
         create = ResultCreate(
-            content=SQLQueryRunResultContent(
-                data=QueryRunData(columns=self.columns, rows=self.rows),
-                is_secure=self.is_secure,
-                for_chart=self.for_chart,
-            ).model_dump_json(),
+            content=await asyncio.to_thread(content.model_dump_json),
             type=self.result_type.value,
             linked_id=linked_id,
             message_id=message_id,
+            spill_file=spill.file if spill else None,
         )
 
-        stored_result = await result_repo.create(session, create)
-        self.result_id = stored_result.id
-        self.created_at = stored_result.created_at
-        return stored_result
+        self.result_id = create.id
+        self.created_at = create.created_at
+        return create
 
     @classmethod
     def deserialize(cls, result: ResultModel) -> Self:
         if not result.linked_id:
             raise ValueError("Attempting to deserialize a SQL query run result without a linked_id")
         content = SQLQueryRunResultContent.model_validate_json(result.content)
-        return cls(
+        deserialized = cls(
             columns=content.data.columns,
             rows=content.data.rows,
+            has_more=content.data.has_more,
             is_secure=content.is_secure,
             for_chart=content.for_chart,
             result_id=result.id,
             linked_id=result.linked_id,
             created_at=result.created_at,
         )
+        deserialized._spill = content.spill
+        return deserialized
+
+    def _write_rows_file(self) -> SpilledResult:
+        file_name = f"{uuid4()}{SUFFIX}"
+        size = write_result_file(self.columnar(), result_files_directory() / file_name)
+        return SpilledResult(file=file_name, num_rows=self.num_rows, size_bytes=size)
 
 
 class ChartGenerationResultContent(BaseModel):
@@ -134,9 +234,7 @@ class ChartGenerationResult(QueryResultSchema, StorableResultMixin, RenderableRe
     chart_type: str
 
     # Implement storage for chart generation results with data
-    async def store_result(
-        self, session: AsyncSession, result_repo: ResultRepository, message_id: UUID, linked_id: UUID | None = None
-    ) -> ResultModel:
+    async def to_result_create(self, message_id: UUID, linked_id: UUID | None = None) -> ResultCreate:
         create = ResultCreate(
             content=ChartGenerationResultContent(
                 chartjs_json=self.chartjs_json, chart_type=self.chart_type
@@ -145,10 +243,9 @@ class ChartGenerationResult(QueryResultSchema, StorableResultMixin, RenderableRe
             message_id=message_id,
             linked_id=linked_id,
         )
-        stored_result = await result_repo.create(session, create)
-        self.result_id = stored_result.id
-        self.created_at = stored_result.created_at
-        return stored_result
+        self.result_id = create.id
+        self.created_at = create.created_at
+        return create
 
     @classmethod
     def deserialize(cls, result: ResultModel) -> Self:
@@ -184,18 +281,15 @@ class SQLQueryStringResult(QueryResultSchema, StorableResultMixin, RenderableRes
     sql: str
     for_chart: bool = False
 
-    async def store_result(
-        self, session: AsyncSession, result_repo: ResultRepository, message_id: UUID, linked_id: UUID | None = None
-    ) -> ResultModel:
+    async def to_result_create(self, message_id: UUID, linked_id: UUID | None = None) -> ResultCreate:
         create = ResultCreate(
             content=SQLQueryStringResultContent(sql=self.sql, for_chart=self.for_chart).model_dump_json(),
             type=self.result_type.value,
             message_id=message_id,
             linked_id=linked_id,
         )
-        stored_result = await result_repo.create(session, create)
-        self.result_id = stored_result.id
-        return stored_result
+        self.result_id = create.id
+        return create
 
     @classmethod
     def deserialize(cls, result: ResultModel) -> Self:
@@ -216,18 +310,15 @@ class SelectedTablesResult(QueryResultSchema, StorableResultMixin, RenderableRes
     linked_id: UUID | None = None
     tables: List[str]
 
-    async def store_result(
-        self, session: AsyncSession, result_repo: ResultRepository, message_id: UUID, linked_id: UUID | None = None
-    ) -> ResultModel:
+    async def to_result_create(self, message_id: UUID, linked_id: UUID | None = None) -> ResultCreate:
         create = ResultCreate(
             content=",".join(self.tables),
             type=self.result_type.value,
             message_id=message_id,
             linked_id=linked_id,
         )
-        stored_result = await result_repo.create(session, create)
-        self.result_id = stored_result.id
-        return stored_result
+        self.result_id = create.id
+        return create
 
     @classmethod
     def deserialize(cls, result: ResultModel) -> Self:
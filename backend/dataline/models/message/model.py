@@ -4,7 +4,7 @@ from uuid import UUID
 
 from dataline.models.base import DBModel, UUIDMixin
 from dataline.models.conversation.model import ConversationModel
-from sqlalchemy import JSON, ForeignKey, String, Text
+from sqlalchemy import JSON, ForeignKey, Index, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if TYPE_CHECKING:
@@ -13,6 +13,7 @@ if TYPE_CHECKING:
 
 class MessageModel(DBModel, UUIDMixin, kw_only=True):  # type: ignore[misc]
     __tablename__ = "messages"
+    __table_args__ = (Index("ix_messages_conversation_id_created_at", "conversation_id", "created_at"),)
     content: Mapped[str] = mapped_column("content", Text, nullable=False)
     role: Mapped[str] = mapped_column("role", String, nullable=False)
     created_at: Mapped[datetime | None] = mapped_column("created_at", String)
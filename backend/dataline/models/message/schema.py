@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 from typing import Literal, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -19,6 +19,8 @@ class MessageOptions(BaseModel):
 
 
 class MessageCreate(BaseModel):
+    # Known before the message is stored, so its results can be stored with it
+    id: UUID = Field(default_factory=uuid4)
     created_at: datetime = Field(default_factory=datetime.now)
 
     content: str
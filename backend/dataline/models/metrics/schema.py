@@ -0,0 +1,72 @@
+from pydantic import BaseModel
+
+
+class EnginePoolStats(BaseModel):
+    url: str
+    pool_class: str
+    # Only reported for QueuePool based engines
+    size: int | None = None
+    checked_in: int | None = None
+    checked_out: int | None = None
+    overflow: int | None = None
+    idle_seconds: float
+    age_seconds: float
+
+
+class ConnectionQueryStats(BaseModel):
+    url: str
+    running: int
+    # Calls waiting for a free slot of this connection
+    queued: int
+    max_queued: int
+    completed: int
+    failed: int
+    # Calls cancelled before they started
+    cancelled: int
+    average_wait_seconds: float
+
+
+class QueryExecutorStats(BaseModel):
+    max_workers: int
+    max_concurrency_per_connection: int
+    connections: list[ConnectionQueryStats]
+
+
+class QueryResultCacheStats(BaseModel):
+    ttl: float
+    max_bytes: int
+    entries: int
+    size_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class SingleFlightStats(BaseModel):
+    in_flight: int
+    executions: int
+    # Calls that waited for an identical call in flight instead of running themselves
+    coalesced: int
+
+
+class ExportStats(BaseModel):
+    active: int
+    completed: int
+    failed: int
+    # Stopped before the end, ex. the client went away
+    cancelled: int
+    rows: int
+    bytes: int
+    seconds: float
+    rows_per_second: float
+    bytes_per_second: float
+
+
+class MetricsOut(BaseModel):
+    engines: list[EnginePoolStats]
+    query_executor: QueryExecutorStats
+    export_executor: QueryExecutorStats
+    query_result_cache: QueryResultCacheStats
+    query_coalescing: SingleFlightStats
+    exports: ExportStats
@@ -1,20 +1,55 @@
 from datetime import datetime
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy import Dialect, ForeignKey, Index, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.types import TypeDecorator, TypeEngine
 
+from dataline.config import config
 from dataline.models.base import CustomUUIDType, DBModel, UUIDMixin
 from dataline.models.message.model import MessageModel
+from dataline.utils.result_codec import decode_result_content, encode_result_content
+from dataline.utils.result_files import SPILLED_CONTENT_MARKER
+
+
+class ResultContentType(TypeDecorator[str]):
+    """
+    Content of a result, compressed in the database from config.result_compression_min_bytes characters on.
+    Contents of results written to files are small and stay text.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value: str | None, dialect: Dialect) -> str | bytes | None:
+        min_bytes = config.result_compression_min_bytes
+        if value is None or not min_bytes or len(value) < min_bytes or SPILLED_CONTENT_MARKER in value:
+            return value
+        return encode_result_content(value)
+
+    def process_result_value(self, value: str | bytes | None, dialect: Dialect) -> str | None:
+        return None if value is None else decode_result_content(value)
+
+    def coerce_compared_value(self, op: Any, value: Any) -> TypeEngine[Any]:  # type: ignore[misc]
+        # Compared as text, ex. LIKE patterns are not encoded
+        return Text()
 
 
 class ResultModel(DBModel, UUIDMixin, kw_only=True):
     __tablename__ = "results"
-    content: Mapped[str] = mapped_column("content", Text, nullable=False)
+    __table_args__ = (
+        Index("ix_results_message_id_type", "message_id", "type"),
+        Index("ix_results_linked_id_type", "linked_id", "type"),
+        Index("ix_results_spill_file", "spill_file"),
+    )
+    content: Mapped[str] = mapped_column("content", ResultContentType, nullable=False)
     type: Mapped[str] = mapped_column("type", String, nullable=False)
     created_at: Mapped[datetime | None] = mapped_column("created_at", String)
     message_id: Mapped[UUID] = mapped_column(ForeignKey(MessageModel.id, ondelete="CASCADE"))
     linked_id: Mapped[UUID | None] = mapped_column(CustomUUIDType, nullable=True)
+    # File the rows of a large query run result were written to, see ResultRepository.list_result_files
+    spill_file: Mapped[str | None] = mapped_column("spill_file", String, nullable=True, default=None)
 
     # Relationships
     message: Mapped["MessageModel"] = relationship("MessageModel", back_populates="results")
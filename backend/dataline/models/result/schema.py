@@ -1,11 +1,20 @@
-from datetime import datetime
-from typing import Any
-from uuid import UUID
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, Literal
+from uuid import UUID, uuid4
 
 from pydantic import BaseModel, ConfigDict, Field
+from pydantic import ValidationError as PydanticValidationError
+
+from dataline.errors import ValidationError
 
 
 class ResultCreate(BaseModel):
+    # Known before the result is stored, so other results can be linked to it
+    id: UUID = Field(default_factory=uuid4)
     created_at: datetime = Field(default_factory=datetime.now)
 
     content: str
@@ -15,6 +24,9 @@ class ResultCreate(BaseModel):
     # Used for linking results together ex. chart -> query
     linked_id: UUID | None = None
 
+    # File the rows were written to, for large query run results
+    spill_file: str | None = None
+
 
 class ResultUpdate(BaseModel):
     created_at: datetime | None = None
@@ -41,6 +53,85 @@ class ResultOut(BaseModel):  # type: ignore[misc]
     linked_id: UUID | None = None
 
 
+FilterOperator = Literal["eq", "ne", "lt", "le", "gt", "ge", "contains"]
+
+# Types of sort values a keyset cursor can carry, other types are paged with OFFSET
+KEYSET_TYPES: dict[str, Callable[[str], Any]] = {  # type: ignore[misc]
+    "datetime": datetime.fromisoformat,
+    "date": date.fromisoformat,
+    "time": time.fromisoformat,
+    "Decimal": Decimal,
+}
+
+
+class RowFilter(BaseModel):  # type: ignore[misc]
+    column: str
+    op: FilterOperator
+    value: Any  # type: ignore[misc]
+
+    @classmethod
+    def parse(cls, expression: str) -> "RowFilter":
+        """
+        Parse `column:op:value`, ex. `amount:gt:10` or `name:contains:smith`.
+        The value is read as JSON if it is valid JSON (`10`, `"10"`, `null`), as a string otherwise.
+        """
+        parts = expression.split(":", 2)
+        if len(parts) != 3:
+            raise ValidationError(f"Invalid filter '{expression}', expected column:operator:value")
+        name, op, raw_value = parts
+        try:
+            value = json.loads(raw_value)
+        except ValueError:
+            value = raw_value
+        try:
+            return cls.model_validate({"column": name, "op": op, "value": value})
+        except PydanticValidationError as e:
+            raise ValidationError(f"Invalid filter '{expression}': unknown operator {op}") from e
+
+
+class PageCursor(BaseModel):  # type: ignore[misc]
+    """Position after the last row of a page, handed to clients as an opaque string."""
+
+    # Rows before the next page
+    offset: int = 0
+    sort_by: str | None = None
+    descending: bool = False
+    # Column with unique values that orders rows with the same sort value, enables keyset paging
+    key: str | None = None
+    # Keyset: sort and key values of the last row, with their types (see KEYSET_TYPES)
+    keyset: bool = False
+    last: Any = None  # type: ignore[misc]
+    last_type: str | None = None
+    last_key: Any = None  # type: ignore[misc]
+    last_key_type: str | None = None
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(self.model_dump_json().encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "PageCursor":
+        try:
+            return cls.model_validate_json(base64.urlsafe_b64decode(token.encode()))
+        except (binascii.Error, PydanticValidationError) as e:
+            raise ValidationError("Invalid page cursor") from e
+
+    def last_values(self) -> tuple[Any, Any]:  # type: ignore[misc]
+        return _decode_keyset_value(self.last, self.last_type), _decode_keyset_value(self.last_key, self.last_key_type)
+
+
+def _decode_keyset_value(value: Any, value_type: str | None) -> Any:  # type: ignore[misc]
+    return value if value is None or value_type is None else KEYSET_TYPES[value_type](value)
+
+
+class ResultPageOut(BaseModel):  # type: ignore[misc]
+    columns: list[str]
+    rows: list[list[Any] | Any]  # type: ignore[misc]
+    # Rows matching the filters, unknown when the page was fetched from the database
+    total_rows: int | None = None
+    # Pass as `cursor` to fetch the next page, None on the last page
+    next_cursor: str | None = None
+
+
 class ChartRefreshOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
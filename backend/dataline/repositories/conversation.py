@@ -1,15 +1,18 @@
 from datetime import datetime
-from typing import Sequence, Type
+from typing import Any, Sequence, Type
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
-from sqlalchemy import select
+from sqlalchemy import Row, and_, func, or_, select
 from sqlalchemy.orm import joinedload
 
 from dataline.models.conversation.model import ConversationModel
 from dataline.models.message.model import MessageModel
 from dataline.repositories.base import AsyncSession, BaseRepository
 
+# Characters of the last message returned with conversation summaries
+LAST_MESSAGE_PREVIEW_LENGTH = 200
+
 
 class ConversationCreate(BaseModel):
     model_config = ConfigDict(from_attributes=True, extra="ignore")
@@ -44,3 +47,47 @@ class ConversationRepository(BaseRepository[ConversationModel, ConversationCreat
             joinedload(ConversationModel.messages).joinedload(MessageModel.results)
         )
         return await self.list_unique(session, query)
+
+    async def list_summaries(  # type: ignore[misc]
+        self, session: AsyncSession, limit: int, after: tuple[str, UUID] | None = None
+    ) -> Sequence[Row[Any]]:
+        """
+        Conversations newest first, with their number of messages and their last message, in one query.
+        `after` is the (created_at, id) of the last conversation of the previous page (keyset pagination).
+        """
+        created_at = ConversationModel.created_at
+        in_conversation = MessageModel.conversation_id == ConversationModel.id
+        last_message_id = (
+            select(MessageModel.id)
+            .where(in_conversation)
+            .order_by(MessageModel.created_at.desc(), MessageModel.id.desc())
+            .limit(1)
+            .correlate(ConversationModel)
+            .scalar_subquery()
+        )
+        message_count = select(func.count()).where(in_conversation).correlate(ConversationModel).scalar_subquery()
+        query = (
+            select(
+                ConversationModel.id,
+                ConversationModel.connection_id,
+                ConversationModel.name,
+                ConversationModel.created_at,
+                message_count.label("message_count"),
+                MessageModel.created_at.label("last_message_at"),
+                MessageModel.role.label("last_message_role"),
+                func.substr(MessageModel.content, 1, LAST_MESSAGE_PREVIEW_LENGTH).label("last_message_preview"),
+            )
+            .outerjoin(MessageModel, MessageModel.id == last_message_id)
+            .order_by(created_at.desc(), ConversationModel.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            after_created_at, after_id = after
+            query = query.where(
+                or_(
+                    created_at < after_created_at,
+                    and_(created_at == after_created_at, ConversationModel.id < after_id),
+                )
+            )
+        result = await session.execute(query)
+        return result.all()
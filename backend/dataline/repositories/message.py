@@ -1,14 +1,14 @@
 from typing import Sequence, Type
 from uuid import UUID
 
-from sqlalchemy import select
-from sqlalchemy.orm import contains_eager
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import contains_eager, selectinload
 
 from dataline.models.llm_flow.enums import QueryResultType
 from dataline.models.message.model import MessageModel
 from dataline.models.message.schema import MessageCreate, MessageUpdate
 from dataline.models.result.model import ResultModel
-from dataline.repositories.base import AsyncSession, BaseRepository
+from dataline.repositories.base import AsyncSession, BaseRepository, NotFoundError
 
 
 class MessageRepository(BaseRepository[MessageModel, MessageCreate, MessageUpdate]):
@@ -36,3 +36,37 @@ class MessageRepository(BaseRepository[MessageModel, MessageCreate, MessageUpdat
             .limit(n)
         )
         return await self.list_unique(session, query=query)
+
+    async def list_page(
+        self, session: AsyncSession, conversation_id: UUID, limit: int | None = None, before: UUID | None = None
+    ) -> Sequence[MessageModel]:
+        """
+        Messages of the conversation newest first, at most `limit`, with their results.
+        `before` is the id of the oldest message of the previous page, the page holds the messages before it (keyset).
+        Results are loaded for the messages of the page only.
+
+        :raises: NotFoundError if `before` is not a message of the conversation
+        """
+        # Ordered on the columns themselves, so that ix_messages_conversation_id_created_at is used
+        query = (
+            select(MessageModel)
+            .filter_by(conversation_id=conversation_id)
+            .options(selectinload(MessageModel.results))
+            .order_by(MessageModel.created_at.desc(), MessageModel.id.desc())
+            .limit(limit)
+        )
+        if before is not None:
+            anchor = (
+                await session.execute(
+                    select(MessageModel.created_at).filter_by(id=before, conversation_id=conversation_id)
+                )
+            ).one_or_none()
+            if anchor is None:
+                raise NotFoundError(f"Message {before} not found in conversation {conversation_id}")
+            query = query.where(
+                or_(
+                    MessageModel.created_at < anchor.created_at,
+                    and_(MessageModel.created_at == anchor.created_at, MessageModel.id < before),
+                )
+            )
+        return await self.list(session, query=query)
@@ -1,7 +1,9 @@
 from typing import Type
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import func, select, update
+
+from dataline.config import config
 
 from dataline.models.connection.model import ConnectionModel
 from dataline.models.conversation.model import ConversationModel
@@ -48,3 +50,35 @@ class ResultRepository(BaseRepository[ResultModel, ResultCreate, ResultUpdate]):
             raise NotFoundError(f"Could not find chart for result_id: {sql_string_result_id}")
 
         return chart[0]
+
+    async def list_result_files(self, session: AsyncSession) -> set[str]:
+        """Names of the files the rows of stored query run results were written to."""
+        # Read from the index on spill_file, contents are not searched
+        query = select(ResultModel.spill_file).where(ResultModel.spill_file.is_not(None))
+        result = await session.execute(query)
+        return {file for file in result.scalars() if file is not None}
+
+    async def compress_contents(self, session: AsyncSession, limit: int) -> int:
+        """
+        Store up to `limit` contents that were stored as text but would be compressed now (see ResultContentType)
+        again, returns how many were found.
+        """
+        min_length = config.result_compression_min_bytes
+        if not min_length:
+            return 0
+
+        query = (
+            select(ResultModel.id, ResultModel.content)
+            .where(
+                func.typeof(ResultModel.content) == "text",
+                func.length(ResultModel.content) >= min_length,
+                ResultModel.spill_file.is_(None),
+            )
+            .limit(limit)
+        )
+        rows = (await session.execute(query)).all()
+        if rows:
+            # Bulk update by primary key, the contents are compressed as they are bound
+            await session.execute(update(ResultModel), [{"id": id_, "content": content} for id_, content in rows])
+            await session.flush()
+        return len(rows)
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 import sqlite3
@@ -28,8 +29,14 @@ from dataline.repositories.connection import (
     ConnectionType,
     ConnectionUpdate,
 )
+from dataline.repositories.result import ResultRepository
 from dataline.services.file_parsers.excel_parser import ExcelParserService
+from dataline.services.llm_flow.engine_registry import engine_registry
+from dataline.services.llm_flow.metadata_cache import metadata_cache
+from dataline.services.llm_flow.query_executor import query_executor
+from dataline.services.llm_flow.result_cache import query_result_cache
 from dataline.services.llm_flow.utils import DatalineSQLDatabase as SQLDatabase
+from dataline.utils.result_files import remove_unreferenced_result_files
 from dataline.utils.utils import (
     forward_connection_errors,
     generate_short_uuid,
@@ -41,9 +48,15 @@ logger = logging.getLogger(__name__)
 
 class ConnectionService:
     connection_repo: ConnectionRepository
+    result_repo: ResultRepository
 
-    def __init__(self, connection_repo: ConnectionRepository = Depends(ConnectionRepository)) -> None:
+    def __init__(
+        self,
+        connection_repo: ConnectionRepository = Depends(ConnectionRepository),
+        result_repo: ResultRepository = Depends(ResultRepository),
+    ) -> None:
         self.connection_repo = connection_repo
+        self.result_repo = result_repo
 
     async def get_connection(self, session: AsyncSession, connection_id: UUID) -> ConnectionOut:
         connection = await self.connection_repo.get_by_uuid(session, connection_id)
@@ -58,12 +71,25 @@ class ConnectionService:
         return [ConnectionOut.model_validate(connection) for connection in connections]
 
     async def delete_connection(self, session: AsyncSession, connection_id: UUID) -> None:
+        connection = await self.connection_repo.get_by_uuid(session, connection_id)
         await self.connection_repo.delete_by_uuid(session, connection_id)
+        engine_registry.dispose(connection.dsn)
+        metadata_cache.invalidate(connection.dsn)
+        query_result_cache.invalidate(connection.dsn)
+        # Result files of its conversations
+        referenced = await self.result_repo.list_result_files(session)
+        await asyncio.to_thread(remove_unreferenced_result_files, referenced)
+
+    async def invalidate_query_cache(self, session: AsyncSession, connection_id: UUID) -> None:
+        """Drop cached query results of the connection, ex. after its data changed."""
+        connection = await self.connection_repo.get_by_uuid(session, connection_id)
+        query_result_cache.invalidate(connection.dsn)
 
     async def get_db_from_dsn(self, dsn: str) -> SQLDatabase:
         # Check if connection can be established before saving it
+        # Only table names are needed here, skip reflecting columns and constraints
         try:
-            db = SQLDatabase.from_uri(dsn)
+            db = await query_executor.arun(dsn, SQLDatabase.from_uri, dsn, lazy_reflection=True)
             database = db._engine.url.database
 
             if not database:
@@ -76,7 +102,7 @@ class ConnectionService:
             if "localhost" in dsn:
                 dsn = dsn.replace("localhost", "host.docker.internal")
                 try:
-                    db = SQLDatabase.from_uri(dsn)
+                    db = await query_executor.arun(dsn, SQLDatabase.from_uri, dsn, lazy_reflection=True)
                     database = db._engine.url.database
 
                     if not database:
@@ -131,6 +157,8 @@ class ConnectionService:
                 ConnectionOptions.model_validate(current_connection.options) if current_connection.options else None
             )
             update.options = self.merge_options(old_options, db)
+            if data.options:
+                update.options.statement_timeout = data.options.statement_timeout
         elif data.options:
             # only modify options if dsn hasn't changed
             update.options = data.options
@@ -138,7 +166,14 @@ class ConnectionService:
         if data.name:
             update.name = data.name
 
+        current_dsn = (await self.connection_repo.get_by_uuid(session, connection_uuid)).dsn
         updated_connection = await self.connection_repo.update_by_uuid(session, connection_uuid, update)
+
+        # Drop pooled connections and reflected metadata that may point to the old database
+        engine_registry.dispose(current_dsn)
+        metadata_cache.invalidate(current_dsn)
+        metadata_cache.invalidate(updated_connection.dsn)
+        query_result_cache.invalidate(current_dsn)
         return ConnectionOut.model_validate(updated_connection)
 
     async def create_connection(
@@ -313,7 +348,9 @@ class ConnectionService:
         for schema in new_schemas:
             schema.tables.sort(key=lambda x: x.name)
 
-        return ConnectionOptions(schemas=new_schemas)
+        return ConnectionOptions(
+            schemas=new_schemas, statement_timeout=old_options.statement_timeout if old_options else None
+        )
 
     async def refresh_connection_schema(self, session: AsyncSession, connection_id: UUID) -> ConnectionOut:
         """
@@ -323,6 +360,7 @@ class ConnectionService:
         2.b. Otherwise, fetch stored ConnectionOptions from the database and merge with new schema information
         3. Sort schemas and tables by name
         4. Update the connection with new options
+        5. Invalidate cached metadata so the next query reflects the new schema
         """
         connection = await self.connection_repo.get_by_uuid(session, connection_id)
 
@@ -336,5 +374,6 @@ class ConnectionService:
         updated_connection = await self.connection_repo.update_by_uuid(
             session, connection_id, ConnectionUpdate(options=new_options)
         )
+        metadata_cache.invalidate(connection.dsn)
 
         return ConnectionOut.model_validate(updated_connection)
@@ -1,5 +1,6 @@
+import asyncio
 import logging
-from typing import AsyncGenerator, cast
+from typing import AsyncGenerator
 from uuid import UUID
 
 from fastapi import Depends
@@ -8,14 +9,21 @@ from openai._exceptions import APIError
 
 from dataline.errors import UserFacingError
 from dataline.models.conversation.schema import (
+    ConversationCursor,
     ConversationOut,
+    ConversationSummaryOut,
+    ConversationSummaryPageOut,
     ConversationWithMessagesWithResultsOut,
+    render_stored_results,
 )
 from dataline.models.llm_flow.enums import QueryStreamingEventType
 from dataline.models.llm_flow.schema import (
+    ChartGenerationResult,
     QueryOptions,
     RenderableResultMixin,
     ResultType,
+    SelectedTablesResult,
+    SQLQueryRunResult,
     SQLQueryStringResultContent,
     StorableResultMixin,
 )
@@ -27,7 +35,6 @@ from dataline.models.message.schema import (
     MessageWithResultsOut,
     QueryOut,
 )
-from dataline.models.result.schema import ResultUpdate
 from dataline.repositories.base import AsyncSession
 from dataline.repositories.conversation import (
     ConversationCreate,
@@ -46,7 +53,9 @@ from dataline.services.llm_flow.llm_calls.mirascope_utils import (
     OpenAIClientOptions,
     call,
 )
+from dataline.services.llm_flow.query_executor import query_executor
 from dataline.services.settings import SettingsService
+from dataline.utils.result_files import remove_unreferenced_result_files
 from dataline.utils.utils import stream_event_str
 
 logger = logging.getLogger(__name__)
@@ -118,14 +127,54 @@ class ConversationService:
         conversation = await self.conversation_repo.get_with_messages_with_results(session, conversation_id)
         return ConversationWithMessagesWithResultsOut.from_conversation(conversation)
 
+    async def get_messages_page(
+        self, session: AsyncSession, conversation_id: UUID, limit: int | None = None, before: UUID | None = None
+    ) -> list[MessageWithResultsOut]:
+        """
+        The last `limit` messages of the conversation (all without a limit), or those before the message `before`,
+        oldest first. Only the results of these messages are loaded.
+        """
+        # Not found error for unknown conversations
+        await self.conversation_repo.get_by_uuid(session, conversation_id)
+        messages = await self.message_repo.list_page(session, conversation_id, limit=limit, before=before)
+        return [
+            MessageWithResultsOut(
+                message=MessageOut.model_validate(message), results=render_stored_results(message.results)
+            )
+            for message in reversed(messages)
+        ]
+
     async def get_conversations(self, session: AsyncSession) -> list[ConversationWithMessagesWithResultsOut]:
         conversations = await self.conversation_repo.list_with_messages_with_results(session)
         return [
             ConversationWithMessagesWithResultsOut.from_conversation(conversation) for conversation in conversations
         ]
 
+    async def get_conversation_summaries(
+        self, session: AsyncSession, cursor: str | None = None, limit: int = 50
+    ) -> ConversationSummaryPageOut:
+        """A page of conversations (newest first) with their last message, without loading messages or results."""
+        after = None
+        if cursor:
+            decoded = ConversationCursor.decode(cursor)
+            after = (decoded.created_at, decoded.id)
+        # One more row tells if there is a next page
+        rows = await self.conversation_repo.list_summaries(session, limit=limit + 1, after=after)
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = ConversationCursor(created_at=last.created_at, id=last.id).encode()
+        return ConversationSummaryPageOut(
+            conversations=[ConversationSummaryOut.model_validate(row._mapping) for row in page],
+            next_cursor=next_cursor,
+        )
+
     async def delete_conversation(self, session: AsyncSession, conversation_id: UUID) -> None:
         await self.conversation_repo.delete_by_uuid(session, record_id=conversation_id)
+        # Rows of large results are stored in files, not deleted with the conversation
+        referenced = await self.result_repo.list_result_files(session)
+        await asyncio.to_thread(remove_unreferenced_result_files, referenced)
 
     async def update_conversation_name(
         self, session: AsyncSession, conversation_id: UUID, name: str
@@ -149,7 +198,7 @@ class ConversationService:
         user_with_model_details = await self.settings_service.get_model_details(session)
 
         # Create query graph
-        query_graph = QueryGraphService(connection=connection)
+        query_graph = await query_executor.arun(connection.dsn, QueryGraphService, connection=connection)
         history = await self.get_conversation_history(session, conversation_id)
 
         messages: list[BaseMessage] = []
@@ -190,55 +239,45 @@ class ConversationService:
         else:
             raise Exception("No AI message found in conversation")
 
-        # Store human message and final AI message without flushing
-        human_message = await self.message_repo.create(
-            session,
-            MessageCreate(
-                role=BaseMessageType.HUMAN.value,
-                content=query,
-                conversation_id=conversation_id,
-                options=MessageOptions(secure_data=secure_data),
-            ),
-            flush=False,
+        # Store human message and final AI message with a single insert
+        human_message_create = MessageCreate(
+            role=BaseMessageType.HUMAN.value,
+            content=query,
+            conversation_id=conversation_id,
+            options=MessageOptions(secure_data=secure_data),
         )
-
-        # Store final AI message in history
-        stored_ai_message = await self.message_repo.create(
-            session,
-            MessageCreate(
-                role=BaseMessageType.AI.value,
-                content=str(last_ai_message.content),
-                conversation_id=conversation_id,
-                options=MessageOptions(secure_data=secure_data),
-            ),
-            flush=True,
+        ai_message_create = MessageCreate(
+            role=BaseMessageType.AI.value,
+            content=str(last_ai_message.content),
+            conversation_id=conversation_id,
+            options=MessageOptions(secure_data=secure_data),
         )
-
-        # Store results and final message in database
+        stored_messages = {
+            message.id: message
+            for message in await self.message_repo.create_many(session, [human_message_create, ai_message_create])
+        }
+        human_message = stored_messages[human_message_create.id]
+        stored_ai_message = stored_messages[ai_message_create.id]
+
+        # Results are linked by ephemeral_id while the graph runs, link them by the ids they are stored with instead
+        result_creates = {
+            result.ephemeral_id: await result.to_result_create(stored_ai_message.id)
+            for result in results
+            if isinstance(result, StorableResultMixin)
+        }
         for result in results:
-            if isinstance(result, StorableResultMixin):
-                await result.store_result(session, self.result_repo, stored_ai_message.id)
-
-        # Go over stored results, replace linked_id with the stored result_id
-        for result in results:
-            if hasattr(result, "linked_id"):
-                # Find corresponding result with this ephemeral ID
-                linked_result = cast(
-                    StorableResultMixin,
-                    next(
-                        (r for r in results if r.ephemeral_id == getattr(result, "linked_id")),
-                        None,
-                    ),
-                )
-                # Update linked_id with the stored result_id
-                if linked_result:
-                    # Update result
-                    setattr(result, "linked_id", linked_result.result_id)
-
-                    if isinstance(result, StorableResultMixin) and result.result_id:
-                        await self.result_repo.update_by_uuid(
-                            session, result.result_id, ResultUpdate(linked_id=linked_result.result_id)
-                        )
+            # Only these results link to another one
+            if not isinstance(result, (SQLQueryRunResult, ChartGenerationResult, SelectedTablesResult)):
+                continue
+            if result.linked_id is None or (linked_create := result_creates.get(result.linked_id)) is None:
+                continue
+            result.linked_id = linked_create.id
+            if result.ephemeral_id in result_creates:
+                result_creates[result.ephemeral_id].linked_id = linked_create.id
+
+        # Store results with a single insert
+        if result_creates:
+            await self.result_repo.create_many(session, result_creates.values())
 
         # Render renderable results
         serialized_results = [
@@ -0,0 +1,228 @@
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import URL, Engine, create_engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import QueuePool
+
+from dataline.config import config
+from dataline.models.metrics.schema import EnginePoolStats
+from dataline.services.llm_flow.query_cancellation import apply_statement_timeout
+
+logger = logging.getLogger(__name__)
+
+# Async drivers SQLAlchemy supports per backend, only used when installed
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite", "mysql": "aiomysql"}
+
+
+@dataclass
+class _RegistryEntry:
+    engine: Engine
+    created_at: float = field(default_factory=time.monotonic)
+    last_used_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _AsyncRegistryEntry:
+    engine: AsyncEngine
+    # Async connections can only be used on the event loop that opened them
+    loop: asyncio.AbstractEventLoop
+    created_at: float = field(default_factory=time.monotonic)
+    last_used_at: float = field(default_factory=time.monotonic)
+
+
+class EngineRegistry:
+    """
+    Process-wide registry of SQLAlchemy engines for user databases, keyed by DSN.
+
+    Creating an engine per request means a new pool (and new TCP/TLS sessions) every time, which on remote
+    warehouses often costs more than the query itself. Engines are instead kept alive here and reused until
+    they sit idle for longer than `idle_timeout` seconds or are disposed explicitly (connection updated/deleted).
+    Databases with an async driver (see ASYNC_DRIVERS) also get an async engine for native async queries.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = config.engine_pool_size,
+        max_overflow: int = config.engine_max_overflow,
+        pool_recycle: int = config.engine_pool_recycle,
+        idle_timeout: float = config.engine_idle_timeout,
+    ) -> None:
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_recycle = pool_recycle
+        self.idle_timeout = idle_timeout
+        self._entries: dict[str, _RegistryEntry] = {}
+        self._async_entries: dict[str, _AsyncRegistryEntry] = {}
+        self._disposals: set[asyncio.Task[None]] = set()
+        self._lock = threading.Lock()
+
+    def _engine_args(self, dsn: str) -> dict[str, object]:
+        engine_args: dict[str, object] = {"pool_pre_ping": True, "pool_recycle": self.pool_recycle}
+        url = make_url(dsn)
+        # In-memory SQLite uses a SingletonThreadPool which does not accept sizing arguments
+        if url.get_backend_name() != "sqlite" or (url.database and url.database != ":memory:"):
+            engine_args["pool_size"] = self.pool_size
+            engine_args["max_overflow"] = self.max_overflow
+        return engine_args
+
+    def get_engine(
+        self, dsn: str, engine_args: dict[str, object] | None = None, statement_timeout: int | None = None
+    ) -> Engine:
+        """
+        Get the engine registered for this DSN, creating it if needed.
+        `engine_args` and `statement_timeout` (seconds) are only used when the engine is created.
+        """
+        self.evict_idle()
+        with self._lock:
+            entry = self._entries.get(dsn)
+            if entry is None:
+                engine = create_engine(dsn, **{**self._engine_args(dsn), **(engine_args or {})})
+                apply_statement_timeout(engine, statement_timeout)
+                entry = _RegistryEntry(engine=engine)
+                self._entries[dsn] = entry
+            entry.last_used_at = time.monotonic()
+            return entry.engine
+
+    @staticmethod
+    def _async_url(url: URL) -> URL | None:
+        backend = url.get_backend_name()
+        driver = ASYNC_DRIVERS.get(backend)
+        if driver is None or importlib.util.find_spec(driver) is None:
+            return None
+        # In-memory SQLite databases only exist on the connection that created them
+        if backend == "sqlite" and (not url.database or url.database == ":memory:"):
+            return None
+        # libpq options (sslmode, options, ...) are not understood by asyncpg
+        if backend == "postgresql" and set(url.query) - {"host", "port", "ssl"}:
+            return None
+        return url.set(drivername=f"{backend}+{driver}")
+
+    def get_async_engine(self, url: URL, statement_timeout: int | None = None) -> AsyncEngine | None:
+        """
+        Get an async engine for the running event loop, or None if there is no async driver for this database.
+        `url` is the URL of the sync engine, the async driver is swapped in.
+        """
+        async_url = self._async_url(url)
+        if async_url is None:
+            return None
+
+        self.evict_idle()
+        loop = asyncio.get_running_loop()
+        key = async_url.render_as_string(hide_password=False)
+        stale_entry = None
+        with self._lock:
+            entry = self._async_entries.get(key)
+            if entry is not None and entry.loop is not loop:
+                stale_entry, entry = entry, None
+            if entry is None:
+                engine_args = self._engine_args(key)
+                if async_url.get_backend_name() == "sqlite":
+                    # aiosqlite engines don't use a sized pool, opening a SQLite file is cheap
+                    engine_args.pop("pool_size", None)
+                    engine_args.pop("max_overflow", None)
+                async_engine = create_async_engine(async_url, **engine_args)
+                apply_statement_timeout(async_engine.sync_engine, statement_timeout)
+                entry = _AsyncRegistryEntry(engine=async_engine, loop=loop)
+                self._async_entries[key] = entry
+            entry.last_used_at = time.monotonic()
+
+        if stale_entry is not None:
+            self._dispose_async(stale_entry)
+        return entry.engine
+
+    def _dispose_async(self, entry: _AsyncRegistryEntry) -> None:
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is entry.loop:
+            task = running_loop.create_task(entry.engine.dispose())
+            self._disposals.add(task)
+            task.add_done_callback(self._disposals.discard)
+        else:
+            # The connections belong to another event loop (usually closed already), drop them without closing
+            entry.engine.sync_engine.dispose(close=False)
+
+    def _pop_async_entries(self, url: URL) -> list[_AsyncRegistryEntry]:
+        async_url = self._async_url(url)
+        if async_url is None:
+            return []
+        entry = self._async_entries.pop(async_url.render_as_string(hide_password=False), None)
+        return [entry] if entry is not None else []
+
+    def dispose(self, dsn: str) -> None:
+        """Dispose of the engines registered for this DSN (if any), closing their pooled connections."""
+        with self._lock:
+            entry = self._entries.pop(dsn, None)
+            async_entries = self._pop_async_entries(make_url(dsn))
+        if entry is not None:
+            entry.engine.dispose()
+        for async_entry in async_entries:
+            self._dispose_async(async_entry)
+
+    def dispose_all(self) -> None:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            async_entries = list(self._async_entries.values())
+            self._async_entries.clear()
+        for entry in entries:
+            entry.engine.dispose()
+        for async_entry in async_entries:
+            self._dispose_async(async_entry)
+
+    async def adispose_all(self) -> None:
+        """Dispose of all engines and wait for async connections to be closed."""
+        self.dispose_all()
+        await asyncio.gather(*self._disposals, return_exceptions=True)
+
+    def evict_idle(self) -> None:
+        """Dispose of engines that have not been used for longer than the idle timeout."""
+        now = time.monotonic()
+        with self._lock:
+            idle_dsns = [dsn for dsn, entry in self._entries.items() if now - entry.last_used_at > self.idle_timeout]
+            idle_entries = [self._entries.pop(dsn) for dsn in idle_dsns]
+            idle_keys = [
+                key for key, entry in self._async_entries.items() if now - entry.last_used_at > self.idle_timeout
+            ]
+            idle_async_entries = [self._async_entries.pop(key) for key in idle_keys]
+        for entry in idle_entries:
+            logger.info("Disposing idle engine for %s", entry.engine.url.render_as_string(hide_password=True))
+            entry.engine.dispose()
+        for async_entry in idle_async_entries:
+            logger.info("Disposing idle engine for %s", async_entry.engine.url.render_as_string(hide_password=True))
+            self._dispose_async(async_entry)
+
+    def stats(self) -> list[EnginePoolStats]:
+        now = time.monotonic()
+        with self._lock:
+            entries: list[_RegistryEntry | _AsyncRegistryEntry] = [
+                *self._entries.values(),
+                *self._async_entries.values(),
+            ]
+
+        stats = []
+        for entry in entries:
+            pool = entry.engine.pool
+            pool_stats = EnginePoolStats(
+                url=entry.engine.url.render_as_string(hide_password=True),
+                pool_class=type(pool).__name__,
+                idle_seconds=now - entry.last_used_at,
+                age_seconds=now - entry.created_at,
+            )
+            if isinstance(pool, QueuePool):
+                pool_stats.size = pool.size()
+                pool_stats.checked_in = pool.checkedin()
+                pool_stats.checked_out = pool.checkedout()
+                pool_stats.overflow = pool.overflow()
+            stats.append(pool_stats)
+        return stats
+
+
+engine_registry = EngineRegistry()
@@ -0,0 +1,190 @@
+import asyncio
+import csv
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from io import StringIO
+from typing import Any, AsyncGenerator, Callable, Iterator, Literal, Sequence
+
+from dataline.config import config
+from dataline.models.metrics.schema import ExportStats
+from dataline.services.llm_flow.query_executor import export_executor
+from dataline.services.llm_flow.utils import DatalineSQLDatabase as SQLDatabase
+from dataline.utils.xlsx_export import write_xlsx
+
+ExportOutcome = Literal["completed", "failed", "cancelled"]
+
+# Put in the queue by the worker after the last chunk
+_DONE = object()
+
+
+class ExportMetrics:
+    """Number of result exports and the rows and bytes they streamed, throughput is over finished exports."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._active = 0
+        self._outcomes: dict[ExportOutcome, int] = {"completed": 0, "failed": 0, "cancelled": 0}
+        self._rows = 0
+        self._bytes = 0
+        self._seconds = 0.0
+
+    def started(self) -> None:
+        with self._lock:
+            self._active += 1
+
+    def finished(self, outcome: ExportOutcome, rows: int, size: int, seconds: float) -> None:
+        with self._lock:
+            self._active -= 1
+            self._outcomes[outcome] += 1
+            self._rows += rows
+            self._bytes += size
+            self._seconds += seconds
+
+    def stats(self) -> ExportStats:
+        with self._lock:
+            return ExportStats(
+                active=self._active,
+                completed=self._outcomes["completed"],
+                failed=self._outcomes["failed"],
+                cancelled=self._outcomes["cancelled"],
+                rows=self._rows,
+                bytes=self._bytes,
+                seconds=self._seconds,
+                rows_per_second=self._rows / self._seconds if self._seconds else 0.0,
+                bytes_per_second=self._bytes / self._seconds if self._seconds else 0.0,
+            )
+
+
+export_metrics = ExportMetrics()
+
+
+# Encodes the export of a result, given its columns and its batches of rows, and passes the bytes to `emit`
+ExportEncoder = Callable[[list[str], Iterator[Sequence[Any]], Callable[[bytes], None]], None]  # type: ignore[misc]
+
+
+class _ExportStopped(Exception):
+    """The response went away, the worker stops encoding."""
+
+
+def stream_csv_export(db: SQLDatabase, query: str, gzip: bool = False) -> AsyncGenerator[bytes, None]:
+    """Stream the rows of a query as CSV, gzip compressed if `gzip` is set, see `stream_export`."""
+
+    def encode(  # type: ignore[misc]
+        columns: list[str], batches: Iterator[Sequence[Any]], emit: Callable[[bytes], None]
+    ) -> None:
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(wbits=31) if gzip else None
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+
+        def flush(final: bool = False) -> None:
+            data = buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate(0)
+            if compressor is not None:
+                data = compressor.compress(data) + (compressor.flush() if final else b"")
+            if data:
+                emit(data)
+
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+            if buffer.tell() >= config.export_chunk_bytes:
+                flush()
+        flush(final=True)
+
+    return stream_export(db, query, encode)
+
+
+def stream_xlsx_export(db: SQLDatabase, query: str) -> AsyncGenerator[bytes, None]:
+    """Stream the rows of a query as an Excel workbook, see `write_xlsx` and `stream_export`."""
+
+    def encode(  # type: ignore[misc]
+        columns: list[str], batches: Iterator[Sequence[Any]], emit: Callable[[bytes], None]
+    ) -> None:
+        # A workbook is a zip archive, complete only once all the rows are in
+        with tempfile.TemporaryFile() as file:
+            write_xlsx(columns, batches, file)
+            file.seek(0)
+            while data := file.read(config.export_chunk_bytes):
+                emit(data)
+
+    return stream_export(db, query, encode)
+
+
+async def stream_export(db: SQLDatabase, query: str, encode: ExportEncoder) -> AsyncGenerator[bytes, None]:
+    """
+    Stream the rows of a query, encoded by `encode`.
+
+    Rows are fetched and encoded by an export executor worker, which hands chunks (of about `export_chunk_bytes`)
+    to the response through a queue of at most `export_queue_chunks` chunks. A worker ahead of the client waits for
+    the queue to drain, so a slow download keeps a few chunks in memory instead of the whole result. When the
+    client goes away, the worker stops and the running query is cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[object] = asyncio.Queue(maxsize=config.export_queue_chunks)
+    stopped = threading.Event()
+    rows = 0
+
+    def put(item: object) -> None:
+        """Wait for room in the queue."""
+        pending = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while not stopped.is_set():
+            try:
+                pending.result(timeout=0.1)
+                return
+            except FutureTimeoutError:
+                continue
+        pending.cancel()
+        raise _ExportStopped()
+
+    def counted(batches: Iterator[Sequence[Any]]) -> Iterator[Sequence[Any]]:  # type: ignore[misc]
+        nonlocal rows
+        for batch in batches:
+            if stopped.is_set() or export_executor.cancel_requested():
+                raise _ExportStopped()
+            rows += len(batch)
+            yield batch
+
+    def produce() -> None:
+        try:
+            batches = db.custom_run_sql_batches(query)
+            try:
+                encode(list(next(batches)), counted(batches), put)
+            finally:
+                batches.close()
+            put(_DONE)
+        except _ExportStopped:
+            pass
+        except Exception as e:
+            # Raised by the response instead
+            try:
+                put(e)
+            except _ExportStopped:
+                pass
+
+    export_metrics.started()
+    started_at = time.monotonic()
+    sent = 0
+    outcome: ExportOutcome = "cancelled"
+    # Not on the query executor: the worker waits for the client and would hold a query slot for the whole download
+    worker = export_executor.submit(db._engine.url, produce)
+    try:
+        while (item := await queue.get()) is not _DONE:
+            if isinstance(item, Exception):
+                outcome = "failed"
+                raise item
+            assert isinstance(item, bytes)
+            sent += len(item)
+            yield item
+        outcome = "completed"
+    except BaseException:
+        stopped.set()
+        # Interrupts the query if the worker is fetching rows, see QueryExecutor.on_cancel
+        worker.cancel()
+        raise
+    finally:
+        export_metrics.finished(outcome, rows, sent, time.monotonic() - started_at)
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import pickle
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import MetaData
+
+from dataline.config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedMetadata:
+    # Identifies the reflection arguments (schemas, included tables, ...) this metadata was built with
+    fingerprint: str
+    schemas: list[str]
+    all_tables_per_schema: dict[str, set[str]]
+    metadata: MetaData
+
+
+class MetadataCache:
+    """
+    Cache of reflected database metadata, keyed by connection DSN.
+
+    Reflection runs several queries per table, which adds seconds to every chat message on large warehouses.
+    Entries are kept in memory and pickled under the data directory so they survive restarts. Pickling is done in
+    the background `write_delay` seconds after an entry is set, tables reflected lazily one after the other are
+    written once. They are invalidated when a connection's schema is refreshed or the connection is updated.
+    """
+
+    def __init__(self, directory: Path | None = None, write_delay: float = config.metadata_cache_write_delay) -> None:
+        self._directory = directory
+        self.write_delay = write_delay
+        self._entries: dict[str, CachedMetadata] = {}
+        self._lock = threading.Lock()
+        self._reflection_locks: dict[str, threading.RLock] = {}
+        self._pending_writes: dict[str, threading.Timer] = {}
+
+    @property
+    def directory(self) -> Path:
+        # Resolved when used, the data directory can be changed after the cache is created (ex. in tests)
+        return self._directory or Path(config.data_directory) / "metadata_cache"
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.pickle"
+
+    def get(self, key: str, fingerprint: str) -> CachedMetadata | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load(key)
+            if entry is not None:
+                with self._lock:
+                    self._entries[key] = entry
+
+        if entry is None or entry.fingerprint != fingerprint:
+            return None
+        return entry
+
+    def set(self, key: str, entry: CachedMetadata) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            if key in self._pending_writes:
+                # Written with the pending write
+                return
+            if self.write_delay > 0:
+                timer = threading.Timer(self.write_delay, self._write, args=(key,))
+                timer.daemon = True
+                self._pending_writes[key] = timer
+                timer.start()
+                return
+        self._write(key)
+
+    def invalidate(self, key: str) -> None:
+        with self.reflection_lock(key):
+            with self._lock:
+                self._entries.pop(key, None)
+                timer = self._pending_writes.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            self._path(key).unlink(missing_ok=True)
+
+    def flush(self) -> None:
+        """Write the entries waiting to be written now, ex. on shutdown."""
+        with self._lock:
+            pending = list(self._pending_writes.items())
+        for key, timer in pending:
+            timer.cancel()
+            self._write(key)
+
+    def reflection_lock(self, key: str | None) -> threading.RLock:
+        """
+        Lock to hold while reflecting into the metadata cached under `key`, MetaData is not thread safe.
+        Databases that don't share metadata (no key) get a lock of their own, so they never wait on each other.
+        """
+        if key is None:
+            return threading.RLock()
+        with self._lock:
+            return self._reflection_locks.setdefault(key, threading.RLock())
+
+    def _load(self, key: str) -> CachedMetadata | None:
+        path = self._path(key)
+        if not path.is_file():
+            return None
+        try:
+            with path.open("rb") as f:
+                entry = pickle.load(f)
+            if not isinstance(entry, CachedMetadata):
+                raise TypeError(f"Unexpected metadata cache entry type: {type(entry)}")
+            return entry
+        except Exception:
+            # Stale or corrupt cache file (ex. written by an older SQLAlchemy version), reflect again
+            logger.warning("Could not load cached metadata from %s", path, exc_info=True)
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write(self, key: str) -> None:
+        # Pickling reads the metadata, it must not be reflected into meanwhile
+        with self.reflection_lock(key):
+            with self._lock:
+                self._pending_writes.pop(key, None)
+                entry = self._entries.get(key)
+            # Unless invalidated in the meantime
+            if entry is not None:
+                self._dump(key, entry)
+
+    def _dump(self, key: str, entry: CachedMetadata) -> None:
+        path = self._path(key)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with tmp_path.open("wb") as f:
+                pickle.dump(entry, f)
+            tmp_path.replace(path)
+        except Exception:
+            # Some dialect types cannot be pickled, in-memory caching still applies
+            logger.warning("Could not persist metadata cache to %s", path, exc_info=True)
+
+
+metadata_cache = MetadataCache()
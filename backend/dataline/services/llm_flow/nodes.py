@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import cast
+from typing import Awaitable, cast
 
 from langchain_core.messages import AIMessage, BaseMessage, ToolCall, ToolMessage
 from langchain_core.utils.function_calling import convert_to_openai_function
@@ -25,7 +25,7 @@ class Node(ABC):
 
     @classmethod
     @abstractmethod
-    def run(cls, state: QueryGraphState) -> QueryGraphStateUpdate:
+    def run(cls, state: QueryGraphState) -> QueryGraphStateUpdate | Awaitable[QueryGraphStateUpdate]:
         raise NotImplementedError
 
 
@@ -81,7 +81,7 @@ class CallToolNode(Node):
     __name__ = "perform_action"
 
     @classmethod
-    def run(cls, state: QueryGraphState) -> QueryGraphStateUpdate:
+    async def run(cls, state: QueryGraphState) -> QueryGraphStateUpdate:
         messages = state.messages
         last_message = cast(AIMessage, messages[-1])
 
@@ -94,13 +94,13 @@ class CallToolNode(Node):
         for tool_call in last_message.tool_calls:
             tool = state.tool_executor.tool_map[tool_call["name"]]
             if isinstance(tool, StateUpdaterTool):
-                updates = tool.get_response(state, tool_call["args"], str(tool_call["id"]))
+                updates = await tool.aget_response(state, tool_call["args"], str(tool_call["id"]))
                 output_messages.extend(updates["messages"])
                 results.extend(updates["results"])
 
             else:
                 # We call the tool_executor and get back a response
-                response = tool.run(tool_call["args"])
+                response = await tool.arun(tool_call["args"])
                 # We use the response to create a ToolMessage
                 tool_message = ToolMessage(
                     content=str(response), name=tool_call["name"], tool_call_id=str(tool_call["id"])
@@ -0,0 +1,230 @@
+import copy
+import re
+from decimal import Decimal
+from typing import Any, Callable, Sequence, cast
+
+from sqlalchemy import ColumnElement, Dialect, Select, String, and_, case, column, literal_column, or_, select, text
+from sqlalchemy import cast as sql_cast
+
+from dataline.errors import ValidationError
+from dataline.models.result.schema import KEYSET_TYPES, PageCursor, RowFilter
+from dataline.utils.columnar import ColumnarResult
+
+# Single SELECT statements, also used to tell which queries can be wrapped or cached
+_SELECT_START = re.compile(r"^(select|with)\b", re.IGNORECASE)
+_SELECT_INTO = re.compile(r"\binto\b", re.IGNORECASE)
+_ORDER_BY = re.compile(r"\border\s+by\b", re.IGNORECASE)
+
+
+def _encode_value(value: Any, max_string_length: int | None) -> tuple[Any, str | None] | None:  # type: ignore[misc]
+    """JSON value and type of a keyset value, None if it would not compare exactly with the database value."""
+    value_type = type(value).__name__
+    if value_type in KEYSET_TYPES:
+        return (str(value) if isinstance(value, Decimal) else value.isoformat()), value_type
+    if value is None or isinstance(value, (bool, int, float)):
+        return value, None
+    if isinstance(value, str) and (max_string_length is None or len(value) < max_string_length):
+        return value, None
+    # Truncated strings, bytes, UUIDs...
+    return None
+
+
+def next_cursor(cursor: PageCursor, page: ColumnarResult, max_string_length: int | None = None) -> PageCursor:
+    """
+    Cursor of the page after `page`. With a key column, the next page continues after the sort and key values of
+    the last row (keyset), otherwise it skips the rows of the previous pages (OFFSET).
+    """
+    following = cursor.model_copy(update={"offset": cursor.offset + page.num_rows, "keyset": False})
+    if cursor.key is None or not page.num_rows:
+        return following
+
+    last_row = {name: page.arrays[page.columns.index(name)][-1] for name in (cursor.sort_by, cursor.key) if name}
+    last = _encode_value(last_row[cursor.sort_by], max_string_length) if cursor.sort_by else (None, None)
+    last_key = _encode_value(last_row[cursor.key], max_string_length)
+    if last is None or last_key is None or last_key[0] is None:
+        return following
+    following.keyset = True
+    (following.last, following.last_type), (following.last_key, following.last_key_type) = last, last_key
+    return following
+
+
+def paginate_query(
+    query: str,
+    dialect: Dialect,
+    cursor: PageCursor,
+    limit: int,
+    filters: Sequence[RowFilter] = (),
+) -> str:
+    """
+    Wrap a query to select one page of its rows, filtered and sorted on the database.
+
+    The query becomes a subquery (`SELECT * FROM (<query>) AS page_query ...`), compiled for the dialect of the
+    connection so LIMIT/OFFSET, TOP or FETCH FIRST are rendered as it expects. NULLs are sorted last everywhere.
+    With a key column (unique values, ex. the primary key), pages after the first continue after the last row
+    (keyset) instead of skipping the rows of the previous pages, rows with the same sort value are ordered by it.
+    """
+    statement_sql = query.strip().rstrip(";").strip()
+    match = _SELECT_START.match(statement_sql)
+    if match is None or ";" in statement_sql or _SELECT_INTO.search(statement_sql):
+        raise ValidationError("Only single SELECT queries can be paged")
+    # T-SQL does not allow CTEs, nor ORDER BY without TOP, in derived tables
+    if dialect.name == "mssql" and (match.group(1).lower() == "with" or _ORDER_BY.search(statement_sql)):
+        raise ValidationError("Queries with WITH or ORDER BY can't be paged on SQL Server, sort the pages instead")
+
+    names = {row_filter.column for row_filter in filters} | {name for name in (cursor.sort_by, cursor.key) if name}
+    # Trailing comments of the query must not swallow the closing parenthesis
+    subquery = text(statement_sql + "\n").columns(*(column(name) for name in sorted(names)))
+    page_query = subquery.subquery("page_query")
+    statement: Select[Any] = select(literal_column("*")).select_from(page_query)  # type: ignore[misc]
+
+    for row_filter in filters:
+        statement = statement.where(_filter_clause(page_query.c[row_filter.column], row_filter))
+
+    if cursor.sort_by is not None:
+        sort_column = page_query.c[cursor.sort_by]
+        statement = statement.order_by(
+            case((sort_column.is_(None), 1), else_=0), sort_column.desc() if cursor.descending else sort_column
+        )
+    if cursor.key is not None and cursor.key != cursor.sort_by:
+        key_column = page_query.c[cursor.key]
+        statement = statement.order_by(key_column.desc() if cursor.descending else key_column)
+    elif cursor.sort_by is None and dialect.name == "mssql":
+        # OFFSET requires an ORDER BY on SQL Server
+        statement = statement.order_by(text("(SELECT NULL)"))
+
+    if cursor.keyset and cursor.key is not None:
+        statement = statement.where(_after_clause(page_query.c, cursor))
+    elif cursor.offset:
+        statement = statement.offset(cursor.offset)
+
+    return str(statement.limit(limit).compile(dialect=_text_dialect(dialect), compile_kwargs={"literal_binds": True}))
+
+
+def _text_dialect(dialect: Dialect) -> Dialect:
+    """
+    The dialect to render SQL executed with text() for. Percent signs are escaped for "format" paramstyle drivers
+    when text() is compiled, the SQL must not be escaped before.
+    """
+    if not dialect.identifier_preparer._double_percents:
+        return dialect
+    text_dialect = copy.copy(dialect)
+    # Literal processors are memoized per dialect and read the escaping of the dialect they were made for
+    text_dialect.__dict__.pop("_type_memos", None)
+    text_dialect.identifier_preparer = copy.copy(dialect.identifier_preparer)
+    text_dialect.identifier_preparer._double_percents = False
+    return text_dialect
+
+
+def _after_clause(columns: Any, cursor: PageCursor) -> ColumnElement[bool]:  # type: ignore[misc]
+    """Rows after the last row of the previous page, in the order of paginate_query."""
+    assert cursor.key is not None
+    last, last_key = cursor.last_values()
+    key_column = columns[cursor.key]
+    after_key = key_column < last_key if cursor.descending else key_column > last_key
+    if cursor.sort_by is None or cursor.sort_by == cursor.key:
+        return after_key
+
+    sort_column = columns[cursor.sort_by]
+    if last is None:
+        # In the NULLs, sorted last
+        return and_(sort_column.is_(None), after_key)
+    after_sort = sort_column < last if cursor.descending else sort_column > last
+    return or_(after_sort, and_(sort_column == last, after_key), sort_column.is_(None))
+
+
+def _filter_clause(sql_column: ColumnElement[Any], row_filter: RowFilter) -> ColumnElement[bool]:  # type: ignore[misc]
+    value = row_filter.value
+    match row_filter.op:
+        case "eq":
+            return sql_column.is_(None) if value is None else sql_column == value
+        case "ne":
+            return sql_column.is_not(None) if value is None else (sql_column != value) | sql_column.is_(None)
+        case "lt":
+            return sql_column < value
+        case "le":
+            return sql_column <= value
+        case "gt":
+            return sql_column > value
+        case "ge":
+            return sql_column >= value
+        case "contains":
+            # Length given for SQL Server and MySQL, which cast to 30 characters otherwise
+            as_string = sql_cast(sql_column, String(4000))
+            return as_string.icontains(str(value), autoescape=True)
+
+
+def page_columnar(
+    data: ColumnarResult, cursor: PageCursor, limit: int, filters: Sequence[RowFilter] = ()
+) -> tuple[ColumnarResult, int]:
+    """
+    One page of an in-memory (ex. stored) result filtered and sorted like `paginate_query` does, and the number
+    of rows matching the filters.
+    """
+    sort_columns = [name for name in (cursor.key, cursor.sort_by) if name is not None]
+    for name in [row_filter.column for row_filter in filters] + sort_columns:
+        if name not in data.columns:
+            raise ValidationError(f"Unknown column: {name}")
+
+    indexes: list[int] | range = range(data.num_rows)
+    for row_filter in filters:
+        values = data.arrays[data.columns.index(row_filter.column)]
+        indexes = [index for index in indexes if _matches(values[index], row_filter)]
+
+    # Sorts are stable, rows with the same sort value stay ordered by the key
+    for name in sort_columns:
+        indexes = _sorted_indexes(data.arrays[data.columns.index(name)], indexes, cursor.descending)
+
+    page_indexes = indexes[cursor.offset : cursor.offset + limit]
+    page = ColumnarResult(data.columns, [[array[index] for index in page_indexes] for array in data.arrays])
+    return page, len(indexes)
+
+
+def _sorted_indexes(values: list[Any], indexes: Sequence[int], descending: bool) -> list[int]:  # type: ignore[misc]
+    nulls = [index for index in indexes if values[index] is None]
+    not_null = [index for index in indexes if values[index] is not None]
+    key: Callable[[int], Any] = values.__getitem__  # type: ignore[misc]
+    if all(isinstance(values[index], str) for index in not_null):
+        # Stored decimals are strings, sort them as numbers
+        try:
+            numbers = {index: float(values[index]) for index in not_null}
+            key = numbers.__getitem__
+        except ValueError:
+            pass
+    try:
+        not_null.sort(key=key, reverse=descending)
+    except TypeError:
+        # Mixed types (ex. numbers and strings)
+        not_null.sort(key=lambda index: str(values[index]), reverse=descending)
+    return not_null + nulls
+
+
+def _matches(value: Any, row_filter: RowFilter) -> bool:  # type: ignore[misc]
+    target = row_filter.value
+    if row_filter.op == "contains":
+        return value is not None and str(target).lower() in str(value).lower()
+    if value is None or target is None:
+        # Like IS (NOT) NULL, other comparisons with NULL are never true
+        if row_filter.op == "eq":
+            return value is None and target is None
+        return row_filter.op == "ne" and not (value is None and target is None)
+
+    # Stored decimals are strings, compare them as numbers
+    if isinstance(value, str) and isinstance(target, (int, float)) and not isinstance(target, bool):
+        try:
+            value = float(value)
+        except ValueError:
+            return row_filter.op == "ne"
+    try:
+        return cast(bool, _OPERATORS[row_filter.op](value, target))
+    except TypeError:
+        return row_filter.op == "ne"
+
+
+_OPERATORS: dict[str, Callable[[Any, Any], Any]] = {  # type: ignore[misc]
+    "eq": lambda a, b: a == b,
+    "ne": lambda a, b: a != b,
+    "lt": lambda a, b: a < b,
+    "le": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "ge": lambda a, b: a >= b,
+}
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, TypeVar, cast
+
+from sqlalchemy import Connection, Engine, event, text
+from sqlalchemy.engine.interfaces import AdaptedConnection, DBAPIConnection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import ConnectionPoolEntry
+
+from dataline.config import config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQLite VM instructions between two deadline checks
+_SQLITE_PROGRESS_STEPS = 10_000
+
+
+def resolve_statement_timeout(timeout: int | None) -> int | None:
+    """Timeout in seconds of a connection (None uses the configured default), None when disabled."""
+    if timeout is None:
+        timeout = config.query_statement_timeout
+    return timeout or None
+
+
+def _execute_on_connect(dbapi_connection: DBAPIConnection, statement: str) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(statement)
+    finally:
+        cursor.close()
+    # Otherwise the setting is rolled back with the transaction the driver opened for it
+    dbapi_connection.commit()
+
+
+def _set_mysql_timeout(dbapi_connection: DBAPIConnection, timeout: int) -> None:
+    try:
+        _execute_on_connect(dbapi_connection, f"SET SESSION MAX_EXECUTION_TIME = {timeout * 1000}")
+    except Exception:
+        # MariaDB names it differently, in seconds
+        _execute_on_connect(dbapi_connection, f"SET SESSION max_statement_time = {timeout}")
+
+
+def _install_sqlite_deadline(engine: Engine, timeout: int | None) -> None:
+    """
+    SQLite has no statement timeout, statements are aborted from a progress handler once past their deadline.
+    Installed even without a timeout, cancelled async queries are stopped by expiring the deadline.
+    """
+
+    @event.listens_for(engine, "connect")
+    def set_progress_handler(dbapi_connection: DBAPIConnection, connection_record: ConnectionPoolEntry) -> None:
+        deadline = [float("inf")]
+        connection_record.info["statement_deadline"] = deadline
+        connection_record.info["statement_timeout"] = timeout
+
+        def handler() -> int:
+            return int(time.monotonic() > deadline[0])
+
+        if isinstance(dbapi_connection, AdaptedConnection):
+            # aiosqlite runs the handler on its own thread
+            dbapi_connection.run_async(lambda conn: conn.set_progress_handler(handler, _SQLITE_PROGRESS_STEPS))
+        else:
+            cast(sqlite3.Connection, dbapi_connection).set_progress_handler(handler, _SQLITE_PROGRESS_STEPS)
+
+    if timeout:
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def start_deadline(connection: Connection, *args: Any) -> None:  # type: ignore[misc]
+            deadline = connection.info.get("statement_deadline")
+            if deadline is not None:
+                deadline[0] = time.monotonic() + timeout
+
+
+def restart_statement_deadline(connection_info: dict[str, Any]) -> None:  # type: ignore[misc]
+    """
+    Give the statement of an SQLite connection its whole timeout again, before fetching more of its rows.
+    Rows of a streamed statement are computed as they are fetched, the time the reader spends in between (ex. a slow
+    download) does not count. `connection_info` is the pool record info of the connection.
+    """
+    deadline = connection_info.get("statement_deadline")
+    timeout = connection_info.get("statement_timeout")
+    # Stays expired once the statement was cancelled
+    if deadline is not None and timeout and deadline[0] != float("-inf"):
+        deadline[0] = time.monotonic() + timeout
+
+
+def apply_statement_timeout(engine: Engine, timeout: int | None) -> None:
+    """
+    Abort statements running longer than `timeout` seconds on connections of this engine.
+    Applied per dialect when connections are opened, dialects without a known setting are left as is.
+    """
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        _install_sqlite_deadline(engine, timeout)
+    if not timeout:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_timeout(dbapi_connection: DBAPIConnection, connection_record: ConnectionPoolEntry) -> None:
+        try:
+            if dialect == "postgresql":
+                _execute_on_connect(dbapi_connection, f"SET statement_timeout = {timeout * 1000}")
+            elif dialect == "mysql":
+                _set_mysql_timeout(dbapi_connection, timeout)
+            elif dialect == "snowflake":
+                _execute_on_connect(dbapi_connection, f"ALTER SESSION SET STATEMENT_TIMEOUT_IN_SECONDS = {timeout}")
+            elif dialect == "mssql":
+                # pyodbc query timeout, raises once the server did not answer in time
+                setattr(dbapi_connection, "timeout", timeout)
+        except Exception:
+            # Better to run without a timeout than not to run at all
+            logger.warning("Could not set statement timeout for %s", dialect, exc_info=True)
+
+
+def is_statement_interrupted(error: DBAPIError) -> bool:
+    """Whether the statement was stopped by a statement timeout or a cancellation (and should not be retried)."""
+    orig = error.orig
+    # Postgres query_canceled
+    if getattr(orig, "pgcode", None) == "57014":
+        return True
+    code = orig.args[0] if orig is not None and orig.args else None
+    # MySQL query interrupted / max execution time exceeded, MSSQL (ODBC) timeout expired, SQLite interrupted
+    return code in (1317, 3024, "HYT00", "interrupted") or getattr(orig, "errno", None) in (604, 630)
+
+
+def cancel_running_query(connection: Connection) -> None:
+    """
+    Ask the database to stop the statement running on this connection, from another thread.
+    Dialects without a way to do so rely on the statement timeout.
+    """
+    dialect = connection.dialect.name
+    dbapi_connection = connection.connection.dbapi_connection
+    if dbapi_connection is None:
+        return
+
+    if dialect == "postgresql" and hasattr(dbapi_connection, "cancel"):
+        # psycopg2 sends a cancel request over a separate socket
+        dbapi_connection.cancel()
+    elif dialect == "sqlite":
+        cast(sqlite3.Connection, dbapi_connection).interrupt()
+    elif dialect == "mysql" and hasattr(dbapi_connection, "thread_id"):
+        thread_id = int(dbapi_connection.thread_id())
+        engine = connection.engine
+
+        def kill_query() -> None:
+            # The connection is busy, the statement can only be killed from another one
+            with engine.connect() as kill_connection:
+                kill_connection.execute(text(f"KILL QUERY {thread_id}"))
+
+        threading.Thread(target=kill_query, name="kill-query", daemon=True).start()
+
+
+async def await_interruptible(awaitable: Awaitable[T], connection_info: dict[str, Any]) -> T:  # type: ignore[misc]
+    """
+    Await a driver call of an async connection, stopping its statement if cancelled.
+    `connection_info` is the pool record info of the connection.
+
+    asyncpg cancels the statement of a cancelled task itself. aiosqlite keeps running it on its own thread, and
+    SQLAlchemy waits for that while cleaning up the cancelled connection. So the call runs in its own task and
+    the SQLite deadline (see `_install_sqlite_deadline`) is expired before that task is cancelled.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        deadline = connection_info.get("statement_deadline")
+        if deadline is not None:
+            deadline[0] = float("-inf")
+        task.cancel()
+        await asyncio.wait([task])
+        raise
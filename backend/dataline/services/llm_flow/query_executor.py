@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterator, ParamSpec, TypeVar
+
+from sqlalchemy import URL, make_url
+
+from dataline.config import config
+from dataline.models.metrics.schema import ConnectionQueryStats, QueryExecutorStats
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+@dataclass
+class _ConnectionQueue:
+    running: int = 0
+    pending: deque[Callable[[], object]] = field(default_factory=deque)
+    max_queued: int = 0
+    completed: int = 0
+    failed: int = 0
+    # Calls cancelled while waiting for a slot, left out of the average wait
+    cancelled: int = 0
+    total_wait_seconds: float = 0.0
+
+
+class _QueryFuture(Future[T]):
+    """Future that interrupts the running call when cancelled, see `QueryExecutor.on_cancel`."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.cancel_callbacks: list[Callable[[], None]] = []
+        self.cancel_requested = False
+
+    def cancel(self) -> bool:
+        if super().cancel():
+            return True
+        # Already running, a plain Future can't be cancelled anymore
+        self.cancel_requested = True
+        for callback in list(self.cancel_callbacks):
+            try:
+                callback()
+            except Exception:
+                logger.warning("Could not interrupt cancelled query", exc_info=True)
+        return False
+
+
+class QueryExecutor:
+    """
+    Bounded thread pool for all work against user databases (queries, reflection).
+
+    DBAPI calls block, so running them on the event loop lets one slow warehouse query stall every request in the
+    process. At most `max_concurrency_per_connection` calls run per connection at a time. The rest wait in a
+    per-connection queue without holding a worker thread, so one busy connection can't starve the others.
+    Native async queries don't need a thread but take a slot of the same queue (see `slot`).
+    """
+
+    # Shared by all executors, so a call running on any of them can be interrupted with `on_cancel` and runs the
+    # `run` calls it makes inline
+    _local = threading.local()
+
+    def __init__(
+        self,
+        max_workers: int = config.query_executor_max_workers,
+        max_concurrency_per_connection: int = config.query_max_concurrency_per_connection,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_concurrency_per_connection = max_concurrency_per_connection
+        self._executor: ThreadPoolExecutor | None = None
+        self._queues: dict[str, _ConnectionQueue] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(dsn: str | URL) -> str:
+        url = make_url(dsn) if isinstance(dsn, str) else dsn
+        return url.render_as_string(hide_password=True)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="user-db")
+            return self._executor
+
+    def _acquire(self, key: str, start: Callable[[], object]) -> None:
+        """Call `start` once the connection has a free slot, the slot is held until `_release`."""
+        with self._lock:
+            queue = self._queues.setdefault(key, _ConnectionQueue())
+            dispatch = queue.running < self.max_concurrency_per_connection
+            if dispatch:
+                queue.running += 1
+            else:
+                queue.pending.append(start)
+                queue.max_queued = max(queue.max_queued, len(queue.pending))
+
+        if dispatch:
+            start()
+
+    def _release(self, key: str, failed: bool, cancelled: bool = False) -> None:
+        with self._lock:
+            queue = self._queues[key]
+            if cancelled:
+                queue.cancelled += 1
+            elif failed:
+                queue.failed += 1
+            else:
+                queue.completed += 1
+            # Hand the slot over to the next queued call of this connection
+            next_start = queue.pending.popleft() if queue.pending else None
+            if next_start is None:
+                queue.running -= 1
+
+        if next_start is not None:
+            next_start()
+
+    def _record_wait(self, key: str, submitted_at: float) -> None:
+        with self._lock:
+            self._queues[key].total_wait_seconds += time.monotonic() - submitted_at
+
+    def submit(self, dsn: str | URL, fn: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> Future[T]:
+        """Schedule `fn` to run against the database at `dsn`, once the connection has a free slot."""
+        key = self._key(dsn)
+        future: _QueryFuture[T] = _QueryFuture()
+        submitted_at = time.monotonic()
+
+        def run() -> None:
+            # Skip calls cancelled while they were queued
+            if not future.set_running_or_notify_cancel():
+                self._release(key, failed=False, cancelled=True)
+                return
+            self._record_wait(key, submitted_at)
+            failed = False
+            try:
+                self._local.active = True
+                self._local.future = future
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    failed = True
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+                finally:
+                    self._local.active = False
+                    self._local.future = None
+            finally:
+                self._release(key, failed)
+
+        self._acquire(key, lambda: self._get_executor().submit(run))
+        return future
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]) -> Iterator[None]:
+        """
+        Call `callback` if the executor call running this block is cancelled (ex. the awaiting request went away).
+        It is called from the cancelling thread, so it must be thread safe and must not block (ex. cancel a cursor).
+        """
+        future: _QueryFuture[object] | None = getattr(self._local, "future", None)
+        if future is None:
+            yield
+            return
+
+        future.cancel_callbacks.append(callback)
+        try:
+            yield
+        finally:
+            future.cancel_callbacks.remove(callback)
+
+    def cancel_requested(self) -> bool:
+        """Whether the executor call running on this thread was cancelled."""
+        future: _QueryFuture[object] | None = getattr(self._local, "future", None)
+        return future is not None and future.cancel_requested
+
+    @asynccontextmanager
+    async def slot(self, dsn: str | URL) -> AsyncIterator[None]:
+        """Hold one of the connection's slots while awaiting a native async query."""
+        key = self._key(dsn)
+        loop = asyncio.get_running_loop()
+        acquired: asyncio.Future[None] = loop.create_future()
+        submitted_at = time.monotonic()
+
+        def set_acquired() -> None:
+            if not acquired.done():
+                acquired.set_result(None)
+
+        def start() -> None:
+            # May be called from an executor thread releasing its slot
+            loop.call_soon_threadsafe(set_acquired)
+
+        self._acquire(key, start)
+        try:
+            await acquired
+        except asyncio.CancelledError:
+            with self._lock:
+                queue = self._queues[key]
+                still_queued = start in queue.pending
+                if still_queued:
+                    queue.pending.remove(start)
+                    queue.cancelled += 1
+            if not still_queued:
+                # The slot was handed over while we were cancelled
+                self._release(key, failed=False, cancelled=True)
+            raise
+
+        self._record_wait(key, submitted_at)
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._release(key, failed)
+
+    def run(self, dsn: str | URL, fn: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        """
+        Run `fn` on the executor and wait for the result.
+        Calls made from an executor thread run inline, they are already part of a scheduled call.
+        """
+        if getattr(self._local, "active", False):
+            return fn(*args, **kwargs)
+        return self.submit(dsn, fn, *args, **kwargs).result()
+
+    async def arun(self, dsn: str | URL, fn: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        """
+        Run `fn` on the executor without blocking the event loop.
+        If cancelled while `fn` runs, it is interrupted (see `on_cancel`) and waited for, so the connection and
+        any state `fn` uses are free again once the cancellation goes through.
+        """
+        future = self.submit(dsn, fn, *args, **kwargs)
+        wrapped = asyncio.wrap_future(future)
+        try:
+            return await asyncio.shield(wrapped)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                await asyncio.wait([wrapped])
+                # The interrupted call usually fails, that is expected
+                if not wrapped.cancelled():
+                    wrapped.exception()
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> QueryExecutorStats:
+        with self._lock:
+            connections = [
+                ConnectionQueryStats(
+                    url=key,
+                    running=queue.running,
+                    queued=len(queue.pending),
+                    max_queued=queue.max_queued,
+                    completed=queue.completed,
+                    failed=queue.failed,
+                    cancelled=queue.cancelled,
+                    average_wait_seconds=(
+                        queue.total_wait_seconds / (queue.completed + queue.failed)
+                        if queue.completed + queue.failed
+                        else 0.0
+                    ),
+                )
+                for key, queue in self._queues.items()
+            ]
+        return QueryExecutorStats(
+            max_workers=self.max_workers,
+            max_concurrency_per_connection=self.max_concurrency_per_connection,
+            connections=connections,
+        )
+
+
+query_executor = QueryExecutor()
+# Result exports, which hold their slot until the client has downloaded everything
+export_executor = QueryExecutor(config.export_max_workers, config.export_max_concurrency_per_connection)
@@ -0,0 +1,624 @@
+"""
+Bulk schema reflection.
+
+SQLAlchemy's inspector reflects one table at a time (columns, primary key, foreign keys, ...), which costs several
+round trips per table on remote warehouses. The reflectors below read the requested tables (or a whole schema) from
+the catalog in a handful of queries and build the `Table` objects themselves. Anything they can't handle falls back to
+the inspector.
+"""
+
+import abc
+import logging
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Sequence, TypeVar
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    CursorResult,
+    Engine,
+    ForeignKeyConstraint,
+    MetaData,
+    PrimaryKeyConstraint,
+    Table,
+    bindparam,
+    text,
+)
+from sqlalchemy.sql import sqltypes
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+ColumnType = sqltypes.TypeEngine[Any]  # type: ignore[misc]
+
+# Longer lists of tables read the whole schema: big IN lists are no faster than a scan of the catalog,
+# and SQL Server caps a statement at 2100 parameters
+MAX_FILTERED_TABLES = 500
+
+
+@dataclass
+class ColumnInfo:
+    table: str
+    name: str
+    type: ColumnType
+    nullable: bool = True
+    default: str | None = None
+    autoincrement: bool = False
+
+
+@dataclass
+class ForeignKeyInfo:
+    table: str
+    name: str | None
+    referred_schema: str
+    referred_table: str
+    columns: list[str] = field(default_factory=list)
+    referred_columns: list[str] = field(default_factory=list)
+
+
+@dataclass
+class SchemaCatalog:
+    columns: list[ColumnInfo] = field(default_factory=list)
+    primary_keys: dict[str, list[str]] = field(default_factory=lambda: defaultdict(list))
+    primary_key_names: dict[str, str] = field(default_factory=dict)
+    foreign_keys: list[ForeignKeyInfo] = field(default_factory=list)
+
+    def update(self, other: "SchemaCatalog") -> None:
+        self.columns.extend(other.columns)
+        self.primary_keys.update(other.primary_keys)
+        self.primary_key_names.update(other.primary_key_names)
+        self.foreign_keys.extend(other.foreign_keys)
+
+
+def execute_catalog_query(  # type: ignore[misc]
+    connection: Connection, sql: str, params: dict[str, str], table_names: Sequence[str] | None
+) -> CursorResult[Any]:
+    """Run a catalog query, its `:table_names` filter (only present when `table_names` is given) is expanded."""
+    statement = text(sql)
+    if table_names is None:
+        return connection.execute(statement, params)
+    statement = statement.bindparams(bindparam("table_names", expanding=True))
+    return connection.execute(statement, {**params, "table_names": list(table_names)})
+
+
+def table_filter(column: str, table_names: Sequence[str] | None) -> str:
+    return "" if table_names is None else f"AND {column} IN :table_names "
+
+
+class BulkReflector(abc.ABC):
+    @abc.abstractmethod
+    def read_catalog(
+        self, connection: Connection, schema: str, table_names: Sequence[str] | None = None
+    ) -> SchemaCatalog:
+        """Read columns, primary keys and foreign keys of the given tables, or of every table in the schema."""
+        raise NotImplementedError
+
+    def resolve_type(
+        self,
+        connection: Connection,
+        data_type: str,
+        length: int | None = None,
+        precision: int | None = None,
+        scale: int | None = None,
+    ) -> ColumnType:
+        ischema_names: dict[str, type[ColumnType]] = getattr(connection.dialect, "ischema_names", {})
+        type_cls = ischema_names.get(data_type) or ischema_names.get(data_type.lower())
+        type_cls = type_cls or ischema_names.get(data_type.upper())
+        if type_cls is None:
+            return sqltypes.NullType()
+
+        try:
+            # ex. Postgres "timestamp with time zone"
+            with_time_zone = data_type.lower().endswith(" with time zone")
+            if issubclass(type_cls, (sqltypes.DateTime, sqltypes.Time)) and with_time_zone:
+                return type_cls(timezone=True)
+            if issubclass(type_cls, sqltypes.String) and length and length > 0:
+                return type_cls(length=length)
+            if issubclass(type_cls, sqltypes.Float):
+                return type_cls()
+            if issubclass(type_cls, sqltypes.Numeric) and precision is not None:
+                return type_cls(precision=precision, scale=scale)
+            return type_cls()
+        except TypeError:
+            # Some types need arguments we don't get from the catalog (ex. ENUM values)
+            return sqltypes.NullType()
+
+    def build_tables(
+        self, catalog: SchemaCatalog, metadata: MetaData, schema: str, table_names: Iterable[str]
+    ) -> set[str]:
+        """
+        Add the requested tables (and the tables they reference in the same schema) to the metadata.
+        Returns the requested tables that could not be built from the catalog.
+        """
+        columns_per_table: dict[str, list[ColumnInfo]] = defaultdict(list)
+        for column in catalog.columns:
+            columns_per_table[column.table].append(column)
+        foreign_keys_per_table: dict[str, list[ForeignKeyInfo]] = defaultdict(list)
+        for foreign_key in catalog.foreign_keys:
+            foreign_keys_per_table[foreign_key.table].append(foreign_key)
+
+        # Types we can't resolve from the catalog alone (arrays, enums, ...) are left to the inspector
+        unresolved_tables = {
+            table
+            for table, columns in columns_per_table.items()
+            if any(isinstance(c.type, sqltypes.NullType) for c in columns)
+        }
+        for table in unresolved_tables:
+            del columns_per_table[table]
+
+        requested = set(table_names)
+        missing = {name for name in requested if name not in columns_per_table}
+        # Unresolved tables referenced by the ones we build are needed to render their foreign keys
+        missing.update(
+            foreign_key.referred_table
+            for name in requested
+            for foreign_key in foreign_keys_per_table[name]
+            if foreign_key.referred_schema == schema and foreign_key.referred_table in unresolved_tables
+        )
+
+        # Foreign keys need their referred tables in the metadata to be rendered, pull them in
+        to_build: set[str] = set()
+        pending = [name for name in requested if name in columns_per_table]
+        while pending:
+            name = pending.pop()
+            if name in to_build:
+                continue
+            to_build.add(name)
+            for foreign_key in foreign_keys_per_table[name]:
+                if foreign_key.referred_schema == schema and foreign_key.referred_table in columns_per_table:
+                    pending.append(foreign_key.referred_table)
+
+        for name in sorted(to_build):
+            if f"{schema}.{name}" in metadata.tables:
+                continue
+
+            constraints: list[Any] = []  # type: ignore[misc]
+            if catalog.primary_keys.get(name):
+                constraints.append(
+                    PrimaryKeyConstraint(*catalog.primary_keys[name], name=catalog.primary_key_names.get(name))
+                )
+            for foreign_key in foreign_keys_per_table[name]:
+                # Tables from other schemas are not read, drop those constraints instead of failing to render them
+                referred_table = foreign_key.referred_table
+                if foreign_key.referred_schema != schema or (
+                    referred_table not in columns_per_table and referred_table not in missing
+                ):
+                    continue
+                constraints.append(
+                    ForeignKeyConstraint(
+                        foreign_key.columns,
+                        [f"{schema}.{foreign_key.referred_table}.{column}" for column in foreign_key.referred_columns],
+                        name=foreign_key.name,
+                    )
+                )
+
+            Table(
+                name,
+                metadata,
+                *[
+                    Column(
+                        column.name,
+                        column.type,
+                        nullable=column.nullable,
+                        autoincrement=column.autoincrement,
+                        server_default=text(column.default) if column.default is not None else None,
+                    )
+                    for column in columns_per_table[name]
+                ],
+                *constraints,
+                schema=schema,
+            )
+
+        return missing
+
+
+class SQLiteBulkReflector(BulkReflector):
+    def read_catalog(
+        self, connection: Connection, schema: str, table_names: Sequence[str] | None = None
+    ) -> SchemaCatalog:
+        catalog = SchemaCatalog()
+        quoted_schema = connection.dialect.identifier_preparer.quote_identifier(schema)
+        master = f"{quoted_schema}.sqlite_master"
+
+        rows = execute_catalog_query(
+            connection,
+            'SELECT m.name, p.name, p.type, p."notnull", p.dflt_value, p.pk '
+            f"FROM {master} AS m JOIN pragma_table_info(m.name, :schema) AS p "
+            "WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite~_%' ESCAPE '~' "
+            f"{table_filter('m.name', table_names)}"
+            "ORDER BY m.name, p.cid",
+            {"schema": schema},
+            table_names,
+        )
+        primary_keys: dict[str, list[tuple[int, str]]] = defaultdict(list)
+        resolve_type_affinity = getattr(connection.dialect, "_resolve_type_affinity")
+        for table_name, name, type_, notnull, default, pk in rows:
+            column_type = resolve_type_affinity(type_.upper()) if type_ else sqltypes.NullType()
+            catalog.columns.append(
+                ColumnInfo(table=table_name, name=name, type=column_type, nullable=not notnull, default=default)
+            )
+            if pk:
+                primary_keys[table_name].append((pk, name))
+        for table_name, pk_columns in primary_keys.items():
+            catalog.primary_keys[table_name] = [name for _, name in sorted(pk_columns)]
+
+        # REFERENCES without explicit columns point to the referred table's primary key, which may not be read
+        rows = execute_catalog_query(
+            connection,
+            'SELECT m.name, f.id, f."table", f."from", '
+            'COALESCE(f."to", (SELECT r.name FROM pragma_table_info(f."table", :schema) AS r WHERE r.pk = f.seq + 1)) '
+            f"FROM {master} AS m JOIN pragma_foreign_key_list(m.name, :schema) AS f "
+            f"WHERE m.type = 'table' {table_filter('m.name', table_names)}"
+            "ORDER BY m.name, f.id, f.seq",
+            {"schema": schema},
+            table_names,
+        )
+        foreign_keys: dict[tuple[str, int], ForeignKeyInfo] = {}
+        for table_name, fk_id, referred_table, from_column, to_column in rows:
+            foreign_key = foreign_keys.setdefault(
+                (table_name, fk_id),
+                ForeignKeyInfo(table=table_name, name=None, referred_schema=schema, referred_table=referred_table),
+            )
+            foreign_key.columns.append(from_column)
+            foreign_key.referred_columns.append(to_column)
+
+        for foreign_key in foreign_keys.values():
+            if None not in foreign_key.referred_columns:
+                catalog.foreign_keys.append(foreign_key)
+
+        return catalog
+
+
+class InformationSchemaBulkReflector(BulkReflector):
+    """Reads columns from information_schema.columns, subclasses implement key lookups."""
+
+    reflect_defaults = True
+    # SQL expression telling whether a column is auto incremented
+    autoincrement_expression = "NULL"
+
+    def read_columns(
+        self, connection: Connection, schema: str, table_names: Sequence[str] | None = None
+    ) -> list[ColumnInfo]:
+        rows = execute_catalog_query(
+            connection,
+            "SELECT table_name, column_name, data_type, character_maximum_length, numeric_precision, "
+            f"numeric_scale, is_nullable, column_default, {self.autoincrement_expression} "
+            f"FROM information_schema.columns WHERE table_schema = :schema {table_filter('table_name', table_names)}"
+            "ORDER BY table_name, ordinal_position",
+            {"schema": self.denormalize(connection, schema)},
+            self.denormalize_all(connection, table_names),
+        )
+        return [
+            ColumnInfo(
+                table=self.normalize(connection, table_name),
+                name=self.normalize(connection, name),
+                type=self.resolve_type(connection, data_type, length, precision, scale),
+                nullable=str(is_nullable).upper() in ("YES", "Y"),
+                default=default if self.reflect_defaults else None,
+                autoincrement=bool(autoincrement),
+            )
+            for table_name, name, data_type, length, precision, scale, is_nullable, default, autoincrement in rows
+        ]
+
+    def normalize(self, connection: Connection, name: str) -> str:
+        if getattr(connection.dialect, "requires_name_normalize", False):
+            return connection.dialect.normalize_name(name) or name
+        return name
+
+    def denormalize(self, connection: Connection, name: str) -> str:
+        if getattr(connection.dialect, "requires_name_normalize", False):
+            return connection.dialect.denormalize_name(name) or name
+        return name
+
+    def denormalize_all(self, connection: Connection, names: Sequence[str] | None) -> list[str] | None:
+        return None if names is None else [self.denormalize(connection, name) for name in names]
+
+
+_PG_FORMATTED_TYPE = re.compile(
+    r"^(?P<name>[^(\[]+)(?:\((?P<first>\d+)(?:,(?P<second>\d+))?\))?(?P<suffix>[^\[]*)(?P<array>\[\])*$"
+)
+
+
+class PostgresBulkReflector(BulkReflector):
+
+    def read_columns(
+        self, connection: Connection, schema: str, table_names: Sequence[str] | None = None
+    ) -> list[ColumnInfo]:
+        # information_schema.columns is a heavy view in Postgres, pg_catalog is several times faster
+        rows = execute_catalog_query(
+            connection,
+            "SELECT cl.relname, a.attname, format_type(a.atttypid, a.atttypmod), a.attnotnull, "
+            "pg_get_expr(d.adbin, d.adrelid) "
+            "FROM pg_catalog.pg_attribute a "
+            "JOIN pg_catalog.pg_class cl ON cl.oid = a.attrelid "
+            "JOIN pg_catalog.pg_namespace n ON n.oid = cl.relnamespace "
+            "LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum "
+            "WHERE n.nspname = :schema AND cl.relkind IN ('r', 'p', 'v', 'm', 'f') "
+            f"AND a.attnum > 0 AND NOT a.attisdropped {table_filter('cl.relname', table_names)}"
+            "ORDER BY cl.relname, a.attnum",
+            {"schema": schema},
+            table_names,
+        )
+        columns = []
+        for table_name, name, formatted_type, notnull, default in rows:
+            # ex. "character varying(40)", "numeric(12,2)", "timestamp(3) with time zone", "integer[]"
+            match = _PG_FORMATTED_TYPE.match(formatted_type)
+            if match is None or match.group("array"):
+                column_type: ColumnType = sqltypes.NullType()
+            else:
+                data_type = f"{match.group('name')}{match.group('suffix')}".strip()
+                first, second = (int(arg) if arg else None for arg in (match.group("first"), match.group("second")))
+                column_type = self.resolve_type(connection, data_type, first, first, second)
+            # Same as the inspector: sequence defaults are rendered as SERIAL columns
+            autoincrement = bool(default and default.startswith("nextval("))
+            columns.append(
+                ColumnInfo(
+                    table=table_name,
+                    name=name,
+                    type=column_type,
+                    nullable=not notnull,
+                    default=None if autoincrement else default,
+                    autoincrement=autoincrement,
+                )
+            )
+        return columns
+
+    def read_catalog(
+        self, connection: Connection, schema: str, table_names: Sequence[str] | None = None
+    ) -> SchemaCatalog:
+        catalog = SchemaCatalog(columns=self.read_columns(connection, schema, table_names))
+
+        # information_schema only lists constraints of tables the user owns, use pg_catalog instead
+        rows = execute_catalog_query(
+            connection,
+            "SELECT cl.relname, con.contype, con.conname, a.attname, fn.nspname, fcl.relname, fa.attname "
+            "FROM pg_catalog.pg_constraint con "
+            "JOIN pg_catalog.pg_class cl ON cl.oid = con.conrelid "
+            "JOIN pg_catalog.pg_namespace n ON n.oid = cl.relnamespace "
+            "CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, fattnum, ord) "
+            "JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum "
+            "LEFT JOIN pg_catalog.pg_class fcl ON fcl.oid = con.confrelid "
+            "LEFT JOIN pg_catalog.pg_namespace fn ON fn.oid = fcl.relnamespace "
+            "LEFT JOIN pg_catalog.pg_attribute fa ON fa.attrelid = con.confrelid AND fa.attnum = k.fattnum "
+            f"WHERE n.nspname = :schema AND con.contype IN ('p', 'f') {table_filter('cl.relname', table_names)}"
+            "ORDER BY cl.relname, con.conname, k.ord",
+            {"schema": schema},
+            table_names,
+        )
+        foreign_keys: dict[tuple[str, str], ForeignKeyInfo] = {}
+        for table_name, contype, conname, column, referred_schema, referred_table, referred_column in rows:
+            if contype == "p":
+                catalog.primary_keys[table_name].append(column)
+                catalog.primary_key_names[table_name] = conname
+                continue
+            foreign_key = foreign_keys.setdefault(
+                (table_name, conname),
+                ForeignKeyInfo(
+                    table=table_name, name=conname, referred_schema=referred_schema, referred_table=referred_table
+                ),
+            )
+            foreign_key.columns.append(column)
+            foreign_key.referred_columns.append(referred_column)
+        catalog.foreign_keys = list(foreign_keys.values())
+        return catalog
+
+
+class MySQLBulkReflector(InformationSchemaBulkReflector):
+    # MySQL reports string defaults unquoted, they can't be rendered back as SQL expressions
+    reflect_defaults = False
+    autoincrement_expression = "extra LIKE '%auto_increment%'"
+
+    def read_catalog(
+        self, connection: Connection, schema: str, table_names: Sequence[str] | None = None
+    ) -> SchemaCatalog:
+        catalog = SchemaCatalog(columns=self.read_columns(connection, schema, table_names))
+
+        # MySQL exposes the referenced columns directly on key_column_usage
+        rows = execute_catalog_query(
+            connection,
+            "SELECT table_name, constraint_name, column_name, "
+            "referenced_table_schema, referenced_table_name, referenced_column_name "
+            "FROM information_schema.key_column_usage WHERE table_schema = :schema "
+            "AND (constraint_name = 'PRIMARY' OR referenced_table_name IS NOT NULL) "
+            f"{table_filter('table_name', table_names)}"
+            "ORDER BY table_name, constraint_name, ordinal_position",
+            {"schema": schema},
+            table_names,
+        )
+        foreign_keys: dict[tuple[str, str], ForeignKeyInfo] = {}
+        for table_name, constraint_name, column, referred_schema, referred_table, referred_column in rows:
+            if constraint_name == "PRIMARY":
+                catalog.primary_keys[table_name].append(column)
+                continue
+            foreign_key = foreign_keys.setdefault(
+                (table_name, constraint_name),
+                ForeignKeyInfo(
+                    table=table_name,
+                    name=constraint_name,
+                    referred_schema=referred_schema,
+                    referred_table=referred_table,
+                ),
+            )
+            foreign_key.columns.append(column)
+            foreign_key.referred_columns.append(referred_column)
+        catalog.foreign_keys = list(foreign_keys.values())
+        return catalog
+
+
+class MSSQLBulkReflector(InformationSchemaBulkReflector):
+    autoincrement_expression = (
+        "COLUMNPROPERTY(OBJECT_ID(QUOTENAME(table_schema) + '.' + QUOTENAME(table_name)), column_name, 'IsIdentity')"
+    )
+
+    def read_catalog(
+        self, connection: Connection, schema: str, table_names: Sequence[str] | None = None
+    ) -> SchemaCatalog:
+        catalog = SchemaCatalog(columns=self.read_columns(connection, schema, table_names))
+
+        rows = execute_catalog_query(
+            connection,
+            "SELECT kcu.table_name, kcu.column_name "
+            "FROM information_schema.table_constraints tc "
+            "JOIN information_schema.key_column_usage kcu ON kcu.constraint_schema = tc.constraint_schema "
+            "AND kcu.constraint_name = tc.constraint_name AND kcu.table_name = tc.table_name "
+            "WHERE tc.constraint_type = 'PRIMARY KEY' AND tc.table_schema = :schema "
+            f"{table_filter('tc.table_name', table_names)}"
+            "ORDER BY kcu.table_name, kcu.ordinal_position",
+            {"schema": schema},
+            table_names,
+        )
+        for table_name, column in rows:
+            catalog.primary_keys[table_name].append(column)
+
+        # SQL Server's key_column_usage has no position_in_unique_constraint, match on ordinal position
+        rows = execute_catalog_query(
+            connection,
+            "SELECT kcu.table_name, kcu.constraint_name, kcu.column_name, "
+            "rkcu.table_schema, rkcu.table_name, rkcu.column_name "
+            "FROM information_schema.referential_constraints rc "
+            "JOIN information_schema.key_column_usage kcu ON kcu.constraint_schema = rc.constraint_schema "
+            "AND kcu.constraint_name = rc.constraint_name "
+            "JOIN information_schema.key_column_usage rkcu ON rkcu.constraint_schema = rc.unique_constraint_schema "
+            "AND rkcu.constraint_name = rc.unique_constraint_name AND rkcu.ordinal_position = kcu.ordinal_position "
+            f"WHERE kcu.table_schema = :schema {table_filter('kcu.table_name', table_names)}"
+            "ORDER BY kcu.table_name, kcu.constraint_name, kcu.ordinal_position",
+            {"schema": schema},
+            table_names,
+        )
+        foreign_keys: dict[tuple[str, str], ForeignKeyInfo] = {}
+        for table_name, constraint_name, column, referred_schema, referred_table, referred_column in rows:
+            foreign_key = foreign_keys.setdefault(
+                (table_name, constraint_name),
+                ForeignKeyInfo(
+                    table=table_name,
+                    name=constraint_name,
+                    referred_schema=referred_schema,
+                    referred_table=referred_table,
+                ),
+            )
+            foreign_key.columns.append(column)
+            foreign_key.referred_columns.append(referred_column)
+        catalog.foreign_keys = list(foreign_keys.values())
+        return catalog
+
+
+class SnowflakeBulkReflector(InformationSchemaBulkReflector):
+    autoincrement_expression = "is_identity = 'YES'"
+
+    def read_catalog(
+        self, connection: Connection, schema: str, table_names: Sequence[str] | None = None
+    ) -> SchemaCatalog:
+        catalog = SchemaCatalog(columns=self.read_columns(connection, schema, table_names))
+        quoted_schema = connection.dialect.identifier_preparer.quote_identifier(self.denormalize(connection, schema))
+        wanted = set(table_names) if table_names is not None else None
+
+        # Snowflake's information_schema has no key usage views, SHOW commands cover the whole schema at once
+        # and can't be filtered on tables
+        primary_keys = connection.execute(text(f"SHOW PRIMARY KEYS IN SCHEMA {quoted_schema}")).mappings()
+        for row in sorted(primary_keys, key=lambda r: (r["table_name"], r["key_sequence"])):
+            table_name = self.normalize(connection, row["table_name"])
+            if wanted is None or table_name in wanted:
+                catalog.primary_keys[table_name].append(self.normalize(connection, row["column_name"]))
+
+        imported_keys = connection.execute(text(f"SHOW IMPORTED KEYS IN SCHEMA {quoted_schema}")).mappings()
+        foreign_keys: dict[tuple[str, str], ForeignKeyInfo] = {}
+        for row in sorted(imported_keys, key=lambda r: (r["fk_table_name"], r["fk_name"], r["key_sequence"])):
+            table_name = self.normalize(connection, row["fk_table_name"])
+            if wanted is not None and table_name not in wanted:
+                continue
+            foreign_key = foreign_keys.setdefault(
+                (table_name, row["fk_name"]),
+                ForeignKeyInfo(
+                    table=table_name,
+                    name=self.normalize(connection, row["fk_name"]),
+                    referred_schema=self.normalize(connection, row["pk_schema_name"]),
+                    referred_table=self.normalize(connection, row["pk_table_name"]),
+                ),
+            )
+            foreign_key.columns.append(self.normalize(connection, row["fk_column_name"]))
+            foreign_key.referred_columns.append(self.normalize(connection, row["pk_column_name"]))
+        catalog.foreign_keys = list(foreign_keys.values())
+        return catalog
+
+
+BULK_REFLECTORS: dict[str, BulkReflector] = {
+    "sqlite": SQLiteBulkReflector(),
+    "postgresql": PostgresBulkReflector(),
+    "mysql": MySQLBulkReflector(),
+    "mssql": MSSQLBulkReflector(),
+    "snowflake": SnowflakeBulkReflector(),
+}
+
+
+def read_schema_catalog(engine: Engine, schema: str, table_names: Iterable[str] | None = None) -> SchemaCatalog | None:
+    """
+    Read the catalog of the given tables of a schema, along with the tables they reference in it (their foreign keys
+    are rendered against them), or of the whole schema if no tables are given.
+    Returns None if the dialect is not supported or the catalog queries fail.
+    """
+    reflector = BULK_REFLECTORS.get(engine.dialect.name)
+    if reflector is None:
+        return None
+
+    try:
+        with engine.connect() as connection:
+            if table_names is None:
+                return reflector.read_catalog(connection, schema)
+
+            catalog = SchemaCatalog()
+            read: set[str] = set()
+            pending = set(table_names)
+            while pending:
+                if len(read) + len(pending) > MAX_FILTERED_TABLES:
+                    return reflector.read_catalog(connection, schema)
+                part = reflector.read_catalog(connection, schema, sorted(pending))
+                catalog.update(part)
+                read.update(pending)
+                pending = {fk.referred_table for fk in part.foreign_keys if fk.referred_schema == schema} - read
+            return catalog
+    except Exception:
+        logger.warning("Bulk reflection failed for schema %s, falling back to inspector", schema, exc_info=True)
+        return None
+
+
+def build_schema_tables(
+    engine: Engine, catalog: SchemaCatalog, metadata: MetaData, schema: str, table_names: Iterable[str]
+) -> set[str]:
+    """
+    Build the tables of a schema from its catalog into the metadata.
+    Returns the tables that still need to be reflected with the inspector.
+    """
+    table_names = set(table_names)
+    try:
+        return BULK_REFLECTORS[engine.dialect.name].build_tables(catalog, metadata, schema, table_names)
+    except Exception:
+        logger.warning("Bulk reflection failed for schema %s, falling back to inspector", schema, exc_info=True)
+        return table_names
+
+
+def bulk_reflect(engine: Engine, metadata: MetaData, schema: str, table_names: Iterable[str]) -> set[str]:
+    """
+    Reflect the tables of a schema into the metadata using catalog queries where the dialect supports it.
+    Returns the tables that still need to be reflected with the inspector.
+    """
+    table_names = set(table_names)
+    catalog = read_schema_catalog(engine, schema, table_names)
+    if catalog is None:
+        return table_names
+    return build_schema_tables(engine, catalog, metadata, schema, table_names)
+
+
+def map_schemas(fn: Callable[[str], T], schemas: Sequence[str], max_workers: int) -> dict[str, T]:
+    """
+    Run `fn` for every schema on a bounded thread pool, each call checking out its own pooled connection.
+    Results are keyed in the order of `schemas` regardless of which call finishes first.
+    """
+    if max_workers <= 1 or len(schemas) <= 1:
+        return {schema: fn(schema) for schema in schemas}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(schemas)), thread_name_prefix="reflection") as executor:
+        results = list(executor.map(fn, schemas))
+    return dict(zip(schemas, results))
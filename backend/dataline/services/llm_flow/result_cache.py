@@ -0,0 +1,141 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from sqlalchemy import URL, make_url
+
+from dataline.config import config
+from dataline.models.llm_flow.schema import QueryRunData
+from dataline.models.metrics.schema import QueryResultCacheStats
+from dataline.services.llm_flow.pagination import _SELECT_INTO, _SELECT_START
+
+# Quoted literals/identifiers and comments (with the newline ending a line comment) are kept as is, whitespace
+# elsewhere is collapsed
+_SQL_TOKENS = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(?:--|#)[^\n]*\n?|/\*.*?\*/)|\s+", re.DOTALL)
+# Statements with these can change data, ex. INSERT ... RETURNING in a CTE or SELECT ... FOR UPDATE
+_WRITES = re.compile(r"\b(insert|update|delete|merge|returning)\b", re.IGNORECASE)
+
+
+def normalize_sql(query: str) -> str:
+    """Normalize formatting-only differences (whitespace, trailing semicolons) of a query."""
+    normalized = _SQL_TOKENS.sub(lambda match: match.group(1) or " ", query)
+    return normalized.strip().rstrip(";").strip()
+
+
+def is_read_only_query(query: str) -> bool:
+    """Whether the query is a single SELECT that changes nothing, only then can its result be reused."""
+    statement = normalize_sql(query)
+    return (
+        _SELECT_START.match(statement) is not None
+        and ";" not in statement
+        and _SELECT_INTO.search(statement) is None
+        and _WRITES.search(statement) is None
+    )
+
+
+@dataclass(frozen=True)
+class QueryResultCacheKey:
+    connection: str
+    sql: str
+    # Budgets the rows were collected with (see QueryResultCollector)
+    max_rows: int
+    max_bytes: int
+    max_string_length: int
+
+
+@dataclass
+class _CacheEntry:
+    data: QueryRunData
+    size: int
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class QueryResultCache:
+    """
+    LRU cache of query results, keyed by connection, normalized SQL and row budget.
+
+    Chart refreshes, SQL edits and repeated run-sql calls often run the same query within minutes, every one of
+    them a round trip to the warehouse. Entries expire after `ttl` seconds, the least recently used ones are
+    evicted once the cached rows take more than `max_bytes`. Callers opt in per query (see `aexecute_sql_query`),
+    entries of a connection are invalidated when it is updated or deleted.
+    """
+
+    def __init__(
+        self, ttl: float = config.query_result_cache_ttl, max_bytes: int = config.query_result_cache_max_bytes
+    ) -> None:
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[QueryResultCacheKey, _CacheEntry] = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def connection_key(dsn: str | URL) -> str:
+        url = make_url(dsn) if isinstance(dsn, str) else dsn
+        return url.render_as_string(hide_password=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def get(self, key: QueryResultCacheKey) -> QueryRunData | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created_at > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.data
+
+    def set(self, key: QueryResultCacheKey, data: QueryRunData) -> None:
+        # Rough size of the rows in memory, results larger than the whole cache are not kept
+        size = data.byte_count + len(key.sql)
+        if not self.enabled or size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(data=data, size=size)
+            self._size += size
+            while self._size > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._evictions += 1
+
+    def invalidate(self, dsn: str | URL | None = None) -> None:
+        """Drop the cached results of a connection, or of all connections."""
+        connection = self.connection_key(dsn) if dsn is not None else None
+        with self._lock:
+            for key in [key for key in self._entries if connection is None or key.connection == connection]:
+                self._remove(key)
+
+    def _remove(self, key: QueryResultCacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+
+    def stats(self) -> QueryResultCacheStats:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return QueryResultCacheStats(
+                ttl=self.ttl,
+                max_bytes=self.max_bytes,
+                entries=len(self._entries),
+                size_bytes=self._size,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                hit_rate=self._hits / lookups if lookups else 0.0,
+            )
+
+
+query_result_cache = QueryResultCache()
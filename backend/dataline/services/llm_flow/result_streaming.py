@@ -0,0 +1,97 @@
+import itertools
+import re
+from typing import Any, Iterator, Sequence
+
+from sqlalchemy import Dialect
+from sqlalchemy.engine import CursorResult
+
+# Rows fetched from the database per round trip
+STREAM_BATCH_SIZE = 1000
+
+# Statements Postgres accepts in DECLARE ... CURSOR FOR (not SHOW, EXPLAIN, ...)
+_POSTGRES_CURSOR_QUERY = re.compile(r"^\s*(select|with|values|table)\b", re.IGNORECASE)
+
+
+class ResultStreamer:
+    """
+    Fetches the rows of a statement in batches, without the driver reading the whole result into memory first.
+
+    This default works for drivers whose cursors are lazy already (sqlite3, pyodbc), subclasses set up server-side
+    cursors or read the results the way their driver streams them.
+    """
+
+    def execution_options(  # type: ignore[misc]
+        self, query: str, batch_size: int = STREAM_BATCH_SIZE
+    ) -> dict[str, Any]:
+        """Execution options to run `query` with."""
+        return {}
+
+    def batches(  # type: ignore[misc]
+        self, result: CursorResult[Any], batch_size: int = STREAM_BATCH_SIZE
+    ) -> Iterator[Sequence[Any]]:
+        """Rows of the executed statement, `batch_size` at a time."""
+        return result.partitions(batch_size)
+
+
+class ServerSideCursorStreamer(ResultStreamer):
+    """
+    Server-side cursors through SQLAlchemy's `stream_results`: psycopg2 named cursors, pymysql and mysqlclient
+    unbuffered cursors (SSCursor). The database keeps the result and sends a batch per fetch.
+    """
+
+    def execution_options(  # type: ignore[misc]
+        self, query: str, batch_size: int = STREAM_BATCH_SIZE
+    ) -> dict[str, Any]:
+        # https://docs.sqlalchemy.org/en/20/core/connections.html#streaming-with-a-fixed-buffer-via-yield-per
+        return {"yield_per": batch_size}
+
+
+class PostgresStreamer(ServerSideCursorStreamer):
+    def execution_options(  # type: ignore[misc]
+        self, query: str, batch_size: int = STREAM_BATCH_SIZE
+    ) -> dict[str, Any]:
+        # Named cursors can only be declared for queries, other statements return few rows anyway
+        if _POSTGRES_CURSOR_QUERY.match(query) is None:
+            return {}
+        return super().execution_options(query, batch_size)
+
+
+class SnowflakeStreamer(ResultStreamer):
+    """
+    Snowflake keeps results in chunks ("result batches") that the connector downloads, ahead of the reader on
+    several threads when fetching from the cursor. They are downloaded here one at a time, as they are read.
+    """
+
+    def batches(  # type: ignore[misc]
+        self, result: CursorResult[Any], batch_size: int = STREAM_BATCH_SIZE
+    ) -> Iterator[Sequence[Any]]:
+        cursor = result.cursor
+        result_batches = cursor.get_result_batches() if hasattr(cursor, "get_result_batches") else None
+        # Makes rows of the result out of the rows of the driver, with SQLAlchemy's type conversion applied
+        make_row = result._row_getter
+        if not result_batches or make_row is None:
+            yield from result.partitions(batch_size)
+            return
+
+        # The connection converts the values like the cursor does (ex. session timezone)
+        rows = itertools.chain.from_iterable(
+            result_batch.create_iter(connection=cursor.connection) for result_batch in result_batches
+        )
+        while batch := list(itertools.islice(rows, batch_size)):
+            for row in batch:
+                # The connector hands over download errors as rows
+                if isinstance(row, Exception):
+                    raise row
+            # Read past the result, the rows are processed like the rows it returns
+            yield [make_row(row) for row in batch]
+
+
+def get_result_streamer(dialect: Dialect) -> ResultStreamer:
+    """The way to stream results of this dialect and driver."""
+    if dialect.name == "snowflake":
+        return SnowflakeStreamer()
+    if not dialect.supports_server_side_cursors:
+        return ResultStreamer()
+    if dialect.name == "postgresql":
+        return PostgresStreamer()
+    return ServerSideCursorStreamer()
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+from dataline.models.llm_flow.schema import QueryRunData
+from dataline.models.metrics.schema import SingleFlightStats
+from dataline.services.llm_flow.result_cache import QueryResultCacheKey
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[K, T]):
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller of a key runs the call, callers arriving while it is in flight wait for it and get the same
+    result (or exception). Works across threads and event loops alike, so sync and async callers of the same
+    query share one execution. If the running caller is cancelled, a waiting caller takes over.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, Future[T]] = {}
+        self._lock = threading.Lock()
+        self._executions = 0
+        self._coalesced = 0
+
+    def _join(self, key: K) -> tuple[Future[T], bool]:
+        """Future of the call in flight for the key, and whether the caller has to run it."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._executions += 1
+            return future, True
+
+    def _finish(self, key: K, future: Future[T]) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key: K, fn: Callable[[], T]) -> T:
+        while True:
+            future, is_leader = self._join(key)
+            if not is_leader:
+                try:
+                    return future.result()
+                except CancelledError:
+                    # The running caller was cancelled, try again
+                    continue
+
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, future)
+                future.set_exception(e)
+                raise
+            self._finish(key, future)
+            future.set_result(result)
+            return result
+
+    async def ado(self, key: K, fn: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            future, is_leader = self._join(key)
+            if not is_leader:
+                # Shielded, a cancelled waiter must not cancel the shared call
+                wrapped = asyncio.wrap_future(future)
+                try:
+                    return await asyncio.shield(wrapped)
+                except asyncio.CancelledError:
+                    if not future.cancelled():
+                        raise
+                    continue
+
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                # Waiters run the call themselves instead of failing with our cancellation
+                self._finish(key, future)
+                future.cancel()
+                raise
+            except BaseException as e:
+                self._finish(key, future)
+                future.set_exception(e)
+                raise
+            self._finish(key, future)
+            future.set_result(result)
+            return result
+
+    def stats(self) -> SingleFlightStats:
+        with self._lock:
+            return SingleFlightStats(
+                in_flight=len(self._calls),
+                executions=self._executions,
+                coalesced=self._coalesced,
+            )
+
+
+# Identical queries (same connection, normalized SQL and budgets) running at the same time
+query_single_flight: SingleFlight[QueryResultCacheKey, QueryRunData] = SingleFlight()
@@ -1,5 +1,8 @@
 import abc
+import bisect
+import itertools
 import json
+import logging
 import operator
 from typing import (
     Annotated,
@@ -7,6 +10,7 @@ from typing import (
     Iterable,
     List,
     Optional,
+    Self,
     Sequence,
     Type,
     TypedDict,
@@ -14,12 +18,14 @@ from typing import (
 )
 
 from fastapi.encoders import jsonable_encoder
-from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
 from langchain_core.messages import BaseMessage, ToolMessage
+from langchain_core.runnables.config import run_in_executor
 from langchain_core.tools import BaseTool, BaseToolkit
 from langgraph.prebuilt import ToolExecutor
 from pydantic import BaseModel, Field, SkipValidation
 
+from dataline.config import config
 from dataline.models.llm_flow.schema import (
     ChartGenerationResult,
     QueryOptions,
@@ -39,7 +45,18 @@ from dataline.services.llm_flow.llm_calls.mirascope_utils import (
     OpenAIClientOptions,
     call,
 )
+from dataline.services.llm_flow.query_executor import query_executor
+from dataline.services.llm_flow.result_cache import (
+    QueryResultCacheKey,
+    is_read_only_query,
+    normalize_sql,
+    query_result_cache,
+)
+from dataline.services.llm_flow.single_flight import query_single_flight
 from dataline.services.llm_flow.utils import DatalineSQLDatabase as SQLDatabase
+from dataline.utils.columnar import ColumnarResult
+
+logger = logging.getLogger(__name__)
 
 
 class QueryGraphStateUpdate(TypedDict):
@@ -76,35 +93,230 @@ def truncate_word(content: Any, *, length: int, suffix: str = "...") -> str:  #
     return content[: length - len(suffix)].rsplit(" ", 1)[0] + suffix
 
 
+# Values measured to estimate the size of a column of numbers, dates...
+_WIDTH_SAMPLES = 16
+
+
+def truncate_column(values: Sequence[Any], *, length: int, suffix: str = "...") -> Sequence[Any]:  # type: ignore[misc]
+    """
+    `truncate_word` for a whole column. Values are returned as is unless the column holds strings longer than
+    `length`, the type and length checks run over the whole column at once instead of a call per value.
+    """
+    if length <= 0:
+        return values
+    types = set(map(type, values))
+    if not any(issubclass(value_type, str) for value_type in types):
+        return values
+    if types <= {str, type(None)}:
+        # str() returns strings as is, None becomes "None" (left out below)
+        candidates = itertools.compress(itertools.count(), map(length.__lt__, map(len, map(str, values))))
+        long_indexes = [i for i in candidates if values[i] is not None]
+    else:
+        long_indexes = [i for i, value in enumerate(values) if isinstance(value, str) and len(value) > length]
+    if not long_indexes:
+        return values
+
+    truncated = list(values)
+    for i in long_indexes:
+        truncated[i] = truncate_word(truncated[i], length=length, suffix=suffix)
+    return truncated
+
+
+def estimate_column_bytes(values: Sequence[Any]) -> Iterable[int]:  # type: ignore[misc]
+    """Rough size of each value once serialized, without serializing it (None counts as 4)."""
+    types = set(map(type, values))
+    if types <= {str, bytes}:
+        return map(len, values)
+    if len(types) == 1:
+        # Values of one non-string type print to similar lengths, only a few of them are measured
+        samples = values[:: max(len(values) // _WIDTH_SAMPLES, 1)]
+        width = round(sum(map(len, map(str, samples))) / len(samples))
+        return itertools.repeat(width, len(values))
+    if bytes not in types:
+        return map(len, map(str, values))
+    return [len(value) if isinstance(value, (str, bytes)) else len(str(value)) for value in values]
+
+
+class QueryResultCollector:
+    """
+    Collects the row batches of a streamed query result until the row or byte budget is used up.
+
+    Long values are truncated as rows come in, so only the kept (truncated) rows are ever held in memory,
+    however large the query result is. Rows are kept column by column (see ColumnarResult).
+    """
+
+    def __init__(self, max_string_length: int, max_rows: int, max_bytes: int) -> None:
+        self.max_string_length = max_string_length
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.data = ColumnarResult([])
+        self.byte_count = 0
+        self.has_more = False
+
+    @classmethod
+    def for_query(cls, db: SQLDatabase, limit: int | None = None) -> Self:
+        max_rows = config.query_result_max_rows if limit is None else min(limit, config.query_result_max_rows)
+        return cls(db._max_string_length, max_rows, config.query_result_max_bytes)
+
+    def start(self, columns: list[str]) -> None:
+        self.data = ColumnarResult(columns)
+
+    def add_batch(self, rows: Sequence[Sequence[Any]]) -> bool:  # type: ignore[misc]
+        """
+        Keep the rows that fit in the budget, returns False once the budget is used up.
+        The batch is truncated and measured column by column (see `truncate_column`).
+        """
+        remaining = self.max_rows - self.data.num_rows
+        if len(rows) > remaining:
+            self.has_more = True
+            rows = rows[:remaining]
+        if not rows:
+            return not self.has_more
+
+        columns = [truncate_column(values, length=self.max_string_length) for values in zip(*rows)]
+        column_sizes = [list(estimate_column_bytes(values)) for values in columns]
+        # Quotes and separator of each value
+        overhead = 3 * len(columns)
+        batch_bytes = sum(map(sum, column_sizes)) + overhead * len(rows)
+        if self.byte_count + batch_bytes <= self.max_bytes:
+            kept = len(rows)
+            self.byte_count += batch_bytes
+        else:
+            # Only a batch crossing the budget is measured row by row
+            row_sizes = [size + overhead for size in map(sum, zip(*column_sizes))]
+            totals = list(itertools.accumulate(row_sizes, initial=self.byte_count))[1:]
+            kept = bisect.bisect_right(totals, self.max_bytes)
+            # Always keep the first row, even if it is larger than the budget
+            if not kept and not self.data.num_rows:
+                kept = 1
+            self.has_more = True
+            columns = [values[:kept] for values in columns]
+            if kept:
+                self.byte_count = totals[kept - 1]
+
+        if kept:
+            self.data.extend_columns(columns)
+        return not self.has_more
+
+    def cache_key(self, db: SQLDatabase, query: str) -> QueryResultCacheKey:
+        return QueryResultCacheKey(
+            connection=query_result_cache.connection_key(db._engine.url),
+            sql=normalize_sql(query),
+            max_rows=self.max_rows,
+            max_bytes=self.max_bytes,
+            max_string_length=self.max_string_length,
+        )
+
+    def result(self) -> QueryRunData:
+        if self.has_more:
+            logger.info("Query result cut off after %d rows (~%d bytes)", self.data.num_rows, self.byte_count)
+        return QueryRunData.from_columnar(self.data, has_more=self.has_more, byte_count=self.byte_count)
+
+
+def validate_chart_data(query_run_data: QueryRunData, chart_type: Optional[ChartType]) -> None:
+    """Validate the results for the chart type."""
+    if chart_type in [ChartType.bar, ChartType.line, ChartType.doughnut, ChartType.scatter]:
+        # These chart types take in single dimensional data for labels and values
+        # Validate that each row has only 1 element
+        if not query_run_data.num_rows:
+            raise RunException("No data returned from the query.")
+
+        if len(query_run_data.columns) != 2:
+            raise ChartValidationRunException(
+                "Validation of results output format failed. "
+                f"You chose {len(query_run_data.columns)} columns in the select statement."
+                f"You selected: {query_run_data.columns}\n"
+                "Please select only two of them for the chart X and Y axes (labels and values respectively)."
+            )
+    else:
+        raise RunException(f"Chart type {chart_type} is not supported.")
+
+
+def _collect_rows(db: SQLDatabase, query: str, collector: QueryResultCollector) -> None:
+    # One extra row tells whether there are more
+    batches = db.custom_run_sql_batches(query, max_rows=collector.max_rows + 1)
+    try:
+        collector.start(cast(list[str], next(batches)))
+        for batch in batches:
+            if not collector.add_batch(batch):
+                break
+    finally:
+        batches.close()
+
+
 def execute_sql_query(
-    db: SQLDatabase, query: str, for_chart: bool = False, chart_type: Optional[ChartType] = None
+    db: SQLDatabase,
+    query: str,
+    for_chart: bool = False,
+    chart_type: Optional[ChartType] = None,
+    limit: int | None = None,
 ) -> QueryRunData:
-    """Execute the SQL query and return the results or an error message."""
-    columns, rows = db.custom_run_sql(query)
-    truncated_rows = []
-    for row in rows:
-        # truncate each column, then convert the row to a tuple
-        truncated_row = tuple(truncate_word(column, length=db._max_string_length) for column in row)
-        truncated_rows.append(truncated_row)
+    """
+    Execute the SQL query and return the results or an error message.
+    Rows are streamed until `limit` or the configured row/byte budget is reached, `has_more` tells whether the
+    query returned more.
+    """
+    collector = QueryResultCollector.for_query(db, limit)
+
+    def run() -> QueryRunData:
+        # Bounded per connection, see QueryExecutor
+        query_executor.run(db._engine.url, _collect_rows, db, query, collector)
+        return collector.result()
 
+    if config.query_coalescing and is_read_only_query(query):
+        # Concurrent callers of the same query share its result, writes run for each caller
+        query_run_data = query_single_flight.do(collector.cache_key(db, query), run).model_copy()
+    else:
+        query_run_data = run()
     if for_chart:
-        if chart_type in [ChartType.bar, ChartType.line, ChartType.doughnut, ChartType.scatter]:
-            # These chart types take in single dimensional data for labels and values
-            # Validate that each row has only 1 element
-            if not truncated_rows:
-                raise RunException("No data returned from the query.")
-
-            row = truncated_rows[0]
-            if len(row) != 2:
-                raise ChartValidationRunException(
-                    f"Validation of results output format failed. You chose {len(row)} columns in the select statement."
-                    f"You selected: {columns}\n"
-                    "Please select only two of them for the chart X and Y axes (labels and values respectively)."
-                )
-        else:
-            raise RunException(f"Chart type {chart_type} is not supported.")
+        validate_chart_data(query_run_data, chart_type)
+    return query_run_data
 
-    return QueryRunData(columns=columns, rows=truncated_rows)
+
+async def aexecute_sql_query(
+    db: SQLDatabase,
+    query: str,
+    for_chart: bool = False,
+    chart_type: Optional[ChartType] = None,
+    limit: int | None = None,
+    use_cache: bool = False,
+) -> QueryRunData:
+    """
+    Async version of `execute_sql_query`, awaits the database instead of blocking the event loop.
+    With `use_cache`, a result of the same read-only query cached in the last minutes is reused (see QueryResultCache).
+    Identical read-only queries already running are awaited instead of being run again (see SingleFlight).
+    """
+    collector = QueryResultCollector.for_query(db, limit)
+    cache_key = collector.cache_key(db, query)
+    # Results of statements that write must not stand in for running them again, nor be shared
+    read_only = is_read_only_query(query)
+
+    async def run() -> QueryRunData:
+        batches = db.acustom_run_sql_batches(query, max_rows=collector.max_rows + 1)
+        try:
+            collector.start(cast(list[str], await anext(batches)))
+            async for batch in batches:
+                if not collector.add_batch(batch):
+                    break
+        finally:
+            await batches.aclose()
+        data = collector.result()
+        if read_only:
+            # Cached even if not used now, a later call may opt in
+            query_result_cache.set(cache_key, data.model_copy())
+        return data
+
+    cached = query_result_cache.get(cache_key) if use_cache and read_only else None
+    if cached is not None:
+        query_run_data = cached.model_copy()
+    elif config.query_coalescing and read_only:
+        query_run_data = (await query_single_flight.ado(cache_key, run)).model_copy()
+    else:
+        query_run_data = await run()
+
+    if for_chart:
+        validate_chart_data(query_run_data, chart_type)
+    return query_run_data
 
 
 def query_run_result_to_chart_json(chart_json: str, chart_type: ChartType, query_run_data: QueryRunData) -> str:
@@ -119,8 +331,7 @@ def query_run_result_to_chart_json(chart_json: str, chart_type: ChartType, query
     """
     if chart_type in [ChartType.bar, ChartType.line, ChartType.doughnut, ChartType.scatter]:
         # Insert the flattened query result data into the chartjs JSON
-        flattened_labels = [row[0] for row in query_run_data.rows]
-        flattened_values = [row[1] for row in query_run_data.rows]
+        flattened_labels, flattened_values = query_run_data.columnar().arrays[:2]
 
         formatted_json = json.loads(chart_json)
         formatted_json["data"]["labels"] = flattened_labels
@@ -163,6 +374,15 @@ class StateUpdaterTool(BaseTool, abc.ABC):  # type: ignore[misc]
         """Get the response from the tool and update the state."""
         raise NotImplementedError
 
+    async def aget_response(  # type: ignore[misc]
+        self,
+        state: "QueryGraphState",
+        args: dict[str, Any],
+        call_id: str,
+    ) -> QueryGraphStateUpdate:
+        """Async version of `get_response`, runs it in a thread unless overridden."""
+        return await run_in_executor(None, self.get_response, state, args, call_id)
+
 
 class _InfoSQLDatabaseToolInput(BaseModel):
     table_names: str = Field(
@@ -290,12 +510,49 @@ class QuerySQLDataBaseTool(BaseSQLDatabaseTool, StateUpdaterTool):
         """Execute the query, return the results or an error message."""
         return execute_sql_query(self.db, query, for_chart, chart_type), for_chart
 
+    async def _arun(
+        self,
+        query: str,
+        for_chart: bool = False,
+        chart_type: Optional[ChartType] = None,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> tuple[QueryRunData, bool]:
+        """Execute the query without blocking a thread, return the results or an error message."""
+        return await aexecute_sql_query(self.db, query, for_chart, chart_type), for_chart
+
     def get_response(  # type: ignore[misc]
         self,
         state: "QueryGraphState",
         args: dict[str, Any],
         call_id: str,
     ) -> QueryGraphStateUpdate:  # type: ignore[misc]
+        output: tuple[QueryRunData, bool] | Exception
+        try:
+            output = cast(tuple[QueryRunData, bool], self.run(args))
+        except Exception as e:
+            output = e
+        return self._build_response(state, args, call_id, output)
+
+    async def aget_response(  # type: ignore[misc]
+        self,
+        state: "QueryGraphState",
+        args: dict[str, Any],
+        call_id: str,
+    ) -> QueryGraphStateUpdate:
+        output: tuple[QueryRunData, bool] | Exception
+        try:
+            output = cast(tuple[QueryRunData, bool], await self.arun(args))
+        except Exception as e:
+            output = e
+        return self._build_response(state, args, call_id, output)
+
+    def _build_response(  # type: ignore[misc]
+        self,
+        state: "QueryGraphState",
+        args: dict[str, Any],
+        call_id: str,
+        output: tuple[QueryRunData, bool] | Exception,
+    ) -> QueryGraphStateUpdate:
         messages = []
         results: list[QueryResultSchema] = []
 
@@ -315,14 +572,15 @@ class QuerySQLDataBaseTool(BaseSQLDatabaseTool, StateUpdaterTool):
 
         # Add query run result to results
         try:
-            query_run_data, for_chart = cast(tuple[QueryRunData, bool], self.run(args))
-            response = SQLQueryRunResult(
-                columns=query_run_data.columns,
-                rows=query_run_data.rows,
-                for_chart=for_chart,
+            if isinstance(output, Exception):
+                raise output
+            query_run_data, for_chart = output
+            response = SQLQueryRunResult.from_query_run_data(
+                query_run_data,
                 linked_id=query_string_result.ephemeral_id,
+                for_chart=for_chart,
+                is_secure=state.options.secure_data,  # return whether or not generated securely
             )
-            response.is_secure = state.options.secure_data  # return whether or not generated securely
             results.append(response)
 
         # If errors occur, don't want to send bad results
@@ -351,21 +609,22 @@ class QuerySQLDataBaseTool(BaseSQLDatabaseTool, StateUpdaterTool):
                 "Returned data:\n"
                 f"Columns: {str(response.columns)}\n"
                 f"Truncated rows: {str(truncated_rows)}\n"
-                f"Number of rows: {len(response.rows)}\n"
+                f"Number of rows: {response.num_rows}\n"
             )
         else:
             # If secure, need to hide the actual data
             # Get data description from results
-            if response.columns and response.rows:
-                data_types = [type(cell).__name__ for cell in response.rows[0]]
+            first_rows = response.rows[:1]
+            if response.columns and first_rows:
+                data_types = [type(cell).__name__ for cell in first_rows[0]]
                 data_description = (
                     "Returned data description:\n"
                     f"Columns:{response.columns}\n"
                     f"First row: {data_types}\n"
-                    f"Number of rows: {len(response.rows)}\n"
+                    f"Number of rows: {response.num_rows}\n"
                 )
-            elif len(response.rows) == 1:
-                data_types = [type(cell).__name__ for cell in response.rows[0]]
+            elif response.num_rows == 1:
+                data_types = [type(cell).__name__ for cell in first_rows[0]]
                 data_description = f"Returned data description:\nOnly one row: {data_types}\n"
             else:
                 data_description = "No data returned\n"
@@ -375,6 +634,9 @@ class QuerySQLDataBaseTool(BaseSQLDatabaseTool, StateUpdaterTool):
                 f"{data_description}"
             )
 
+        if response.has_more:
+            content += "The query returned more rows than these, the result was cut off.\n"
+
         content += (
             "Given this data, analyze it and consider regenerating the query. "
             "Think about things like: If the user wanted buckets, do the buckets make sense "
@@ -1,11 +1,70 @@
-from typing import Any, Generator, Protocol, Self, Sequence, cast
+import json
+import logging
+import re
+from typing import Any, AsyncGenerator, Generator, Iterable, Protocol, Self, Sequence
 
 from langchain_community.utilities.sql_database import SQLDatabase
-from sqlalchemy import Engine, MetaData, Row, create_engine, inspect, text
+from sqlalchemy import (
+    Connection,
+    Engine,
+    Executable,
+    MetaData,
+    Row,
+    create_engine,
+    inspect,
+    literal_column,
+    select,
+    text,
+)
 from sqlalchemy.engine import CursorResult
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.schema import CreateTable
 
+from dataline.config import config
 from dataline.models.connection.schema import ConnectionOptions
+from dataline.services.llm_flow.engine_registry import engine_registry
+from dataline.services.llm_flow.metadata_cache import CachedMetadata, metadata_cache
+from dataline.services.llm_flow.pagination import _SELECT_START
+from dataline.services.llm_flow.query_cancellation import (
+    apply_statement_timeout,
+    await_interruptible,
+    cancel_running_query,
+    is_statement_interrupted,
+    resolve_statement_timeout,
+    restart_statement_deadline,
+)
+from dataline.services.llm_flow.query_executor import query_executor
+from dataline.services.llm_flow.reflection import (
+    build_schema_tables,
+    map_schemas,
+    read_schema_catalog,
+)
+from dataline.services.llm_flow.result_streaming import get_result_streamer
+
+
+logger = logging.getLogger(__name__)
+
+# Clauses that can't be wrapped in a derived table, or whose row order wouldn't survive it
+_UNWRAPPABLE = re.compile(r"\b(into|order\s+by)\b", re.IGNORECASE)
+
+
+def limit_select(query: str, dialect: str, max_rows: int) -> Executable | None:
+    """
+    Wrap a simple SELECT so the database returns at most `max_rows` rows.
+    SQLAlchemy renders the limit for the dialect (LIMIT, TOP, FETCH FIRST, ...).
+    Returns None if the query can't safely be wrapped, the caller should stop fetching after `max_rows` instead.
+    """
+    # SQLite renames duplicate columns of derived tables, and its cursors are lazy anyway
+    if dialect == "sqlite":
+        return None
+    statement = query.strip().rstrip(";").strip()
+    match = _SELECT_START.match(statement)
+    if match is None or ";" in statement or _UNWRAPPABLE.search(statement):
+        return None
+    # T-SQL does not allow CTEs in derived tables
+    if dialect == "mssql" and match.group(1).lower() == "with":
+        return None
+    return select(literal_column("*")).select_from(text(statement).columns().subquery("q")).limit(max_rows)
 
 
 class ConnectionProtocol(Protocol):
@@ -28,27 +87,48 @@ class DatalineSQLDatabase(SQLDatabase):
         custom_table_info: dict | None = None,
         view_support: bool = True,
         max_string_length: int = 300,
+        metadata_cache_key: str | None = None,
+        lazy_reflection: bool = False,
+        statement_timeout: int | None = None,
     ):
-        """Create engine from database URI."""
+        """
+        Create engine from database URI.
+        If `metadata_cache_key` is given, reflected metadata is cached under that key (see MetadataCache).
+        If `lazy_reflection` is set, only table names are fetched up front and table columns/constraints are
+        reflected on first use in `get_table_info`.
+        `statement_timeout` (seconds) is applied to the async engine, the given engine is expected to have it already.
+        """
         self._engine = engine
         self._schema = None  # need to keep this as it is used inside super()._execute method
-        if schemas is None:
-            inspector = inspect(self._engine)
-            self._schemas = inspector.get_schema_names()
-        else:
-            self._schemas = schemas
         if include_tables and ignore_tables:
             raise ValueError("Cannot specify both include_tables and ignore_tables")
 
+        cached = None
+        fingerprint = self._metadata_fingerprint(schemas, include_tables, ignore_tables, view_support)
+        if metadata_cache_key and metadata is None:
+            cached = metadata_cache.get(metadata_cache_key, fingerprint)
+
         self._inspector = inspect(self._engine)
-        # including view support by adding the views as well as tables to the all
-        # tables list if view_support is True
-        self._all_tables_per_schema: dict[str, set[str]] = {}
-        for schema in self._schemas:
-            self._all_tables_per_schema[schema] = set(
-                self._inspector.get_table_names(schema=schema)
-                + (self._inspector.get_view_names(schema=schema) if view_support else [])
-            )
+        if cached is not None:
+            self._schemas = cached.schemas
+            self._all_tables_per_schema: dict[str, set[str]] = cached.all_tables_per_schema
+        else:
+            if schemas is None:
+                self._schemas = self._inspector.get_schema_names()
+            else:
+                self._schemas = schemas
+
+            # including view support by adding the views as well as tables to the all
+            # tables list if view_support is True
+            def list_tables(schema: str) -> set[str]:
+                # Inspectors cache results in a plain dict, use one per schema when running in parallel
+                inspector = inspect(self._engine)
+                return set(
+                    inspector.get_table_names(schema=schema)
+                    + (inspector.get_view_names(schema=schema) if view_support else [])
+                )
+
+            self._all_tables_per_schema = map_schemas(list_tables, self._schemas, self._schema_workers())
         self._all_tables = set(f"{k}.{name}" for k, names in self._all_tables_per_schema.items() for name in names)
 
         self._include_tables = set(include_tables) if include_tables else set()
@@ -83,22 +163,105 @@ class DatalineSQLDatabase(SQLDatabase):
             )
 
         self._max_string_length = max_string_length
+        self._statement_timeout = statement_timeout
 
-        self._metadata = metadata or MetaData()
-        # including view support if view_support = true
+        self._view_support = view_support
+        self._lazy_reflection = lazy_reflection
+        self._metadata_cache_key = metadata_cache_key if metadata is None else None
+        self._metadata_fingerprint_value = fingerprint
+        # Metadata objects can be shared between instances of the same connection through the metadata cache
+        self._reflection_lock = metadata_cache.reflection_lock(self._metadata_cache_key)
 
-        for schema in self._schemas:
-            self._metadata.reflect(
-                views=view_support,
-                bind=self._engine,
-                only=[table.split(".")[-1] for table in self._usable_tables if table.startswith(f"{schema}.")],
-                schema=schema,
-            )
+        if cached is not None:
+            self._metadata = cached.metadata
+        else:
+            self._metadata = metadata or MetaData()
+
+        # In lazy mode, tables are only reflected the first time get_table_info asks for them
+        reflected = False
+        if not self._lazy_reflection:
+            reflected = self._reflect_tables(self._usable_tables)
+
+        if cached is None or reflected:
+            self._update_metadata_cache()
 
         # # Add id to tables metadata
         # for t in self._metadata.sorted_tables:
         #     t.id = f"{t.schema}.{t.name}"
 
+    def _reflect_tables(self, table_names: Iterable[str]) -> bool:
+        """
+        Reflect the given (schema qualified) tables that are not in the metadata yet.
+        Returns whether anything was reflected.
+        """
+        with self._reflection_lock:
+            missing_tables = set(table_names) - set(self._metadata.tables.keys())
+            if not missing_tables:
+                return False
+
+            tables_per_schema = {
+                schema: only
+                for schema in self._schemas
+                if (only := sorted(table.split(".")[-1] for table in missing_tables if table.startswith(f"{schema}.")))
+            }
+
+            # Catalog reads are I/O bound and run per schema in parallel. MetaData is not thread safe, so tables
+            # are then built (and left over tables reflected with the inspector) one schema at a time, in order.
+            catalogs = {}
+            if config.bulk_table_reflection:
+                catalogs = map_schemas(
+                    lambda schema: read_schema_catalog(self._engine, schema, tables_per_schema[schema]),
+                    list(tables_per_schema),
+                    self._schema_workers(),
+                )
+
+            for schema, only in tables_per_schema.items():
+                catalog = catalogs.get(schema)
+                if catalog is not None:
+                    # The inspector only handles what the catalog couldn't
+                    only = sorted(build_schema_tables(self._engine, catalog, self._metadata, schema, only))
+                if only:
+                    # including view support if view_support = true
+                    self._metadata.reflect(views=self._view_support, bind=self._engine, only=only, schema=schema)
+            return True
+
+    def _schema_workers(self) -> int:
+        # SQLite schemas are attached per connection (and in-memory databases are per connection),
+        # other pooled connections would not see them
+        if self._engine.dialect.name == "sqlite":
+            return 1
+        return config.reflection_max_workers
+
+    def _update_metadata_cache(self) -> None:
+        if not self._metadata_cache_key:
+            return
+        with self._reflection_lock:
+            metadata_cache.set(
+                self._metadata_cache_key,
+                CachedMetadata(
+                    fingerprint=self._metadata_fingerprint_value,
+                    schemas=self._schemas,
+                    all_tables_per_schema=self._all_tables_per_schema,
+                    metadata=self._metadata,
+                ),
+            )
+
+    @staticmethod
+    def _metadata_fingerprint(
+        schemas: list[str] | None,
+        include_tables: list[str] | None,
+        ignore_tables: list[str] | None,
+        view_support: bool,
+    ) -> str:
+        return json.dumps(
+            {
+                "schemas": schemas,
+                "include_tables": sorted(include_tables) if include_tables else None,
+                "ignore_tables": sorted(ignore_tables) if ignore_tables else None,
+                "view_support": view_support,
+            }
+        )
+
     # def from_uri(cls, database_uri: str | URL, engine_args: dict | None = None, **kwargs: Any) -> Self:
     @classmethod
     def from_uri(
@@ -107,50 +270,199 @@ class DatalineSQLDatabase(SQLDatabase):
         """Construct a SQLAlchemy engine from URI."""
         _engine_args = engine_args or {}
         engine = create_engine(database_uri, **_engine_args)
-        return cls(engine, schemas=schemas, **kwargs)
+        statement_timeout = resolve_statement_timeout(None)
+        apply_statement_timeout(engine, statement_timeout)
+        return cls(engine, schemas=schemas, statement_timeout=statement_timeout, **kwargs)
+
+    def custom_run_sql_stream(  # type: ignore[misc]
+        self, query: str, max_rows: int | None = None
+    ) -> Generator[Sequence[Row[Any]], Any, None]:
+        """
+        Yield the column names, then the rows of the query as they are fetched.
+        With `max_rows`, the database is asked for at most that many rows where the query can be wrapped.
+        """
+        batches = self.custom_run_sql_batches(query, max_rows)
+        try:
+            yield next(batches)
+            for batch in batches:
+                yield from batch
+        finally:
+            batches.close()
+
+    def custom_run_sql_batches(self, query: str, max_rows: int | None = None) -> Generator[Sequence[Any], Any, None]:  # type: ignore[misc]
+        """
+        Like `custom_run_sql_stream`, yields the rows in the batches they are fetched from the cursor.
+        The rows are streamed the way the driver supports, see `get_result_streamer`.
+        """
+        streamer = get_result_streamer(self._engine.dialect)
+        with self._engine.connect() as connection:
+            with self._execute_with_row_cap(connection, query, max_rows, streamer.execution_options(query)) as result:
+                yield list(result.keys())
+                partitions = streamer.batches(result)
+                while True:
+                    # The statement timeout applies to each fetch, not to the time the rows are read in between
+                    restart_statement_deadline(connection.info)
+                    # Rows may be fetched across several executor calls, each one can be cancelled
+                    with query_executor.on_cancel(lambda: cancel_running_query(connection)):
+                        partition = next(partitions, None)
+                    if partition is None:
+                        break
+                    yield partition
+            connection.commit()
+
+    def custom_run_sql(self, query: str, max_rows: int | None = None) -> tuple[list[Any], Sequence[Row[Any]]]:  # type: ignore[misc]
+        """Run the query and fetch its rows, at most `max_rows` if given."""
+        # Bounded per connection, see QueryExecutor
+        return query_executor.run(self._engine.url, self._custom_run_sql, query, max_rows)
 
-    def custom_run_sql_stream(self, query: str) -> Generator[Sequence[Row[Any]], Any, None]:
-        # https://docs.sqlalchemy.org/en/20/core/connections.html#streaming-with-a-fixed-buffer-via-yield-per
+    async def acustom_run_sql_stream(  # type: ignore[misc]
+        self, query: str, max_rows: int | None = None
+    ) -> AsyncGenerator[Sequence[Row[Any]], None]:
+        """Async version of `custom_run_sql_stream`, see `acustom_run_sql`."""
+        batches = self.acustom_run_sql_batches(query, max_rows)
+        try:
+            yield await anext(batches)
+            async for batch in batches:
+                for row in batch:
+                    yield row
+        finally:
+            await batches.aclose()
+
+    async def acustom_run_sql_batches(  # type: ignore[misc]
+        self, query: str, max_rows: int | None = None
+    ) -> AsyncGenerator[Sequence[Any], None]:
+        """Async version of `custom_run_sql_batches`, see `acustom_run_sql`."""
         yield_per = 1000
-        if self.dialect == "mssql":
-            with self._engine.begin() as connection:
-                command = text(query)
-                with connection.execution_options(yield_per=yield_per).execute(command) as result:
-                    columns = list(result.keys())
-                    yield columns
-                    for partition in result.partitions():
-                        for row in partition:
-                            yield row
-
-        result = cast(
-            CursorResult[Any],
-            super().run(query, "cursor", include_columns=True, execution_options={"yield_per": yield_per}),
-        )  # type: ignore[misc]
-        columns = list(result.keys())
-        yield columns
-        for partition in result.partitions():
-            for row in partition:
-                yield row
-
-    def custom_run_sql(self, query: str) -> tuple[list[Any], Sequence[Row[Any]]]:
-        if self.dialect == "mssql":
-            with self._engine.begin() as connection:
-                command = text(query)
-                result = connection.execute(command)
-                rows = result.fetchall()
-                columns = list(result.keys())
-                return columns, rows
-
-        result = cast(CursorResult[Any], super().run(query, "cursor", include_columns=True))  # type: ignore[misc]
-        rows = result.fetchall()
-        columns = list(result.keys())
-        return columns, rows
+        async_engine = (
+            engine_registry.get_async_engine(self._engine.url, self._statement_timeout)
+            if config.async_user_queries
+            else None
+        )
+        if async_engine is None:
+            # Fetch the batches on the query executor instead
+            batches = self.custom_run_sql_batches(query, max_rows)
+            try:
+                while (batch := await query_executor.arun(self._engine.url, next, batches, None)) is not None:
+                    yield batch
+            finally:
+                # Closing releases the cursor and connection, which can block too
+                await query_executor.arun(self._engine.url, batches.close)
+            return
+
+        async with query_executor.slot(self._engine.url), async_engine.connect() as connection:
+            connection_info = (await connection.get_raw_connection()).info
+            limited_query = limit_select(query, self.dialect, max_rows) if max_rows is not None else None
+            result = None
+            if limited_query is not None:
+                try:
+                    result = await await_interruptible(connection.stream(limited_query), connection_info)
+                except DBAPIError as e:
+                    if is_statement_interrupted(e):
+                        raise
+                    logger.debug("Could not run row limited query, falling back to streaming", exc_info=True)
+                    await connection.rollback()
+            if result is None:
+                result = await await_interruptible(connection.stream(text(query)), connection_info)
+
+            yield list(result.keys())
+            partitions = result.partitions(yield_per)
+            while True:
+                restart_statement_deadline(connection_info)
+                partition = await await_interruptible(anext(partitions, None), connection_info)
+                if partition is None:
+                    break
+                yield partition
+            await result.close()
+            await connection.commit()
+
+    async def acustom_run_sql(self, query: str, max_rows: int | None = None) -> tuple[list[Any], Sequence[Row[Any]]]:  # type: ignore[misc]
+        """
+        Async version of `custom_run_sql`.
+        Databases with an async driver are awaited on the event loop, others run on the query executor.
+        """
+        async_engine = (
+            engine_registry.get_async_engine(self._engine.url, self._statement_timeout)
+            if config.async_user_queries
+            else None
+        )
+        if async_engine is None:
+            return await query_executor.arun(self._engine.url, self._custom_run_sql, query, max_rows)
+
+        # Statements are awaited like in acustom_run_sql_batches, so they stop on the database when cancelled
+        async with query_executor.slot(self._engine.url):
+            if max_rows is None:
+                async with async_engine.begin() as connection:
+                    connection_info = (await connection.get_raw_connection()).info
+                    result = await await_interruptible(connection.execute(text(query)), connection_info)
+                    return list(result.keys()), result.fetchall()
+
+            limited_query = limit_select(query, self.dialect, max_rows)
+            if limited_query is not None:
+                try:
+                    async with async_engine.begin() as connection:
+                        connection_info = (await connection.get_raw_connection()).info
+                        result = await await_interruptible(connection.execute(limited_query), connection_info)
+                        return list(result.keys()), result.fetchall()
+                except DBAPIError as e:
+                    if is_statement_interrupted(e):
+                        raise
+                    logger.debug("Could not run row limited query, falling back to fetchmany", exc_info=True)
+
+            # Server side cursor, only the first rows are sent over before it is closed
+            async with async_engine.begin() as connection:
+                connection_info = (await connection.get_raw_connection()).info
+                stream = await await_interruptible(connection.stream(text(query)), connection_info)
+                rows = await await_interruptible(stream.fetchmany(max_rows), connection_info)
+                await stream.close()
+                return list(stream.keys()), rows
+
+    def _custom_run_sql(self, query: str, max_rows: int | None = None) -> tuple[list[Any], Sequence[Row[Any]]]:  # type: ignore[misc]
+        if max_rows is not None:
+            return self._run_sql_with_row_cap(query, max_rows)
+
+        # Executed like capped queries, so the query stops on the database if the caller goes away
+        with self._engine.begin() as connection:
+            result = self._execute_with_row_cap(connection, query, None, {})
+            rows = result.fetchall()
+            columns = list(result.keys())
+            return columns, rows
+
+    def _run_sql_with_row_cap(self, query: str, max_rows: int) -> tuple[list[Any], Sequence[Row[Any]]]:  # type: ignore[misc]
+        # Streamed where supported, only the first rows are sent over before it is closed
+        streamer = get_result_streamer(self._engine.dialect)
+        with self._engine.connect() as connection:
+            result = self._execute_with_row_cap(connection, query, max_rows, streamer.execution_options(query))
+            rows = result.fetchmany(max_rows)
+            columns = list(result.keys())
+            result.close()
+            connection.commit()
+            return columns, rows
+
+    def _execute_with_row_cap(  # type: ignore[misc]
+        self, connection: Connection, query: str, max_rows: int | None, execution_options: dict[str, Any]
+    ) -> CursorResult[Any]:
+        """Execute the query, wrapped so the database returns at most `max_rows` rows if possible."""
+        limited_query = limit_select(query, self.dialect, max_rows) if max_rows is not None else None
+        # Stop the query on the database if the caller goes away (ex. the browser closed the stream)
+        with query_executor.on_cancel(lambda: cancel_running_query(connection)):
+            if limited_query is not None:
+                try:
+                    return connection.execute(limited_query, execution_options=execution_options)
+                except DBAPIError as e:
+                    if query_executor.cancel_requested() or is_statement_interrupted(e):
+                        raise
+                    # ex. duplicate column names are not allowed in derived tables on MySQL and MSSQL
+                    logger.debug(
+                        "Could not run row limited query, falling back to fetching the first rows", exc_info=True
+                    )
+                    connection.rollback()
+            return connection.execute(text(query), execution_options=execution_options)
 
     @classmethod
     def from_dataline_connection(
         cls, connection: ConnectionProtocol, engine_args: dict | None = None, **kwargs: Any
     ) -> Self:
-        """Construct a SQLAlchemy engine from Dataline connection."""
+        """Construct a SQLAlchemy database from Dataline connection, reusing its registered engine."""
         if connection.options:
             enabled_schemas = [schema for schema in connection.options.schemas if schema.enabled]
             schemas_str = [schema.name for schema in enabled_schemas]
@@ -160,11 +472,20 @@ class DatalineSQLDatabase(SQLDatabase):
         else:
             schemas_str = None
             include_tables = None
-        return cls.from_uri(
-            database_uri=connection.dsn,
+        statement_timeout = resolve_statement_timeout(
+            connection.options.statement_timeout if connection.options else None
+        )
+        # Reuse the pooled engine for this connection instead of opening a new pool on every request
+        engine = engine_registry.get_engine(
+            connection.dsn, engine_args=engine_args, statement_timeout=statement_timeout
+        )
+        kwargs.setdefault("lazy_reflection", config.lazy_table_reflection)
+        return cls(
+            engine,
             schemas=schemas_str,
-            engine_args=engine_args,
             include_tables=include_tables,
+            metadata_cache_key=connection.dsn,
+            statement_timeout=statement_timeout,
             **kwargs,
         )
 
@@ -185,21 +506,26 @@ class DatalineSQLDatabase(SQLDatabase):
                 raise ValueError(f"table_names {missing_tables} not found in database")
             all_table_names = table_names
 
-        meta_tables = [
-            tbl
-            for tbl in self._metadata.sorted_tables
-            if f"{tbl.schema}.{tbl.name}" in set(all_table_names)
-            and not (self.dialect == "sqlite" and tbl.name.startswith("sqlite_"))
-        ]
+        if self._lazy_reflection and self._reflect_tables(all_table_names):
+            self._update_metadata_cache()
+
+        # The metadata may be shared with other instances reflecting into it, read it under their lock
+        with self._reflection_lock:
+            meta_tables = [
+                tbl
+                for tbl in self._metadata.sorted_tables
+                if f"{tbl.schema}.{tbl.name}" in set(all_table_names)
+                and not (self.dialect == "sqlite" and tbl.name.startswith("sqlite_"))
+            ]
+            create_tables = [str(CreateTable(table).compile(self._engine)) for table in meta_tables]
 
         tables = []
-        for table in meta_tables:
+        for table, create_table in zip(meta_tables, create_tables):
             if self._custom_table_info and table.name in self._custom_table_info:
                 tables.append(self._custom_table_info[table.name])
                 continue
 
             # add create table command
-            create_table = str(CreateTable(table).compile(self._engine))
             table_info = f"{create_table.rstrip()}"
             has_extra_info = self._indexes_in_table_info or self._sample_rows_in_table_info
             if has_extra_info:
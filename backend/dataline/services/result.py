@@ -1,27 +1,56 @@
-import csv
+import asyncio
 import logging
 from datetime import datetime
-from io import StringIO
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Sequence, cast
 from uuid import UUID
 
 from fastapi import Depends
 from fastapi.responses import StreamingResponse
 
+from dataline.config import config
 from dataline.errors import ValidationError
 from dataline.models.connection.schema import Connection
 from dataline.models.llm_flow.enums import QueryResultType
-from dataline.models.llm_flow.schema import ChartGenerationResultContent, SQLQueryStringResultContent
-from dataline.models.result.schema import ChartRefreshOut, ResultUpdate
-from dataline.repositories.base import AsyncSession, NotFoundError
+from dataline.models.llm_flow.schema import (
+    ChartGenerationResultContent,
+    SQLQueryRunResult,
+    SQLQueryStringResultContent,
+)
+from dataline.models.result.model import ResultModel
+from dataline.models.result.schema import (
+    ChartRefreshOut,
+    PageCursor,
+    ResultPageOut,
+    ResultUpdate,
+    RowFilter,
+)
+from dataline.repositories.base import AsyncSession, NotFoundError, SessionCreator
 from dataline.repositories.result import ResultRepository
+from dataline.services.llm_flow.export_stream import stream_csv_export, stream_xlsx_export
 from dataline.services.llm_flow.llm_calls.chart_generator import ChartType
-from dataline.services.llm_flow.toolkit import RunException, execute_sql_query, query_run_result_to_chart_json
+from dataline.services.llm_flow.pagination import next_cursor, page_columnar, paginate_query
+from dataline.services.llm_flow.query_executor import query_executor
+from dataline.services.llm_flow.toolkit import (
+    RunException,
+    aexecute_sql_query,
+    query_run_result_to_chart_json,
+)
 from dataline.services.llm_flow.utils import DatalineSQLDatabase as SQLDatabase
+from dataline.utils.arrow_export import ArrowExportWriter, ArrowFormat
+from dataline.utils.columnar import ColumnarResult, arrow_available
 
 
 logger = logging.getLogger(__name__)
 
+# Media type and file extension of the Arrow based exports
+_ARROW_EXPORT_TYPES: dict[ArrowFormat, tuple[str, str]] = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Results compressed per transaction by compress_stored_results, the event loop is busy while they are
+COMPRESSION_BATCH_SIZE = 20
+
 
 class ResultService:
     result_repo: ResultRepository
@@ -37,7 +66,8 @@ class ResultService:
             try:
                 chart_id = await self._validate_chart_sql(session, result_id, sql)
                 await self._update_sql(session, result_id, sql)
-                return await self.refresh_chart_result_data(session, chart_id)
+                # Reuses the result of the validation query
+                return await self.refresh_chart_result_data(session, chart_id, use_cache=True)
             except NotFoundError:
                 # TODO: Deal with faulty chart generation in a better way
                 # Chart generation probably failed, let's let it slide
@@ -70,7 +100,9 @@ class ResultService:
         content_dumps = new_content.model_dump_json()
         await self.result_repo.update_by_uuid(session, result_id, ResultUpdate(content=content_dumps))
 
-    async def refresh_chart_result_data(self, session: AsyncSession, chart_id: UUID) -> ChartRefreshOut:
+    async def refresh_chart_result_data(
+        self, session: AsyncSession, chart_id: UUID, use_cache: bool = False
+    ) -> ChartRefreshOut:
         chart_result = await self.result_repo.get_by_uuid(session, chart_id)
         chart_content = ChartGenerationResultContent.model_validate_json(chart_result.content)
         chart_type = ChartType[chart_content.chart_type]
@@ -83,10 +115,14 @@ class ResultService:
 
         # Get DSN from linked connection
         connection = await self.result_repo.get_connection_from_result(session, chart_id)
-        db = SQLDatabase.from_dataline_connection(Connection.model_validate(connection))
+        db = await query_executor.arun(
+            connection.dsn, SQLDatabase.from_dataline_connection, Connection.model_validate(connection)
+        )
 
         # Refresh chart data
-        query_run_data = execute_sql_query(db, sql_string, for_chart=True, chart_type=chart_type)
+        query_run_data = await aexecute_sql_query(
+            db, sql_string, for_chart=True, chart_type=chart_type, use_cache=use_cache
+        )
         updated_chartjs_json = query_run_result_to_chart_json(chart_content.chartjs_json, chart_type, query_run_data)
 
         # Store updated chart result
@@ -105,11 +141,13 @@ class ResultService:
     ) -> None:
         # Get DSN from linked connection
         connection = await self.result_repo.get_connection_from_result(session, result_id)
-        db = SQLDatabase.from_dataline_connection(Connection.model_validate(connection))
+        db = await query_executor.arun(
+            connection.dsn, SQLDatabase.from_dataline_connection, Connection.model_validate(connection)
+        )
 
         # Run query to ensure it's compatible with the linked chart
         try:
-            execute_sql_query(db, sql, for_chart=True, chart_type=chart_type)
+            await aexecute_sql_query(db, sql, for_chart=True, chart_type=chart_type, use_cache=True)
         except RunException:
             # TODO: Modify this based on chart type
             raise ValidationError(
@@ -117,23 +155,104 @@ class ResultService:
                 "Make sure to specify 2 columns, first for labels and second for values."
             )
 
+    async def get_result_page(
+        self,
+        session: AsyncSession,
+        result_id: UUID,
+        cursor: str | None = None,
+        limit: int = config.result_page_size,
+        sort_by: str | None = None,
+        descending: bool = False,
+        key: str | None = None,
+        filters: Sequence[str] = (),
+        live: bool = False,
+    ) -> ResultPageOut:
+        """
+        A page of the rows of a query run result, filtered (`column:op:value`) and sorted on the server.
+        Stored results are paged from their stored copy, with `live` the query is run again for the page: pages
+        continue after the last row when `key` names a column with unique values, by offset otherwise.
+        """
+        row_filters = [RowFilter.parse(expression) for expression in filters]
+        page_cursor = PageCursor(sort_by=sort_by, descending=descending, key=key)
+        if cursor:
+            page_cursor = PageCursor.decode(cursor)
+            if (page_cursor.sort_by, page_cursor.descending, page_cursor.key) != (sort_by, descending, key):
+                raise ValidationError("The cursor is for pages sorted differently")
+
+        result = await self.result_repo.get_by_uuid(session, result_id)
+        if live:
+            return await self._get_live_result_page(session, result, page_cursor, limit, row_filters)
+
+        if result.type != QueryResultType.SQL_QUERY_RUN_RESULT.value:
+            raise ValidationError("The provided result_id does not belong to an SQL_QUERY_RUN_RESULT")
+        query_run_result = SQLQueryRunResult.deserialize(result)
+        if row_filters or sort_by is not None:
+            page, total_rows = await asyncio.to_thread(
+                lambda: page_columnar(query_run_result.read_rows(), page_cursor, limit, row_filters)
+            )
+        else:
+            # Only the rows of the page are read from a result file
+            stop = page_cursor.offset + limit
+            page = await asyncio.to_thread(query_run_result.read_rows, page_cursor.offset, stop)
+            total_rows = query_run_result.total_rows
+
+        following = page_cursor.model_copy(update={"offset": page_cursor.offset + page.num_rows})
+        return ResultPageOut(
+            columns=page.columns,
+            # Rows as lists, like the rows of live pages
+            rows=[list(row) for row in page.rows()],
+            total_rows=total_rows,
+            next_cursor=following.encode() if page.num_rows and following.offset < total_rows else None,
+        )
+
+    async def _get_live_result_page(
+        self,
+        session: AsyncSession,
+        result: ResultModel,
+        cursor: PageCursor,
+        limit: int,
+        filters: list[RowFilter],
+    ) -> ResultPageOut:
+        # The SQL of a run result is in the query string result it is linked to
+        if result.type == QueryResultType.SQL_QUERY_RUN_RESULT.value and result.linked_id:
+            result = await self.result_repo.get_by_uuid(session, result.linked_id)
+        if result.type != QueryResultType.SQL_QUERY_STRING_RESULT.value:
+            raise ValidationError("The provided result_id does not belong to an SQL query result")
+        sql = SQLQueryStringResultContent.model_validate_json(result.content).sql
+
+        connection = await self.result_repo.get_connection_from_result(session, result.id)
+        db = await query_executor.arun(
+            connection.dsn, SQLDatabase.from_dataline_connection, Connection.model_validate(connection)
+        )
+        # One row more than the page tells whether there is a next page
+        page_sql = paginate_query(sql, db._engine.dialect, cursor, limit + 1, filters)
+        query_run_data = await aexecute_sql_query(db, page_sql, limit=limit)
+
+        following = next_cursor(cursor, query_run_data.columnar(), db._max_string_length)
+        return ResultPageOut(
+            columns=query_run_data.columns,
+            rows=query_run_data.rows,
+            next_cursor=following.encode() if query_run_data.has_more else None,
+        )
+
     @staticmethod
-    async def generate_csv(sql_query: str, db: SQLDatabase) -> AsyncGenerator[str, None]:
-        """Returns a generator to stream the results of an SQL query as a CSV file."""
-        buffer = StringIO()
-        writer = csv.writer(buffer)
-
-        # Execute the query and write results to CSV
-        for entry in db.custom_run_sql_stream(sql_query):
-            writer.writerow(entry)
-            if buffer.tell() > 1024 * 1024:  # Yield every ~1MB
-                yield buffer.getvalue()
-                buffer.seek(0)
-                buffer.truncate(0)
-
-        yield buffer.getvalue()  # Yield any remaining data
-
-    async def export_results_as_csv(self, session: AsyncSession, result_id: UUID) -> StreamingResponse:
+    async def generate_arrow(sql_query: str, db: SQLDatabase, file_format: ArrowFormat) -> AsyncGenerator[bytes, None]:
+        """Returns a generator to stream the results of an SQL query as a Parquet file or an Arrow IPC stream."""
+        writer = ArrowExportWriter(file_format)
+        batches = db.acustom_run_sql_batches(sql_query)
+        try:
+            columns = cast(list[str], await anext(batches))
+            async for batch in batches:
+                # Encoding is CPU bound, keep it off the event loop
+                data = await asyncio.to_thread(writer.write, ColumnarResult.from_rows(columns, batch))
+                if data:
+                    yield data
+            yield await asyncio.to_thread(writer.close, columns)
+        finally:
+            # Releases the cursor and the connection when the client goes away mid-download
+            await batches.aclose()
+
+    async def _get_export_query(self, session: AsyncSession, result_id: UUID) -> tuple[str, SQLDatabase]:
         # Fetch the SQL_QUERY_STRING_RESULT
         query_string_result = await self.result_repo.get_by_uuid(session, result_id)
         if query_string_result.type != QueryResultType.SQL_QUERY_STRING_RESULT.value:
@@ -141,13 +260,66 @@ class ResultService:
 
         # Parse the SQL query from the content
         query_content = SQLQueryStringResultContent.model_validate_json(query_string_result.content)
-        sql_query = query_content.sql
 
         # Get the connection for the result
         connection = await self.result_repo.get_connection_from_result(session, result_id)
-        db = SQLDatabase.from_dataline_connection(Connection.model_validate(connection))
+        db = await query_executor.arun(
+            connection.dsn, SQLDatabase.from_dataline_connection, Connection.model_validate(connection)
+        )
+        return query_content.sql, db
+
+    async def export_results_as_csv(
+        self, session: AsyncSession, result_id: UUID, gzip: bool = False
+    ) -> StreamingResponse:
+        sql_query, db = await self._get_export_query(session, result_id)
 
         # Create and return the StreamingResponse
-        response = StreamingResponse(self.generate_csv(sql_query, db), media_type="text/csv")
+        response = StreamingResponse(stream_csv_export(db, sql_query, gzip=gzip), media_type="text/csv")
+        if gzip:
+            response.headers["Content-Encoding"] = "gzip"
+            response.headers["Vary"] = "Accept-Encoding"
         response.headers["Content-Disposition"] = f"attachment; filename=export_{str(result_id)[:5]}.csv"
         return response
+
+    async def export_results_as_xlsx(self, session: AsyncSession, result_id: UUID) -> StreamingResponse:
+        sql_query, db = await self._get_export_query(session, result_id)
+
+        response = StreamingResponse(stream_xlsx_export(db, sql_query), media_type=XLSX_MEDIA_TYPE)
+        response.headers["Content-Disposition"] = f"attachment; filename=export_{str(result_id)[:5]}.xlsx"
+        return response
+
+    async def export_results_as_arrow(
+        self, session: AsyncSession, result_id: UUID, file_format: ArrowFormat
+    ) -> StreamingResponse:
+        if not arrow_available():
+            raise ValueError(f"Exporting to {file_format} requires pyarrow, install it on the server")
+        sql_query, db = await self._get_export_query(session, result_id)
+
+        media_type, extension = _ARROW_EXPORT_TYPES[file_format]
+        response = StreamingResponse(self.generate_arrow(sql_query, db, file_format), media_type=media_type)
+        response.headers["Content-Disposition"] = f"attachment; filename=export_{str(result_id)[:5]}.{extension}"
+        return response
+
+
+async def compress_stored_results(batch_size: int = COMPRESSION_BATCH_SIZE) -> int:
+    """
+    Compress the contents of results stored as text by earlier versions (see ResultContentType), a batch per
+    transaction to run next to requests. Returns how many were compressed.
+    """
+    result_repo = ResultRepository()
+    compressed = 0
+    try:
+        while True:
+            async with SessionCreator() as session, session.begin():
+                count = await result_repo.compress_contents(session, batch_size)
+            compressed += count
+            if count < batch_size:
+                break
+            await asyncio.sleep(0)
+    except Exception:
+        logger.exception("Compressing stored results failed after %d results", compressed)
+        return compressed
+
+    if compressed:
+        logger.info("Compressed %d stored results", compressed)
+    return compressed
@@ -0,0 +1,112 @@
+import io
+from typing import TYPE_CHECKING, Literal
+
+from dataline.utils.columnar import ColumnarResult
+
+if TYPE_CHECKING:
+    import pyarrow  # type: ignore[import-untyped]
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq  # type: ignore[import-untyped]
+except ImportError:  # Only needed for Parquet and Arrow output
+    pa = None
+    pq = None
+
+ArrowFormat = Literal["parquet", "arrow"]
+
+# Rows buffered into one Parquet row group, cursor batches are much smaller than a useful row group
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file collecting what the Arrow writers write until it is drained.
+    Unlike a truncated BytesIO, `tell` keeps counting, Parquet records the offsets of row groups with it.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ArrowExportWriter:
+    """
+    Encodes a query result to Parquet or to an Arrow IPC stream as its batches come in, returning the encoded
+    bytes of every batch so they can be streamed to the client. Requires pyarrow.
+
+    The schema is taken from the first batch, columns of unknown type (only NULLs) or of mixed types are written
+    as strings. Values of later batches that don't match the schema are converted where possible, see
+    `ColumnarResult.to_arrow`. Parquet batches are buffered into row groups of `PARQUET_ROW_GROUP_SIZE` rows.
+    """
+
+    def __init__(self, file_format: ArrowFormat) -> None:
+        if pa is None or (file_format == "parquet" and pq is None):
+            raise RuntimeError(f"pyarrow is required for {file_format} export")
+        self.file_format = file_format
+        self._sink = _ChunkSink()
+        self._schema: "pyarrow.Schema | None" = None
+        self._writer: "pyarrow.ipc.RecordBatchStreamWriter | pq.ParquetWriter | None" = None
+        self._pending: list["pyarrow.Table"] = []
+        self._pending_rows = 0
+
+    def write(self, data: ColumnarResult) -> bytes:
+        if self._writer is None:
+            self._writer = self._open(data)
+        table = data.to_arrow(self._schema)
+        if self.file_format == "arrow":
+            self._writer.write_table(table)
+        else:
+            self._pending.append(table)
+            self._pending_rows += table.num_rows
+            if self._pending_rows >= PARQUET_ROW_GROUP_SIZE:
+                self._flush_row_group(self._writer)
+        return self._sink.drain()
+
+    def close(self, columns: list[str] | None = None) -> bytes:
+        """Finish the file, `columns` are needed for the schema of a result without rows."""
+        if self._writer is None:
+            self._writer = self._open(ColumnarResult(columns or []))
+        if self._pending:
+            self._flush_row_group(self._writer)
+        self._writer.close()
+        return self._sink.drain()
+
+    def _open(self, first: ColumnarResult) -> "pyarrow.ipc.RecordBatchStreamWriter | pq.ParquetWriter":
+        self._schema = pa.schema([_stream_field(field) for field in first.to_arrow().schema])
+        output = pa.PythonFile(self._sink, mode="w")
+        if self.file_format == "arrow":
+            return pa.ipc.new_stream(output, self._schema)
+        return pq.ParquetWriter(output, self._schema)
+
+    def _flush_row_group(self, writer: "pq.ParquetWriter") -> None:
+        writer.write_table(pa.concat_tables(self._pending))
+        self._pending.clear()
+        self._pending_rows = 0
+
+
+def _stream_field(field: "pyarrow.Field") -> "pyarrow.Field":
+    """Field of the first batch widened for the batches after it."""
+    if pa.types.is_null(field.type):
+        # Only NULLs so far, the values may be anything
+        return field.with_type(pa.string())
+    if pa.types.is_decimal(field.type):
+        # Precision and scale are inferred from the values of the batch
+        return field.with_type(pa.decimal128(38, max(field.type.scale, 9)))
+    return field
@@ -0,0 +1,162 @@
+import csv
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import TYPE_CHECKING, Any, Iterable, Literal, Self, Sequence, TextIO
+
+from pydantic_core import to_json
+
+if TYPE_CHECKING:
+    import pyarrow  # type: ignore[import-untyped]
+
+try:
+    import pyarrow as pa
+except ImportError:  # Only needed for Arrow output
+    pa = None
+
+
+logger = logging.getLogger(__name__)
+
+# Rows encoded at a time by ColumnarResult.to_json
+JSON_CHUNK_ROWS = 10_000
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+class ColumnarResult:
+    """
+    Query result held column by column.
+
+    Built from the row batches fetched from the cursor, each batch is transposed in one go (`zip(*batch)`) instead
+    of copying rows cell by cell. Serializing to JSON, CSV or Arrow works on the columns directly, without going
+    through pydantic models or `jsonable_encoder` for every row.
+    """
+
+    __slots__ = ("columns", "arrays")
+
+    def __init__(self, columns: list[str], arrays: list[list[Any]] | None = None) -> None:  # type: ignore[misc]
+        self.columns = columns
+        self.arrays = arrays if arrays is not None else [[] for _ in columns]
+
+    @classmethod
+    def from_rows(cls, columns: list[str], rows: Iterable[Sequence[Any]]) -> Self:  # type: ignore[misc]
+        result = cls(columns)
+        result.extend(rows)
+        return result
+
+    def extend(self, rows: Iterable[Sequence[Any]]) -> None:  # type: ignore[misc]
+        """Append a batch of rows (ex. a partition fetched from the cursor)."""
+        for array, values in zip(self.arrays, zip(*rows)):
+            array.extend(values)
+
+    def extend_columns(self, columns: Sequence[Sequence[Any]]) -> None:  # type: ignore[misc]
+        """Append a batch given column by column, the columns must be of the same length."""
+        for array, values in zip(self.arrays, columns):
+            array.extend(values)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.arrays[0]) if self.arrays else 0
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def rows(self) -> list[tuple[Any, ...]]:  # type: ignore[misc]
+        if not self.arrays:
+            return []
+        return list(zip(*self.arrays))
+
+    def slice(self, start: int, stop: int | None = None) -> Self:
+        return type(self)(self.columns, [array[start:stop] for array in self.arrays])
+
+    def to_json(self, orient: Literal["rows", "columns"] = "rows") -> bytes:
+        """
+        JSON array of the rows (or of the columns), encoded like pydantic does for API responses
+        (ex. decimals as strings, datetimes in ISO 8601).
+        Rows are encoded a chunk at a time, so they are never all held as tuples next to the columns.
+        """
+        if orient == "columns":
+            return to_json(self.arrays)
+        chunks = (
+            to_json(list(zip(*(array[start : start + JSON_CHUNK_ROWS] for array in self.arrays))))[1:-1]
+            for start in range(0, self.num_rows, JSON_CHUNK_ROWS)
+        )
+        return b"[" + b",".join(chunks) + b"]"
+
+    def write_csv(self, file: TextIO, header: bool = True) -> None:
+        writer = csv.writer(file)
+        if header:
+            writer.writerow(self.columns)
+        writer.writerows(zip(*self.arrays))
+
+    def to_arrow(self, schema: "pyarrow.Schema | None" = None) -> "pyarrow.Table":
+        """
+        Arrow table of the result, columns of mixed types are converted to strings. Requires pyarrow.
+        With `schema` (ex. the schema of the first batch of a stream), columns are converted to its types,
+        see `_to_arrow_type` for values that don't fit.
+        """
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Arrow output")
+
+        arrays = []
+        for index, values in enumerate(self.arrays):
+            arrow_type = schema.field(index).type if schema is not None else None
+            if arrow_type is not None and not pa.types.is_string(arrow_type):
+                arrays.append(_to_arrow_type(values, arrow_type, self.columns[index]))
+                continue
+            try:
+                arrays.append(pa.array(values, arrow_type))
+            except pa.ArrowException:
+                arrays.append(pa.array([None if value is None else str(value) for value in values], pa.string()))
+        if schema is not None:
+            return pa.Table.from_arrays(arrays, schema=schema)
+        return pa.Table.from_arrays(arrays, names=self.columns)
+
+    def to_arrow_ipc(self) -> bytes:
+        """Arrow IPC stream of the result. Requires pyarrow."""
+        table = self.to_arrow()
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return bytes(sink.getvalue())
+
+
+def _to_arrow_type(  # type: ignore[misc]
+    values: list[Any], arrow_type: "pyarrow.DataType", column: str
+) -> "pyarrow.Array":
+    """
+    Values of a column converted to a type set beforehand (ex. by the first batch of a stream), which later values
+    may not match: a float in an integer column, a decimal with more digits after the point, ...
+    Conversions that lose nothing are applied, decimals are rounded to the scale of the type and other values
+    that don't fit are written as NULL, rather than failing the whole stream.
+    """
+    try:
+        # Safe casts only, 3.0 fits an integer column and 3.5 does not
+        return pa.array(values).cast(arrow_type)
+    except (pa.ArrowException, OverflowError, TypeError, ValueError):
+        pass
+
+    if pa.types.is_decimal(arrow_type):
+        exponent = Decimal(1).scaleb(-arrow_type.scale)
+        values = [_round_decimal(value, exponent) if isinstance(value, Decimal) else value for value in values]
+
+    converted = []
+    dropped = 0
+    for value in values:
+        try:
+            converted.append(None if value is None else pa.array([value]).cast(arrow_type)[0].as_py())
+        except (pa.ArrowException, OverflowError, TypeError, ValueError):
+            converted.append(None)
+            dropped += 1
+    if dropped:
+        logger.warning("Wrote %d values of column %s that don't fit its type %s as NULL", dropped, column, arrow_type)
+    return pa.array(converted, arrow_type)
+
+
+def _round_decimal(value: Decimal, exponent: Decimal) -> Decimal:
+    try:
+        return value.quantize(exponent)
+    except InvalidOperation:
+        # More digits than the decimal context holds, left as is to be dropped
+        return value
@@ -0,0 +1,23 @@
+import zlib
+
+# Encoded contents: MAGIC, format version (1 byte), payload. Contents stored before the codec are JSON text.
+MAGIC = b"DLC"
+ZLIB_VERSION = 1
+COMPRESSION_LEVEL = 6
+
+
+def encode_result_content(content: str) -> bytes:
+    """Compress the content of a result (the JSON of its *Content schema) to store it."""
+    return MAGIC + bytes([ZLIB_VERSION]) + zlib.compress(content.encode(), COMPRESSION_LEVEL)
+
+
+def decode_result_content(stored: str | bytes) -> str:
+    """The content of a result as it was before it was stored, stored as text or encoded."""
+    if isinstance(stored, str):
+        return stored
+    if not stored.startswith(MAGIC) or len(stored) <= len(MAGIC):
+        raise ValueError("Stored result content is not in a known encoding")
+    version = stored[len(MAGIC)]
+    if version == ZLIB_VERSION:
+        return zlib.decompress(stored[len(MAGIC) + 1 :]).decode()
+    raise ValueError(f"Stored result content is encoded with unknown version {version}")
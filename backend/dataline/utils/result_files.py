@@ -0,0 +1,135 @@
+import json
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Self, TypedDict
+
+from pydantic_core import to_json
+
+from dataline.config import config
+from dataline.utils.columnar import ColumnarResult
+
+# File layout: MAGIC, JSON column blocks per row group, JSON footer, footer length (uint64 LE), MAGIC
+MAGIC = b"DLRES1"
+_FOOTER_LENGTH = struct.Struct("<Q")
+ROW_GROUP_SIZE = 10_000
+SUFFIX = ".dlres"
+# Part of the stored content of results whose rows were written to a file (see SQLQueryRunResultContent.spill)
+SPILLED_CONTENT_MARKER = '"spill":{'
+
+
+class _RowGroup(TypedDict):
+    num_rows: int
+    # (offset, length) of the JSON array of each column
+    blocks: list[tuple[int, int]]
+
+
+def result_files_directory() -> Path:
+    return Path(config.data_directory) / "results"
+
+
+def remove_unreferenced_result_files(referenced: set[str], min_age_seconds: float = 3600) -> int:
+    """
+    Delete result files not in `referenced` (ex. of deleted conversations), returns how many were deleted.
+    Recent files are kept, their result may not be committed yet.
+    """
+    directory = result_files_directory()
+    if not directory.exists():
+        return 0
+
+    removed = 0
+    cutoff = time.time() - min_age_seconds
+    for path in directory.iterdir():
+        if path.name in referenced or path.suffix not in (SUFFIX, ".tmp"):
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            # ex. still mapped by a reader on Windows, next time then
+            continue
+    return removed
+
+
+def write_result_file(data: ColumnarResult, path: Path, row_group_size: int = ROW_GROUP_SIZE) -> int:
+    """
+    Write the result column by column, in groups of `row_group_size` rows, returns the size of the file.
+    Values are encoded like the stored JSON results (see SQLQueryRunResult.to_result_create).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC)
+        row_groups: list[_RowGroup] = []
+        for start in range(0, data.num_rows, row_group_size):
+            group = data.slice(start, start + row_group_size)
+            blocks = []
+            for array in group.arrays:
+                block = to_json(array)
+                blocks.append((file.tell(), len(block)))
+                file.write(block)
+            row_groups.append({"num_rows": group.num_rows, "blocks": blocks})
+
+        footer = to_json({"columns": data.columns, "num_rows": data.num_rows, "row_groups": row_groups})
+        file.write(footer)
+        file.write(_FOOTER_LENGTH.pack(len(footer)))
+        file.write(MAGIC)
+    # Readers never see a partially written file
+    os.replace(temp_path, path)
+    return path.stat().st_size
+
+
+class ResultFile:
+    """
+    Memory-mapped reader of a file written by `write_result_file`.
+    Only the row groups covering the requested rows are read and parsed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            end = len(self._mmap) - len(MAGIC)
+            if self._mmap[: len(MAGIC)] != MAGIC or self._mmap[end:] != MAGIC:
+                raise ValueError(f"Not a result file: {path}")
+            (footer_length,) = _FOOTER_LENGTH.unpack(self._mmap[end - _FOOTER_LENGTH.size : end])
+            footer_start = end - _FOOTER_LENGTH.size - footer_length
+            footer = json.loads(self._mmap[footer_start : end - _FOOTER_LENGTH.size])
+        except Exception:
+            self._mmap.close()
+            raise
+
+        self.columns: list[str] = footer["columns"]
+        self.num_rows: int = footer["num_rows"]
+        self._row_groups: list[_RowGroup] = footer["row_groups"]
+
+    def read(self, start: int = 0, stop: int | None = None) -> ColumnarResult:
+        """Rows `start` to `stop` (exclusive, defaults to the end)."""
+        stop = self.num_rows if stop is None else min(stop, self.num_rows)
+        result = ColumnarResult(self.columns)
+        group_start = 0
+        for group in self._row_groups:
+            group_stop = group_start + group["num_rows"]
+            if group_start < stop and group_stop > start:
+                arrays = [json.loads(self._mmap[offset : offset + length]) for offset, length in group["blocks"]]
+                skip, take = max(start - group_start, 0), min(stop, group_stop) - group_start
+                result.extend_columns([array[skip:take] for array in arrays])
+            group_start = group_stop
+            if group_start >= stop:
+                break
+        return result
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
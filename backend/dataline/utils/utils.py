@@ -1,3 +1,4 @@
+import asyncio
 import base64
 import logging
 import random
@@ -53,6 +54,13 @@ async def generate_with_errors(generator: AsyncGenerator[str, None]) -> AsyncGen
     except UserFacingError as e:
         logger.exception("Error in conversation query generator")
         yield stream_event_str(QueryStreamingEventType.ERROR.value, str(e))
+    except asyncio.CancelledError:
+        # StreamingResponse cancels streaming when the client disconnects, which cancels the graph and its queries
+        logger.info("Client disconnected, conversation query cancelled")
+        raise
+    finally:
+        # Stop the graph right away if streaming ended early, instead of whenever the generator is garbage collected
+        await generator.aclose()
 
 
 def forward_connection_errors(error: Exception) -> None:
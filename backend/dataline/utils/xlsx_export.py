@@ -0,0 +1,74 @@
+import math
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import IO, Any, Iterable, Sequence
+
+from openpyxl import Workbook  # type: ignore[import-untyped]
+from openpyxl.cell import WriteOnlyCell  # type: ignore[import-untyped]
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE  # type: ignore[import-untyped]
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet  # type: ignore[import-untyped]
+
+# Rows of a worksheet (including the header) and characters of a cell Excel can open
+MAX_SHEET_ROWS = 1_048_576
+MAX_CELL_LENGTH = 32_767
+SHEET_TITLE = "Results"
+
+
+def write_xlsx(  # type: ignore[misc]
+    columns: list[str], batches: Iterable[Sequence[Sequence[Any]]], file: IO[bytes], sheet_rows: int = MAX_SHEET_ROWS
+) -> None:
+    """
+    Write the rows to an Excel workbook, continuing on a new sheet (with the header again) every `sheet_rows` rows.
+
+    The workbook is write-only: openpyxl writes the rows of each sheet to a temporary file as they are appended and
+    assembles the workbook when it is saved, so the rows are never all in memory.
+    """
+    workbook = Workbook(write_only=True)
+    sheet: WriteOnlyWorksheet | None = None
+    sheet_count = used_rows = 0
+    for batch in batches:
+        for row in batch:
+            if sheet is None or used_rows >= sheet_rows:
+                sheet_count += 1
+                sheet = _create_sheet(workbook, columns, sheet_count)
+                used_rows = 1
+            sheet.append([_cell_value(sheet, value) for value in row])
+            used_rows += 1
+    if sheet is None:
+        _create_sheet(workbook, columns, 1)
+    workbook.save(file)
+
+
+def _create_sheet(workbook: Workbook, columns: list[str], number: int) -> WriteOnlyWorksheet:
+    sheet = workbook.create_sheet(SHEET_TITLE if number == 1 else f"{SHEET_TITLE} {number}")
+    sheet.append([_cell_value(sheet, column) for column in columns])
+    return sheet
+
+
+def _cell_value(sheet: WriteOnlyWorksheet, value: Any) -> Any:  # type: ignore[misc]
+    """The value as openpyxl can write it and Excel can open it."""
+    if value is None or isinstance(value, (bool, int)):
+        return value
+    if isinstance(value, float):
+        # Excel has no NaN or infinity
+        return value if math.isfinite(value) else str(value)
+    if isinstance(value, Decimal):
+        return value if value.is_finite() else str(value)
+    if isinstance(value, datetime):
+        # Excel has no time zones either
+        return value if value.tzinfo is None else value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, time):
+        return value.replace(tzinfo=None)
+    if isinstance(value, (date, timedelta)):
+        return value
+    if not isinstance(value, str):
+        # ex. UUIDs, JSON, bytes, written like the CSV export does
+        value = str(value)
+
+    value = ILLEGAL_CHARACTERS_RE.sub("", value)[:MAX_CELL_LENGTH]
+    if value.startswith("="):
+        # Text, not a formula
+        cell = WriteOnlyCell(sheet, value)
+        cell.data_type = "s"
+        return cell
+    return value
@@ -0,0 +1,101 @@
+"""
+Compare collecting query results row by row (truncating every cell) against the column-wise collector.
+
+Usage (from the backend directory):
+    python -m scripts.benchmark_truncation [--rows N] [--columns N] [--runs N]
+
+Rows are generated in memory and fed in batches like the cursor does, so only the collection is timed.
+"""
+
+import argparse
+import random
+import statistics
+import string
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable
+
+from dataline.services.llm_flow.toolkit import QueryResultCollector, truncate_word
+
+MAX_STRING_LENGTH = 300
+BATCH_SIZE = 1000
+
+
+def generate_rows(rows: int, columns: int) -> list[tuple[Any, ...]]:  # type: ignore[misc]
+    rng = random.Random(0)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(500)]
+    makers: list[Callable[[int], Any]] = [  # type: ignore[misc]
+        lambda i: i,
+        lambda i: rng.random() * 1000,
+        lambda i: " ".join(rng.choices(words, k=3)),
+        lambda i: datetime(2024, 1, 1) + timedelta(minutes=i),
+        lambda i: Decimal(i) / 100,
+        # Mostly short, sometimes longer than MAX_STRING_LENGTH
+        lambda i: " ".join(rng.choices(words, k=80 if i % 50 == 0 else 5)),
+        lambda i: None if i % 3 else "maybe",
+    ]
+    return [tuple(makers[column % len(makers)](i) for column in range(columns)) for i in range(rows)]
+
+
+def collect_rowwise(batches: list[list[tuple[Any, ...]]]) -> list[tuple[Any, ...]]:  # type: ignore[misc]
+    """The previous implementation: every cell through truncate_word, every row measured on its own."""
+    kept: list[tuple[Any, ...]] = []  # type: ignore[misc]
+    byte_count = 0
+    for batch in batches:
+        for row in batch:
+            truncated_row = tuple(truncate_word(value, length=MAX_STRING_LENGTH) for value in row)
+            size = 0
+            for value in truncated_row:
+                if isinstance(value, (str, bytes)):
+                    size += len(value)
+                elif value is None:
+                    size += 4
+                else:
+                    size += len(str(value))
+                size += 3
+            kept.append(truncated_row)
+            byte_count += size
+    return kept
+
+
+def collect_columnwise(  # type: ignore[misc]
+    batches: list[list[tuple[Any, ...]]], columns: int
+) -> list[tuple[Any, ...]]:
+    collector = QueryResultCollector(MAX_STRING_LENGTH, max_rows=10**9, max_bytes=2**62)
+    collector.start([f"c{i}" for i in range(columns)])
+    for batch in batches:
+        collector.add_batch(batch)
+    return collector.data.rows()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = generate_rows(args.rows, args.columns)
+    batches = [rows[i : i + BATCH_SIZE] for i in range(0, len(rows), BATCH_SIZE)]
+
+    timings: dict[str, list[float]] = {"row-wise": [], "column-wise": []}
+    results = {}
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        results["row-wise"] = collect_rowwise(batches)
+        timings["row-wise"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        results["column-wise"] = collect_columnwise(batches, args.columns)
+        timings["column-wise"].append(time.perf_counter() - start)
+
+    rowwise, columnwise = (statistics.median(timings[name]) for name in ("row-wise", "column-wise"))
+    print(f"{args.rows} rows x {args.columns} columns, median of {args.runs} runs")
+    print(f"{'row-wise':<12} {rowwise * 1000:>8.1f}ms")
+    print(f"{'column-wise':<12} {columnwise * 1000:>8.1f}ms {rowwise / columnwise:>6.1f}x")
+    print(f"same rows: {results['row-wise'] == results['column-wise']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,41 @@
+import io
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncGenerator
+from uuid import uuid4
+
 import pytest
 from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, BaseMessage
+from pydantic import SecretStr
+from sqlalchemy import event, text
+from openpyxl import load_workbook  # type: ignore[import-untyped]
 
+from dataline.config import config
 from dataline.models.connection.schema import Connection
 from dataline.models.conversation.schema import ConversationOut
+from dataline.models.llm_flow.schema import (
+    ChartGenerationResult,
+    ResultType,
+    SelectedTablesResult,
+    SQLQueryRunResult,
+    SQLQueryStringResult,
+)
+from dataline.models.message.schema import MessageCreate
+from dataline.models.user.schema import UserWithKeys
+from dataline.repositories.base import AsyncSession
+from dataline.repositories.connection import ConnectionRepository
+from dataline.repositories.conversation import ConversationCreate, ConversationRepository
+from dataline.repositories.message import MessageRepository
+from dataline.repositories.media import MediaRepository
+from dataline.repositories.result import ResultRepository
+from dataline.repositories.user import UserRepository
+from dataline.services import result as result_service
+from dataline.services.connection import ConnectionService
+from dataline.services.conversation import ConversationService
+from dataline.services.llm_flow.query_executor import query_executor
+from dataline.services.settings import SettingsService
 
 
 @pytest.mark.asyncio
@@ -61,6 +94,107 @@ async def test_get_conversation(client: TestClient, sample_conversation: Convers
     assert result["name"] == sample_conversation.name
 
 
+@pytest.mark.asyncio
+async def test_conversation_summaries(
+    client: TestClient, session: AsyncSession, dvdrental_connection: Connection
+) -> None:
+    conversation_repo = ConversationRepository()
+    created = [datetime(2024, 1, day) for day in (1, 2, 2, 3, 4)]
+    conversations = [
+        await conversation_repo.create(
+            session, ConversationCreate(connection_id=dvdrental_connection.id, name=f"convo {i}", created_at=created_at)
+        )
+        for i, created_at in enumerate(created)
+    ]
+    for i, content in enumerate(["first", "second " * 100]):
+        await MessageRepository().create(
+            session,
+            MessageCreate(
+                content=content,
+                role="human" if i == 0 else "ai",
+                conversation_id=conversations[1].id,
+                created_at=datetime(2024, 2, 1, i),
+            ),
+        )
+
+    pages = []
+    cursor = None
+    while True:
+        response = client.get("/conversations/summary", params={"limit": 2, "cursor": cursor})
+        assert response.status_code == 200
+        page = response.json()["data"]
+        pages.append(page["conversations"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    summaries = [summary for page in pages for summary in page]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    # Newest first, conversations created at the same time ordered by id
+    tied = sorted((conversations[1], conversations[2]), key=lambda conversation: str(conversation.id), reverse=True)
+    expected = [conversations[4], conversations[3], *tied, conversations[0]]
+    assert [summary["id"] for summary in summaries] == [str(conversation.id) for conversation in expected]
+
+    with_messages = next(summary for summary in summaries if summary["id"] == str(conversations[1].id))
+    assert with_messages["message_count"] == 2
+    assert with_messages["last_message_role"] == "ai"
+    assert with_messages["last_message_preview"] == ("second " * 100)[:200]
+    assert "messages" not in with_messages
+    assert summaries[0]["message_count"] == 0
+    assert summaries[0]["last_message_role"] is None
+
+    response = client.get("/conversations/summary", params={"cursor": "not a cursor"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_messages_pages(
+    client: TestClient, session: AsyncSession, sample_conversation: ConversationOut
+) -> None:
+    messages = [
+        await MessageRepository().create(
+            session,
+            MessageCreate(
+                content=f"message {i}",
+                role="human" if i % 2 == 0 else "ai",
+                conversation_id=sample_conversation.id,
+                created_at=datetime(2024, 1, 1, i),
+            ),
+        )
+        for i in range(5)
+    ]
+    query = SQLQueryStringResult(sql="SELECT 1")
+    await query.store_result(session, ResultRepository(), messages[3].id)
+
+    url = f"/conversation/{sample_conversation.id}/messages"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert [message["message"]["content"] for message in response.json()["data"]] == [f"message {i}" for i in range(5)]
+
+    pages = []
+    before = None
+    while True:
+        response = client.get(url, params={"limit": 2, **({"before": before} if before else {})})
+        assert response.status_code == 200
+        page = response.json()["data"]
+        if not page:
+            break
+        pages.append([message["message"]["content"] for message in page])
+        before = page[0]["message"]["id"]
+        if page[-1]["message"]["content"] == "message 3":
+            assert page[-1]["results"][0]["content"]["sql"] == "SELECT 1"
+
+    # Newest page first, messages oldest first in each page
+    assert pages == [["message 3", "message 4"], ["message 1", "message 2"], ["message 0"]]
+
+    response = client.get(f"/conversation/{uuid4()}/messages", params={"limit": 2})
+    assert response.status_code == 404
+
+    # Unknown message to page from
+    response = client.get(url, params={"limit": 2, "before": str(uuid4())})
+    assert response.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_get_conversation_with_messages_with_results(
     client: TestClient, sample_conversation: ConversationOut
@@ -68,6 +202,285 @@ async def test_get_conversation_with_messages_with_results(
     client.get(f"/conversation/{sample_conversation.id}/messages")
 
 
+@pytest.mark.asyncio
+async def test_large_results_are_stored_in_files(
+    client: TestClient,
+    session: AsyncSession,
+    sample_conversation: ConversationOut,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(config, "data_directory", str(tmp_path))
+    monkeypatch.setattr(config, "result_spill_threshold_bytes", 1000)
+    message = await MessageRepository().create(
+        session, MessageCreate(content="", role="ai", conversation_id=sample_conversation.id)
+    )
+    rows = [[i, f"name {i}"] for i in range(25_000)]
+    small = SQLQueryRunResult(columns=["id", "name"], rows=rows[:2], byte_count=40, linked_id=uuid4())
+    large = SQLQueryRunResult(columns=["id", "name"], rows=rows, byte_count=500_000, linked_id=uuid4())
+
+    stored_small = await small.store_result(session, ResultRepository(), message.id, small.linked_id)
+    stored_large = await large.store_result(session, ResultRepository(), message.id, large.linked_id)
+    assert '"rows":[[0,"name 0"],[1,"name 1"]]' in stored_small.content
+    assert '"rows":[]' in stored_large.content
+    (result_file,) = (tmp_path / "results").iterdir()
+
+    # The first page is read back when rendered, the others by page
+    rendered = SQLQueryRunResult.deserialize(stored_large).serialize_result()
+    assert [list(row) for row in rendered.content["rows"]] == rows[: config.result_page_size]
+    assert rendered.content["columns"] == ["id", "name"]
+    assert rendered.content["total_rows"] == 25_000
+    cursor = rendered.content["next_cursor"]
+    response = client.get(f"/result/{stored_large.id}/rows", params={"limit": 2, "cursor": cursor})
+    assert response.json()["data"]["rows"] == rows[config.result_page_size : config.result_page_size + 2]
+
+    response = client.get(f"/result/{stored_large.id}/rows", params={"limit": 3, "cursor": None})
+    page = response.json()["data"]
+    assert page["rows"] == rows[:3]
+    assert page["total_rows"] == 25_000
+    response = client.get(f"/result/{stored_large.id}/rows", params={"limit": 3, "cursor": page["next_cursor"]})
+    assert response.json()["data"]["rows"] == rows[3:6]
+
+    params = {"sort_by": "id", "descending": True, "filter": ["name:contains:99"], "limit": 2}
+    page = client.get(f"/result/{stored_large.id}/rows", params=params).json()["data"]
+    assert page["rows"] == [[24999, "name 24999"], [24998, "name 24998"]]
+    assert page["total_rows"] == sum("99" in name for _, name in rows)
+    response = client.get(f"/result/{stored_large.id}/rows", params={"cursor": page["next_cursor"], "limit": 2})
+    assert response.status_code == 400
+
+    # Deleted with the conversation
+    os.utime(result_file, (0, 0))
+    response = client.delete(f"/conversation/{sample_conversation.id}")
+    assert response.status_code == 200
+    assert not result_file.exists()
+
+
+@pytest.mark.asyncio
+async def test_live_result_pages(
+    client: TestClient, session: AsyncSession, sample_conversation: ConversationOut
+) -> None:
+    message = await MessageRepository().create(
+        session, MessageCreate(content="", role="ai", conversation_id=sample_conversation.id)
+    )
+    query = SQLQueryStringResult(
+        sql="WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 40) "
+        "SELECT x AS id, x % 5 AS amount FROM n"
+    )
+    stored_query = await query.store_result(session, ResultRepository(), message.id)
+
+    params = {"live": True, "sort_by": "amount", "key": "id", "filter": "amount:ge:2", "limit": 10}
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(f"/result/{stored_query.id}/rows", params={**params, "cursor": cursor})
+        assert response.status_code == 200
+        page = response.json()["data"]
+        pages.append(page["rows"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    rows = [row for page in pages for row in page]
+    assert len(pages) == 3
+    assert sorted(rows) == sorted([i, i % 5] for i in range(1, 41) if i % 5 >= 2)
+    assert rows == sorted(rows, key=lambda row: (row[1], row[0]))
+
+
+@pytest.mark.asyncio
+async def test_export_results_as_csv(
+    client: TestClient, session: AsyncSession, sample_conversation: ConversationOut
+) -> None:
+    message = await MessageRepository().create(
+        session, MessageCreate(content="", role="ai", conversation_id=sample_conversation.id)
+    )
+    query = SQLQueryStringResult(
+        sql="WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 2500) "
+        "SELECT x AS id, 'name ' || x AS name FROM n"
+    )
+    stored_query = await query.store_result(session, ResultRepository(), message.id)
+    expected = "id,name\r\n" + "".join(f"{i},name {i}\r\n" for i in range(1, 2501))
+
+    response = client.get(f"/result/{stored_query.id}/export-csv", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.text == expected
+
+    response = client.get(f"/result/{stored_query.id}/export-csv", headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    # Decompressed by the client
+    assert response.text == expected
+
+    response = client.get("/metrics")
+    assert response.json()["data"]["exports"]["completed"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_export_results_as_xlsx(
+    client: TestClient, session: AsyncSession, sample_conversation: ConversationOut
+) -> None:
+    message = await MessageRepository().create(
+        session, MessageCreate(content="", role="ai", conversation_id=sample_conversation.id)
+    )
+    query = SQLQueryStringResult(
+        sql="WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 2500) "
+        "SELECT x AS id, 'name ' || x AS name FROM n"
+    )
+    stored_query = await query.store_result(session, ResultRepository(), message.id)
+
+    response = client.get(f"/result/{stored_query.id}/export-xlsx")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith(".xlsx")
+    sheet = load_workbook(io.BytesIO(response.content), read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0] == ("id", "name")
+    assert rows[1:] == [(i, f"name {i}") for i in range(1, 2501)]
+
+
+@pytest.mark.asyncio
+async def test_export_results_as_arrow(
+    client: TestClient, session: AsyncSession, sample_conversation: ConversationOut, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    message = await MessageRepository().create(
+        session, MessageCreate(content="", role="ai", conversation_id=sample_conversation.id)
+    )
+    query = SQLQueryStringResult(
+        sql="WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 2500) "
+        "SELECT x AS id, 'name ' || x AS name FROM n"
+    )
+    stored_query = await query.store_result(session, ResultRepository(), message.id)
+
+    monkeypatch.setattr(result_service, "arrow_available", lambda: False)
+    response = client.get(f"/result/{stored_query.id}/export-parquet")
+    assert response.status_code == 400
+    monkeypatch.undo()
+
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    response = client.get(f"/result/{stored_query.id}/export-parquet")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith(".parquet")
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column_names == ["id", "name"]
+    assert table.column("id").to_pylist() == list(range(1, 2501))
+
+    response = client.get(f"/result/{stored_query.id}/export-arrow")
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("name").to_pylist()[-1] == "name 2500"
+
+
+@pytest.mark.asyncio
+async def test_query_stores_messages_and_linked_results_in_bulk(
+    session: AsyncSession, sample_conversation: ConversationOut, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    query = SQLQueryStringResult(sql="SELECT title FROM film", for_chart=True)
+    graph_results: list[ResultType] = [
+        SelectedTablesResult(tables=["film"], linked_id=query.ephemeral_id),
+        query,
+        SQLQueryRunResult(columns=["title"], rows=[["Alien"]], linked_id=query.ephemeral_id, for_chart=True),
+        ChartGenerationResult(chartjs_json="{}", chart_type="bar", linked_id=query.ephemeral_id),
+    ]
+
+    class Graph:
+        async def query(  # type: ignore[misc]
+            self, **kwargs: Any
+        ) -> AsyncGenerator[tuple[list[BaseMessage] | None, list[ResultType] | None], None]:
+            yield [AIMessage(content="Here are the films")], graph_results
+
+    async def get_graph(*args: Any, **kwargs: Any) -> Graph:  # type: ignore[misc]
+        return Graph()
+
+    async def get_model_details(self: SettingsService, session: AsyncSession) -> UserWithKeys:
+        return UserWithKeys(openai_api_key=SecretStr("sk-test"), preferred_openai_model="gpt-4o", sentry_enabled=False)
+
+    monkeypatch.setattr(query_executor, "arun", get_graph)
+    monkeypatch.setattr(SettingsService, "get_model_details", get_model_details)
+
+    inserts: list[str] = []
+
+    def record_insert(*args: Any) -> None:  # type: ignore[misc]
+        if args[2].startswith("INSERT"):
+            inserts.append(args[2])
+
+    service = ConversationService(
+        ConversationRepository(),
+        MessageRepository(),
+        ResultRepository(),
+        ConnectionService(ConnectionRepository(), ResultRepository()),
+        SettingsService(MediaRepository(), UserRepository()),
+    )
+    sync_engine = session.get_bind()
+    event.listen(sync_engine, "before_cursor_execute", record_insert)
+    try:
+        events = [event async for event in service.query(session, sample_conversation.id, "Films?")]
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record_insert)
+
+    # One insert for both messages, one for all results
+    assert [statement.split()[2] for statement in inserts] == ["messages", "results"]
+    assert "stored_messages_event" in events[-1]
+
+    stored = {result.type: result for result in await ResultRepository().list_all(session)}
+    query_id = stored["SQL_QUERY_STRING_RESULT"].id
+    assert query.result_id == query_id
+    assert stored["SELECTED_TABLES"].linked_id == query_id
+    assert stored["SQL_QUERY_RUN_RESULT"].linked_id == query_id
+    assert stored["CHART_GENERATION_RESULT"].linked_id == query_id
+    # The rendered results are linked by the stored ids as well
+    assert all(getattr(result, "linked_id") == query_id for result in graph_results if result is not query)
+
+
+@pytest.mark.asyncio
+async def test_stored_contents_are_compressed(
+    session: AsyncSession, sample_conversation: ConversationOut, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(config, "data_directory", str(tmp_path))
+    monkeypatch.setattr(config, "result_spill_threshold_bytes", 100_000)
+    message = await MessageRepository().create(
+        session, MessageCreate(content="", role="ai", conversation_id=sample_conversation.id)
+    )
+    rows = [[i, f"name {i}"] for i in range(5000)]
+    results = [
+        SQLQueryRunResult(columns=["id", "name"], rows=rows[:5], byte_count=100, linked_id=uuid4()),
+        SQLQueryRunResult(columns=["id", "name"], rows=rows[:2000], byte_count=40_000, linked_id=uuid4()),
+        # Written to a file, with enough columns to be compressed otherwise
+        SQLQueryRunResult(
+            columns=[f"c{i}" for i in range(200)],
+            rows=[[i] * 200 for i in range(10)],
+            byte_count=200_000,
+            linked_id=uuid4(),
+        ),
+    ]
+    repo = ResultRepository()
+    # Stored before contents were compressed
+    monkeypatch.setattr(config, "result_compression_min_bytes", 0)
+    old = await results[1].model_copy().store_result(session, repo, message.id, results[1].linked_id)
+    monkeypatch.setattr(config, "result_compression_min_bytes", 1024)
+    ids = [(await result.store_result(session, repo, message.id, result.linked_id)).id for result in results]
+    ids.append(old.id)
+
+    async def storage_classes() -> list[str]:
+        query = text("SELECT typeof(content) FROM results WHERE id = :id")
+        return [(await session.execute(query, {"id": str(result_id)})).scalar_one() for result_id in ids]
+
+    # Small contents and contents of results written to files stay text
+    assert await storage_classes() == ["text", "blob", "text", "text"]
+    session.expunge_all()
+    for result_id, result in zip(ids, results + [results[1]]):
+        stored = SQLQueryRunResult.deserialize(await repo.get_by_uuid(session, result_id))
+        assert stored.read_rows().rows() == [tuple(row) for row in result.rows]
+    # Read from the spill_file column
+    assert await repo.list_result_files(session) == {path.name for path in (tmp_path / "results").iterdir()}
+
+    # Text contents of large results are compressed by the background migration
+    assert await repo.compress_contents(session, limit=10) == 1
+    assert await repo.compress_contents(session, limit=10) == 0
+    assert await storage_classes() == ["text", "blob", "text", "blob"]
+    session.expunge_all()
+    assert SQLQueryRunResult.deserialize(await repo.get_by_uuid(session, old.id)).rows == results[1].rows
+
+
 # TODO:
 @pytest.mark.skip
 @pytest.mark.asyncio
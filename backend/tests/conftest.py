@@ -12,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from alembic.command import upgrade
 from alembic.config import Config
 from dataline.app import App
+from dataline.config import config as dataline_config
 from dataline.models.base import DBModel
 from dataline.repositories.base import AsyncSession, get_session
 from dataline.utils.posthog import posthog
@@ -36,6 +37,17 @@ def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item
                 item.add_marker(skip_expensive)
 
 
+@pytest.fixture(autouse=True)
+def data_directory(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+    """Files written by the app (uploads, result files, metadata cache, ...) go to a directory of the test."""
+    data_directory = tmp_path / "data"
+    monkeypatch.setattr(dataline_config, "data_directory", str(data_directory))
+    if not pathlib.Path(dataline_config.sample_dvdrental_path).is_file():
+        # SQLite would create an empty database in place of the missing sample when connecting to it
+        monkeypatch.setattr(dataline_config, "sample_dvdrental_path", str(tmp_path / "dvd_rental.sqlite3"))
+    return data_directory
+
+
 @pytest_asyncio.fixture(scope="session")
 async def engine() -> AsyncGenerator[AsyncEngine, None]:
     engine = create_async_engine("sqlite+aiosqlite:///test.sqlite3")
@@ -55,6 +67,8 @@ async def engine() -> AsyncGenerator[AsyncEngine, None]:
 @pytest_asyncio.fixture(scope="function")
 async def session(engine: AsyncEngine, monkeypatch: pytest.MonkeyPatch) -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSession(engine) as session, session.begin():
+        # Like get_session, for deletes to cascade
+        await session.execute(text("PRAGMA foreign_keys=ON"))
         # prevent test from committing anything, only flush
         # only useful in case we move to real DBs not in-mem
         monkeypatch.setattr(session, "commit", mock.AsyncMock(wraps=session.flush))
@@ -0,0 +1,41 @@
+from sqlalchemy import text
+
+from dataline.config import config
+from dataline.services.llm_flow.engine_registry import EngineRegistry
+from dataline.utils.utils import get_sqlite_dsn
+
+
+def test_engine_is_reused_per_dsn() -> None:
+    registry = EngineRegistry()
+    dsn = get_sqlite_dsn(config.sample_titanic_path)
+
+    engine = registry.get_engine(dsn)
+    assert registry.get_engine(dsn) is engine
+
+    registry.dispose(dsn)
+    assert registry.get_engine(dsn) is not engine
+    registry.dispose_all()
+
+
+def test_idle_engines_are_evicted() -> None:
+    registry = EngineRegistry(idle_timeout=-1)
+    dsn = get_sqlite_dsn(config.sample_titanic_path)
+
+    registry.get_engine(dsn)
+    registry.evict_idle()
+    assert registry.stats() == []
+
+
+def test_pool_stats() -> None:
+    registry = EngineRegistry()
+    dsn = get_sqlite_dsn(config.sample_titanic_path)
+
+    engine = registry.get_engine(dsn)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        [stats] = registry.stats()
+        assert stats.checked_out == 1
+        assert stats.pool_class == "QueuePool"
+        assert "titanic" in stats.url
+
+    registry.dispose_all()
@@ -0,0 +1,88 @@
+import asyncio
+import csv
+import gzip
+import io
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+from dataline.config import config
+from dataline.services.llm_flow.export_stream import export_metrics, stream_csv_export
+from dataline.services.llm_flow.query_executor import export_executor, query_executor
+from dataline.services.llm_flow.utils import DatalineSQLDatabase
+from dataline.utils.utils import get_sqlite_dsn
+
+NUMBERS_QUERY = (
+    "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < {rows}) "
+    "SELECT x AS id, 'row number ' || x AS label FROM n"
+)
+
+
+@pytest.fixture
+def db(tmp_path: Path) -> DatalineSQLDatabase:
+    return DatalineSQLDatabase(create_engine(get_sqlite_dsn(str(tmp_path / "export.sqlite3"))), lazy_reflection=True)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compress", [False, True])
+async def test_stream_csv_export(db: DatalineSQLDatabase, compress: bool, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "export_chunk_bytes", 4096)
+    before = export_metrics.stats()
+
+    chunks = [chunk async for chunk in stream_csv_export(db, NUMBERS_QUERY.format(rows=5000), gzip=compress)]
+    assert len(chunks) > 1
+    data = b"".join(chunks)
+    rows = list(csv.reader(io.StringIO((gzip.decompress(data) if compress else data).decode())))
+    assert rows[0] == ["id", "label"]
+    assert rows[1:] == [[str(i), f"row number {i}"] for i in range(1, 5001)]
+
+    stats = export_metrics.stats()
+    assert stats.completed == before.completed + 1
+    assert stats.rows == before.rows + 5000
+    assert stats.bytes == before.bytes + len(data)
+    assert stats.active == before.active
+
+
+@pytest.mark.asyncio
+async def test_stream_csv_export_stops_when_client_goes_away(
+    db: DatalineSQLDatabase, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(config, "export_chunk_bytes", 1024)
+    monkeypatch.setattr(config, "export_queue_chunks", 2)
+    before = export_metrics.stats()
+
+    stream = stream_csv_export(db, NUMBERS_QUERY.format(rows=1_000_000))
+    assert (await anext(stream)).startswith(b"id,label")
+    await stream.aclose()
+
+    stats = export_metrics.stats()
+    assert stats.cancelled == before.cancelled + 1
+    # The worker waited for the client, it did not fetch the whole result meanwhile
+    assert stats.rows - before.rows < 100_000
+
+
+@pytest.mark.asyncio
+async def test_stream_csv_export_raises_query_errors(db: DatalineSQLDatabase) -> None:
+    before = export_metrics.stats()
+    with pytest.raises(Exception, match="no such table"):
+        _ = [chunk async for chunk in stream_csv_export(db, "SELECT * FROM missing")]
+    assert export_metrics.stats().failed == before.failed + 1
+
+
+@pytest.mark.asyncio
+async def test_waiting_export_does_not_hold_a_query_slot(
+    db: DatalineSQLDatabase, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(config, "export_chunk_bytes", 1024)
+    monkeypatch.setattr(config, "export_queue_chunks", 1)
+    monkeypatch.setattr(query_executor, "max_concurrency_per_connection", 1)
+    monkeypatch.setattr(export_executor, "max_concurrency_per_connection", 1)
+
+    stream = stream_csv_export(db, NUMBERS_QUERY.format(rows=1_000_000))
+    try:
+        assert (await anext(stream)).startswith(b"id,label")
+        # The export waits for the client to read on, queries of the same connection still run
+        assert await asyncio.wait_for(query_executor.arun(db._engine.url, lambda: "query"), timeout=5) == "query"
+    finally:
+        await stream.aclose()
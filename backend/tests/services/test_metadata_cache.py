@@ -0,0 +1,96 @@
+import threading
+from pathlib import Path
+
+import pytest
+from sqlalchemy import MetaData, create_engine
+
+from dataline.config import config
+from dataline.services.llm_flow import utils
+from dataline.services.llm_flow.metadata_cache import MetadataCache
+from dataline.services.llm_flow.utils import DatalineSQLDatabase
+from dataline.utils.utils import get_sqlite_dsn
+
+
+@pytest.fixture
+def cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> MetadataCache:
+    cache = MetadataCache(directory=tmp_path)
+    monkeypatch.setattr(utils, "metadata_cache", cache)
+    return cache
+
+
+def test_metadata_is_reflected_once(cache: MetadataCache, monkeypatch: pytest.MonkeyPatch) -> None:
+    dsn = get_sqlite_dsn(config.sample_titanic_path)
+    db = DatalineSQLDatabase(create_engine(dsn), metadata_cache_key=dsn)
+    table_info = db.get_table_info()
+
+    def fail_reflect(*args: object, **kwargs: object) -> None:
+        raise AssertionError("Metadata should have been served from cache")
+
+    monkeypatch.setattr(MetaData, "reflect", fail_reflect)
+    cached_db = DatalineSQLDatabase(create_engine(dsn), metadata_cache_key=dsn)
+    assert cached_db._all_tables_per_schema == db._all_tables_per_schema
+    assert cached_db.get_table_info() == table_info
+
+    # Persisted on disk: a fresh cache instance (ex. after restart) still hits
+    cache.flush()
+    assert MetadataCache(directory=cache.directory).get(dsn, cached_db._metadata_fingerprint(None, None, None, True))
+
+
+def test_invalidate_and_fingerprint_mismatch(cache: MetadataCache) -> None:
+    dsn = get_sqlite_dsn(config.sample_titanic_path)
+    db = DatalineSQLDatabase(create_engine(dsn), metadata_cache_key=dsn)
+    fingerprint = db._metadata_fingerprint(None, None, None, True)
+    assert cache.get(dsn, fingerprint) is not None
+
+    # Different reflection arguments are not served from the cache
+    assert cache.get(dsn, db._metadata_fingerprint(["main"], None, None, True)) is None
+
+    cache.invalidate(dsn)
+    assert cache.get(dsn, fingerprint) is None
+    assert not list(cache.directory.iterdir())
+
+
+def test_reflection_lock_per_connection(cache: MetadataCache) -> None:
+    dsn = get_sqlite_dsn(config.sample_titanic_path)
+    db = DatalineSQLDatabase(create_engine(dsn), metadata_cache_key=dsn, lazy_reflection=True)
+    same_connection = DatalineSQLDatabase(create_engine(dsn), metadata_cache_key=dsn, lazy_reflection=True)
+    assert db._reflection_lock is same_connection._reflection_lock
+
+    # Reflecting another connection does not wait on this one
+    other = DatalineSQLDatabase(create_engine(get_sqlite_dsn(config.sample_spotify_path)), lazy_reflection=True)
+    assert other._reflection_lock is not db._reflection_lock
+    with db._reflection_lock:
+        thread = threading.Thread(target=other.get_table_info)
+        thread.start()
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+
+
+def test_writes_are_delayed(cache: MetadataCache) -> None:
+    dsn = get_sqlite_dsn(config.sample_titanic_path)
+    cache.write_delay = 60
+    db = DatalineSQLDatabase(create_engine(dsn), metadata_cache_key=dsn, lazy_reflection=True)
+    db.get_table_info()
+    # Lazily reflected tables are in memory right away, on disk once the pending write runs
+    assert cache.get(dsn, db._metadata_fingerprint_value) is not None
+    assert not list(cache.directory.iterdir())
+
+    cache.flush()
+    assert [path.suffix for path in cache.directory.iterdir()] == [".pickle"]
+    assert MetadataCache(directory=cache.directory).get(dsn, db._metadata_fingerprint_value) is not None
+
+
+def test_table_info_waits_for_reflection(cache: MetadataCache) -> None:
+    dsn = get_sqlite_dsn(config.sample_titanic_path)
+    db = DatalineSQLDatabase(create_engine(dsn), metadata_cache_key=dsn, lazy_reflection=True)
+    db.get_table_info()
+    same_connection = DatalineSQLDatabase(create_engine(dsn), metadata_cache_key=dsn, lazy_reflection=True)
+
+    # The shared metadata is not read while it is reflected into
+    with db._reflection_lock:
+        thread = threading.Thread(target=same_connection.get_table_info)
+        thread.start()
+        thread.join(timeout=0.2)
+        assert thread.is_alive()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects.postgresql import pg8000, psycopg2
+
+from dataline.errors import ValidationError
+from dataline.models.result.schema import PageCursor, RowFilter
+from dataline.services.llm_flow.pagination import next_cursor, page_columnar, paginate_query
+from dataline.utils.columnar import ColumnarResult
+
+
+def test_parse_row_filter() -> None:
+    assert RowFilter.parse("amount:gt:10") == RowFilter(column="amount", op="gt", value=10)
+    assert RowFilter.parse('name:eq:"10"') == RowFilter(column="name", op="eq", value="10")
+    assert RowFilter.parse("paid_at:ge:2024-01-01T10:00").value == "2024-01-01T10:00"
+    assert RowFilter.parse("name:ne:null") == RowFilter(column="name", op="ne", value=None)
+    with pytest.raises(ValidationError):
+        RowFilter.parse("amount:between:10")
+    with pytest.raises(ValidationError):
+        RowFilter.parse("amount")
+
+
+def test_page_cursor_roundtrip() -> None:
+    cursor = PageCursor(sort_by="paid_at", key="id", keyset=True, last="2024-01-01T10:00:00", last_type="datetime")
+    cursor.last_key = 3
+    decoded = PageCursor.decode(cursor.encode())
+    assert decoded == cursor
+    assert decoded.last_values() == (datetime(2024, 1, 1, 10), 3)
+    with pytest.raises(ValidationError):
+        PageCursor.decode("not a cursor")
+
+
+def test_page_columnar() -> None:
+    data = ColumnarResult.from_rows(
+        ["id", "amount", "name"],
+        [(1, "4.50", "Anna"), (2, None, "bob"), (3, "12.00", None), (4, "7.25", "Bobby"), (5, "1.00", "carl")],
+    )
+
+    page, total = page_columnar(data, PageCursor(sort_by="amount", descending=True), limit=3)
+    assert total == 5
+    assert [row[0] for row in page.rows()] == [3, 4, 1]
+    page, _ = page_columnar(data, PageCursor(offset=3, sort_by="amount", descending=True), limit=3)
+    # NULLs last in both directions
+    assert [row[0] for row in page.rows()] == [5, 2]
+
+    filters = [RowFilter.parse("amount:gt:2"), RowFilter.parse("name:contains:B")]
+    page, total = page_columnar(data, PageCursor(), limit=10, filters=filters)
+    assert (total, page.rows()) == (1, [(4, "7.25", "Bobby")])
+    page, total = page_columnar(data, PageCursor(), limit=10, filters=[RowFilter.parse("name:ne:null")])
+    assert total == 4
+
+    with pytest.raises(ValidationError):
+        page_columnar(data, PageCursor(sort_by="missing"), limit=10)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("sort_by", ["paid_at", "id", None])
+def test_paginate_query_keyset(descending: bool, sort_by: str | None) -> None:
+    engine = create_engine("sqlite://")
+    start = datetime(2024, 1, 1)
+    rows = [
+        # Runs of ties longer than a page, and NULLs
+        (i, None if i % 7 == 0 else start + timedelta(days=i // 12), i % 3)
+        for i in range(40)
+    ]
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE payment (id INTEGER, paid_at DATETIME, amount NUMERIC)"))
+        connection.execute(
+            text("INSERT INTO payment VALUES (:id, :paid_at, :amount)"),
+            [{"id": i, "paid_at": paid_at and paid_at.isoformat(" "), "amount": amount} for i, paid_at, amount in rows],
+        )
+
+    query = "SELECT id, paid_at, amount FROM payment WHERE amount > 0 -- trailing comment"
+    filters = [RowFilter.parse("amount:ge:1")]
+    cursor = PageCursor(sort_by=sort_by, descending=descending, key="id")
+    seen: list[int] = []
+    paid_at_values = []
+    with engine.connect() as connection:
+        while True:
+            page_rows = connection.execute(text(paginate_query(query, engine.dialect, cursor, 4, filters))).all()
+            page = ColumnarResult.from_rows(["id", "paid_at", "amount"], [tuple(row) for row in page_rows])
+            seen.extend(page.arrays[0])
+            paid_at_values.extend(page.arrays[1])
+            if len(page_rows) < 4:
+                break
+            cursor = next_cursor(cursor, page)
+            assert cursor.keyset
+
+    expected = [i for i, _, amount in rows if amount >= 1]
+    assert sorted(seen) == expected
+    if sort_by != "paid_at":
+        assert seen == sorted(seen, reverse=descending)
+        return
+    not_null = [value for value in paid_at_values if value is not None]
+    assert not_null == sorted(not_null, reverse=descending)
+    assert paid_at_values[len(not_null) :] == [None] * (len(paid_at_values) - len(not_null))
+
+
+def test_paginate_query_offset() -> None:
+    engine = create_engine("sqlite://")
+    query = "SELECT value FROM (SELECT 1 AS value UNION ALL SELECT 2 UNION ALL SELECT 3) ORDER BY value;"
+    with engine.connect() as connection:
+        page = connection.execute(text(paginate_query(query, engine.dialect, PageCursor(offset=1), 1))).all()
+    assert [tuple(row) for row in page] == [(2,)]
+
+    with pytest.raises(ValidationError):
+        paginate_query("DELETE FROM payment", engine.dialect, PageCursor(), 1)
+
+
+def test_paginate_query_percent_signs() -> None:
+    # Percent signs are escaped once, when the page is executed with text() by a "format" paramstyle driver
+    query = "SELECT name FROM t WHERE name LIKE '100%%' OR name LIKE '5%' -- 1%"
+    cursor = PageCursor(sort_by="name")
+    filters = [RowFilter.parse("name:contains:5%")]
+    page_sql = paginate_query(query, psycopg2.dialect(), cursor, 10, filters)
+    assert query in page_sql
+    assert page_sql == paginate_query(query, pg8000.dialect(), cursor, 10, filters)
@@ -0,0 +1,128 @@
+import asyncio
+import sqlite3
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+from sqlalchemy import DateTime, Dialect, Numeric, create_engine, text
+from sqlalchemy.dialects.mssql import pyodbc
+from sqlalchemy.dialects.mysql import pymysql
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy.dialects.sqlite import pysqlite
+
+from dataline.services.llm_flow.export_stream import stream_csv_export
+from dataline.services.llm_flow.result_streaming import (
+    PostgresStreamer,
+    ResultStreamer,
+    ServerSideCursorStreamer,
+    SnowflakeStreamer,
+    get_result_streamer,
+)
+from dataline.services.llm_flow.utils import DatalineSQLDatabase
+from dataline.utils.utils import get_sqlite_dsn
+
+
+@pytest.mark.parametrize(
+    "dialect_class,streamer_class",
+    [
+        (psycopg2.dialect, PostgresStreamer),
+        (pymysql.dialect, ServerSideCursorStreamer),
+        (pyodbc.dialect, ResultStreamer),
+        (pysqlite.dialect, ResultStreamer),
+    ],
+)
+def test_result_streamer_per_dialect(dialect_class: type[Dialect], streamer_class: type[ResultStreamer]) -> None:
+    assert type(get_result_streamer(dialect_class())) is streamer_class
+
+
+def test_postgres_cursors_are_only_declared_for_queries() -> None:
+    streamer = PostgresStreamer()
+    assert streamer.execution_options("select * from film") == {"yield_per": 1000}
+    assert streamer.execution_options("\n WITH t AS (SELECT 1) SELECT * FROM t") == {"yield_per": 1000}
+    # DECLARE ... CURSOR FOR SHOW is a syntax error
+    assert streamer.execution_options("SHOW search_path") == {}
+    assert streamer.execution_options("EXPLAIN SELECT 1") == {}
+
+
+def test_batches_are_streamed_from_the_cursor(tmp_path: Path) -> None:
+    db = DatalineSQLDatabase(create_engine(get_sqlite_dsn(str(tmp_path / "db.sqlite3"))), lazy_reflection=True)
+    batches = db.custom_run_sql_batches(
+        "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 2500) SELECT x FROM n"
+    )
+    assert next(batches) == ["x"]
+    assert [len(batch) for batch in batches] == [1000, 1000, 500]
+
+
+class _ResultBatch:
+    """Stands in for a result batch of the Snowflake connector, its rows are not processed by SQLAlchemy."""
+
+    def __init__(self, rows: list[tuple[Any, ...]]) -> None:  # type: ignore[misc]
+        self.rows = rows
+
+    def create_iter(self, connection: object) -> Iterator[tuple[Any, ...]]:  # type: ignore[misc]
+        return iter(self.rows)
+
+
+class _SnowflakeCursor:
+    connection = None
+
+    def __init__(self, result_batches: list[_ResultBatch]) -> None:
+        self.result_batches = result_batches
+
+    def get_result_batches(self) -> list[_ResultBatch]:
+        return self.result_batches
+
+
+def test_snowflake_batches_are_processed_like_the_result() -> None:
+    engine = create_engine("sqlite://")
+    query = text("SELECT '2024-01-01 10:00:00.000000' AS paid_at, 1.5 AS amount").columns(
+        paid_at=DateTime, amount=Numeric(10, 2)
+    )
+    raw_rows = [("2024-01-01 10:00:00.000000", 1.5), ("2024-01-02 12:30:00.000000", 2.25)]
+    with engine.connect() as connection:
+        result = connection.execute(query)
+        expected = result.fetchall()[0]
+        result.cursor = _SnowflakeCursor([_ResultBatch(raw_rows[:1]), _ResultBatch(raw_rows[1:])])
+        batches = list(SnowflakeStreamer().batches(result, batch_size=1))
+
+    # Converted like the rows fetched from the result
+    assert batches[0] == [expected]
+    assert batches[0][0] == (datetime(2024, 1, 1, 10), Decimal("1.50"))
+    assert batches[1] == [(datetime(2024, 1, 2, 12, 30), Decimal("2.25"))]
+
+
+@pytest.mark.expensive
+def test_export_memory_is_bounded(tmp_path: Path) -> None:
+    rows = 5_000_000
+    path = tmp_path / "large.sqlite3"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE payments (id INTEGER PRIMARY KEY, customer TEXT, amount REAL)")
+    connection.execute(
+        f"WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < {rows}) "
+        "INSERT INTO payments SELECT x, 'customer ' || (x % 1000), x * 0.25 FROM n"
+    )
+    connection.commit()
+    connection.close()
+    db = DatalineSQLDatabase(create_engine(get_sqlite_dsn(str(path))), lazy_reflection=True)
+
+    async def export() -> tuple[int, int]:
+        lines = size = 0
+        async for chunk in stream_csv_export(db, "SELECT * FROM payments"):
+            lines += chunk.count(b"\n")
+            size += len(chunk)
+        return lines, size
+
+    tracemalloc.start()
+    try:
+        lines, size = asyncio.run(export())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert lines == rows + 1
+    # The CSV is well over 100MB, the export holds a few chunks of it at a time
+    assert size > 100 * 1024 * 1024
+    assert peak < 32 * 1024 * 1024
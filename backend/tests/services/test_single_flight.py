@@ -0,0 +1,130 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+from dataline.services.llm_flow.single_flight import SingleFlight
+from dataline.services.llm_flow.toolkit import aexecute_sql_query
+from dataline.services.llm_flow.utils import DatalineSQLDatabase
+from dataline.utils.utils import get_sqlite_dsn
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution() -> None:
+    flight: SingleFlight[str, list[int]] = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def run() -> list[int]:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return [calls]
+
+    tasks = [asyncio.create_task(flight.ado("SELECT 1", run)) for _ in range(3)]
+    other = asyncio.create_task(flight.ado("SELECT 2", run))
+    await asyncio.sleep(0.01)
+    assert flight.stats().in_flight == 2
+
+    release.set()
+    results = await asyncio.gather(*tasks)
+    await other
+    assert calls == 2
+    assert results[0] is results[1] is results[2]
+    stats = flight.stats()
+    assert (stats.in_flight, stats.executions, stats.coalesced) == (0, 2, 2)
+
+    # Finished calls are not reused
+    await flight.ado("SELECT 1", run)
+    assert calls == 3
+
+
+@pytest.mark.asyncio
+async def test_waiters_get_the_exception() -> None:
+    flight: SingleFlight[str, int] = SingleFlight()
+
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*[flight.ado("q", fail) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats().executions == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_takes_over_cancelled_call() -> None:
+    flight: SingleFlight[str, str] = SingleFlight()
+    started = asyncio.Event()
+
+    async def run() -> str:
+        started.set()
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.create_task(flight.ado("q", run))
+    await started.wait()
+    waiter = asyncio.create_task(flight.ado("q", run))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == "done"
+    assert leader.cancelled()
+    assert flight.stats().executions == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_call() -> None:
+    flight: SingleFlight[str, str] = SingleFlight()
+
+    async def run() -> str:
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.create_task(flight.ado("q", run))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.ado("q", run))
+    await asyncio.sleep(0)
+    waiter.cancel()
+
+    assert await leader == "done"
+    assert waiter.cancelled()
+
+
+def test_threads_share_one_execution() -> None:
+    flight: SingleFlight[str, int] = SingleFlight()
+    release = threading.Event()
+    calls = 0
+
+    def run() -> int:
+        nonlocal calls
+        calls += 1
+        release.wait(5)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(flight.do, "q", run) for _ in range(4)]
+        while flight.stats().coalesced < 3:
+            time.sleep(0.001)
+        release.set()
+        assert [future.result(timeout=5) for future in futures] == [42] * 4
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_are_not_coalesced(tmp_path: Path) -> None:
+    path = tmp_path / "writes.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    db = DatalineSQLDatabase(create_engine(get_sqlite_dsn(str(path))))
+
+    results = await asyncio.gather(*[aexecute_sql_query(db, "INSERT INTO t VALUES (1) RETURNING x") for _ in range(3)])
+    assert all(result.rows == [[1]] for result in results)
+    assert conn.execute("SELECT count(*) FROM t").fetchone() == (3,)
+    conn.close()
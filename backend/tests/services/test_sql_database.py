@@ -0,0 +1,290 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import MetaData, create_engine
+from sqlalchemy.dialects import registry
+from sqlalchemy.exc import OperationalError
+
+from dataline.config import config
+from dataline.services.llm_flow.reflection import bulk_reflect, map_schemas, read_schema_catalog
+from dataline.services.llm_flow.toolkit import (
+    QueryResultCollector,
+    aexecute_sql_query,
+    execute_sql_query,
+    truncate_column,
+)
+from dataline.services.llm_flow.utils import DatalineSQLDatabase, limit_select
+from dataline.utils.utils import get_sqlite_dsn
+
+
+@pytest.fixture
+def sqlite_dsn(tmp_path: Path) -> str:
+    path = tmp_path / "store.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER REFERENCES customers(id), total REAL);
+        CREATE TABLE products (id INTEGER PRIMARY KEY, title TEXT);
+        INSERT INTO customers VALUES (1, 'Alice'), (2, 'Bob');
+        INSERT INTO orders VALUES (1, 1, 10.5), (2, 2, 3.0);
+        """
+    )
+    conn.commit()
+    conn.close()
+    return get_sqlite_dsn(str(path))
+
+
+def test_lazy_reflection_only_reflects_requested_tables(sqlite_dsn: str) -> None:
+    db = DatalineSQLDatabase(create_engine(sqlite_dsn), lazy_reflection=True)
+    assert set(db.get_usable_table_names()) == {"main.customers", "main.orders", "main.products"}
+    assert not db._metadata.tables
+
+    table_info = db.get_table_info(["main.orders"])
+    assert "CREATE TABLE main.orders" in table_info
+    # Referenced tables get pulled in by foreign key resolution, unrelated ones don't
+    assert "main.products" not in db._metadata.tables
+
+    eager_db = DatalineSQLDatabase(create_engine(sqlite_dsn))
+    assert table_info == eager_db.get_table_info(["main.orders"])
+
+
+def test_bulk_reflection_matches_inspector(sqlite_dsn: str) -> None:
+    engine = create_engine(sqlite_dsn)
+    tables = ["customers", "orders", "products"]
+
+    bulk_metadata = MetaData()
+    assert bulk_reflect(engine, bulk_metadata, "main", tables) == set()
+
+    inspector_metadata = MetaData()
+    inspector_metadata.reflect(bind=engine, schema="main", only=tables)
+
+    for name in tables:
+        bulk_table = bulk_metadata.tables[f"main.{name}"]
+        inspector_table = inspector_metadata.tables[f"main.{name}"]
+        assert [(c.name, str(c.type), c.nullable) for c in bulk_table.columns] == [
+            (c.name, str(c.type), c.nullable) for c in inspector_table.columns
+        ]
+        assert [c.name for c in bulk_table.primary_key] == [c.name for c in inspector_table.primary_key]
+        assert {fk.target_fullname.split(".", 1)[-1] for fk in bulk_table.foreign_keys} == {
+            fk.target_fullname.split(".", 1)[-1] for fk in inspector_table.foreign_keys
+        }
+
+
+def test_catalog_reads_only_requested_and_referred_tables(sqlite_dsn: str) -> None:
+    engine = create_engine(sqlite_dsn)
+    catalog = read_schema_catalog(engine, "main", ["orders"])
+    assert catalog is not None
+    assert {column.table for column in catalog.columns} == {"orders", "customers"}
+    assert [(fk.table, fk.referred_table, fk.referred_columns) for fk in catalog.foreign_keys] == [
+        ("orders", "customers", ["id"])
+    ]
+
+    whole_schema = read_schema_catalog(engine, "main")
+    assert whole_schema is not None
+    assert {column.table for column in whole_schema.columns} == {"orders", "customers", "products"}
+
+
+def test_map_schemas_is_bounded_and_keeps_schema_order() -> None:
+    schemas = [f"schema_{i}" for i in range(6)]
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def introspect(schema: str) -> str:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        # Later schemas finish first
+        time.sleep(0.01 * (len(schemas) - schemas.index(schema)))
+        with lock:
+            running -= 1
+        return schema.upper()
+
+    result = map_schemas(introspect, schemas, max_workers=3)
+    assert list(result.items()) == [(schema, schema.upper()) for schema in schemas]
+    assert 1 < max_running <= 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("async_user_queries", [True, False])
+async def test_async_run_sql_matches_sync(
+    sqlite_dsn: str, async_user_queries: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(config, "async_user_queries", async_user_queries)
+    db = DatalineSQLDatabase(create_engine(sqlite_dsn), lazy_reflection=True)
+    query = "SELECT id, name FROM customers ORDER BY id"
+
+    sync_columns, sync_rows = db.custom_run_sql(query)
+    columns, rows = await db.acustom_run_sql(query)
+    assert columns == sync_columns == ["id", "name"]
+    assert [tuple(row) for row in rows] == [tuple(row) for row in sync_rows]
+
+    entries = [entry async for entry in db.acustom_run_sql_stream(query)]
+    assert entries[0] == columns
+    assert [tuple(row) for row in entries[1:]] == [tuple(row) for row in rows]
+
+
+@pytest.mark.parametrize(
+    ("query", "dialect", "expected"),
+    [
+        ("SELECT * FROM orders;", "postgresql", "SELECT * \nFROM (SELECT * FROM orders) AS q \n LIMIT 11"),
+        ("select * from orders", "mssql", "SELECT TOP 11 * \nFROM (select * from orders) AS q"),
+        ("SELECT * FROM orders", "oracle", "SELECT * \nFROM (SELECT * FROM orders) q\n FETCH FIRST 11 ROWS ONLY"),
+        ("WITH o AS (SELECT 1) SELECT * FROM o", "mssql", None),
+        ("SELECT * FROM orders ORDER BY id", "postgresql", None),
+        ("SELECT * INTO copy FROM orders", "postgresql", None),
+        ("DELETE FROM orders", "postgresql", None),
+        ("SELECT 1; SELECT 2", "postgresql", None),
+        ("SELECT * FROM orders", "sqlite", None),
+    ],
+)
+def test_limit_select(query: str, dialect: str, expected: str | None) -> None:
+    limited = limit_select(query, dialect, 11)
+    if expected is None:
+        assert limited is None
+        return
+
+    assert limited is not None
+    compiled = limited.compile(dialect=registry.load(dialect)(), compile_kwargs={"literal_binds": True})
+    assert str(compiled) == expected
+
+
+@pytest.mark.asyncio
+async def test_execute_sql_query_honors_limit(sqlite_dsn: str) -> None:
+    db = DatalineSQLDatabase(create_engine(sqlite_dsn), lazy_reflection=True)
+
+    limited = execute_sql_query(db, "SELECT * FROM customers ORDER BY id", limit=1)
+    assert limited.rows == [[1, "Alice"]]
+    assert limited.has_more
+
+    not_limited = await aexecute_sql_query(db, "SELECT * FROM customers ORDER BY id", limit=2)
+    assert not_limited.rows == [[1, "Alice"], [2, "Bob"]]
+    assert not not_limited.has_more
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("async_user_queries", [True, False])
+async def test_execute_sql_query_stops_at_byte_budget(
+    sqlite_dsn: str, monkeypatch: pytest.MonkeyPatch, async_user_queries: bool
+) -> None:
+    monkeypatch.setattr(config, "async_user_queries", async_user_queries)
+    monkeypatch.setattr(config, "query_result_max_bytes", 1000)
+    db = DatalineSQLDatabase(create_engine(sqlite_dsn), lazy_reflection=True, max_string_length=50)
+    # 20k rows of long strings, truncated as they stream by
+    query = """
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 20000)
+        SELECT i, printf('%.200c', 'x') AS padding FROM n
+    """
+
+    sync_result = execute_sql_query(db, query)
+    async_result = await aexecute_sql_query(db, query)
+    for result in (sync_result, async_result):
+        assert result.has_more
+        assert 0 < len(result.rows) < 20
+        assert all(len(row[1]) <= 50 for row in result.rows)
+        assert result.byte_count <= 1000
+        # Not stored with the result
+        assert "byte_count" not in result.model_dump()
+    assert sync_result.rows == async_result.rows
+
+
+def test_execute_sql_query_row_budget(sqlite_dsn: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "query_result_max_rows", 1)
+    db = DatalineSQLDatabase(create_engine(sqlite_dsn), lazy_reflection=True)
+
+    result = execute_sql_query(db, "SELECT * FROM customers ORDER BY id", limit=5)
+    assert result.rows == [[1, "Alice"]]
+    assert result.has_more
+
+
+def test_truncate_column() -> None:
+    numbers = (1, 2.5, None)
+    assert truncate_column(numbers, length=3) is numbers
+    short = ("ab", None, "abc")
+    assert truncate_column(short, length=3) is short
+
+    assert truncate_column(("hello world", None, "hi"), length=8) == ["hello...", None, "hi"]
+    # SQLite columns can mix types
+    assert truncate_column((1, "hello world", b"bytes bytes"), length=8) == [1, "hello...", b"bytes bytes"]
+
+
+def test_collector_cuts_batch_at_byte_budget() -> None:
+    collector = QueryResultCollector(max_string_length=10, max_rows=100, max_bytes=50)
+    collector.start(["id", "name"])
+    # Each row is about 2 + 10 + 6 bytes once truncated
+    assert collector.add_batch([(10, "x" * 20), (11, "y" * 20)])
+    assert not collector.add_batch([(12, "z" * 20), (13, "w")])
+
+    assert collector.data.rows() == [(10, "xxxxxxx..."), (11, "yyyyyyy...")]
+    assert collector.byte_count == 36
+    assert collector.has_more
+
+
+SLOW_QUERY = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000000000) SELECT count(*) FROM n"
+)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("async_user_queries", [True, False])
+async def test_statement_timeout(sqlite_dsn: str, monkeypatch: pytest.MonkeyPatch, async_user_queries: bool) -> None:
+    monkeypatch.setattr(config, "async_user_queries", async_user_queries)
+    monkeypatch.setattr(config, "query_statement_timeout", 1)
+    db = DatalineSQLDatabase.from_uri(sqlite_dsn, lazy_reflection=True)
+
+    started_at = time.monotonic()
+    with pytest.raises(OperationalError, match="interrupted"):
+        await aexecute_sql_query(db, SLOW_QUERY)
+    assert time.monotonic() - started_at < 5
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("async_user_queries", [True, False])
+async def test_slow_reader_is_not_timed_out(
+    sqlite_dsn: str, monkeypatch: pytest.MonkeyPatch, async_user_queries: bool
+) -> None:
+    monkeypatch.setattr(config, "async_user_queries", async_user_queries)
+    monkeypatch.setattr(config, "query_statement_timeout", 1)
+    db = DatalineSQLDatabase.from_uri(sqlite_dsn, lazy_reflection=True)
+    query = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 20000) SELECT i FROM n"
+
+    # The rows are read for longer than the timeout, each fetch is quick
+    started_at = time.monotonic()
+    batches = db.acustom_run_sql_batches(query)
+    assert await anext(batches) == ["i"]
+    rows = 0
+    async for batch in batches:
+        rows += len(batch)
+        await asyncio.sleep(0.1)
+    assert rows == 20000
+    assert time.monotonic() - started_at > 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("async_user_queries", [True, False])
+@pytest.mark.parametrize("max_rows", [None, 10])
+@pytest.mark.parametrize("streamed", [True, False])
+async def test_cancelled_query_stops_on_database(
+    sqlite_dsn: str, monkeypatch: pytest.MonkeyPatch, async_user_queries: bool, max_rows: int | None, streamed: bool
+) -> None:
+    monkeypatch.setattr(config, "async_user_queries", async_user_queries)
+    db = DatalineSQLDatabase.from_uri(sqlite_dsn, lazy_reflection=True)
+
+    if streamed:
+        task = asyncio.create_task(aexecute_sql_query(db, SLOW_QUERY, limit=max_rows))
+    else:
+        task = asyncio.create_task(db.acustom_run_sql(SLOW_QUERY, max_rows))
+    await asyncio.sleep(0.3)
+    started_at = time.monotonic()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert time.monotonic() - started_at < 1
+    # The connection can be used again
+    assert (await aexecute_sql_query(db, "SELECT name FROM customers WHERE id = 1")).rows == [["Alice"]]
@@ -0,0 +1,67 @@
+import io
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from dataline.utils import arrow_export
+from dataline.utils.arrow_export import ArrowExportWriter
+from dataline.utils.columnar import ColumnarResult
+
+COLUMNS = ["id", "note", "amount", "created_at"]
+BATCHES = [
+    # Only NULL notes in the first batch
+    [(1, None, Decimal("10.5"), datetime(2024, 1, 1)), (2, None, Decimal("3"), None)],
+    [(3, "late note", Decimal("1234.125"), datetime(2024, 2, 1))],
+    [(i, f"note {i}", None, None) for i in range(4, 10)],
+]
+ROWS = [row for batch in BATCHES for row in batch]
+
+
+def export(file_format: arrow_export.ArrowFormat) -> bytes:
+    writer = ArrowExportWriter(file_format)
+    chunks = [writer.write(ColumnarResult.from_rows(COLUMNS, batch)) for batch in BATCHES]
+    chunks.append(writer.close(COLUMNS))
+    return b"".join(chunks)
+
+
+def test_parquet_export(monkeypatch: pytest.MonkeyPatch) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(arrow_export, "PARQUET_ROW_GROUP_SIZE", 3)
+
+    parquet_file = pq.ParquetFile(io.BytesIO(export("parquet")))
+    # Batches are buffered into row groups
+    assert [parquet_file.metadata.row_group(i).num_rows for i in range(parquet_file.num_row_groups)] == [3, 6]
+    table = parquet_file.read()
+    assert table.column_names == COLUMNS
+    assert [tuple(row.values()) for row in table.to_pylist()] == ROWS
+
+
+def test_arrow_ipc_export() -> None:
+    pa = pytest.importorskip("pyarrow")
+    table = pa.ipc.open_stream(export("arrow")).read_all()
+    assert table.schema.field("note").type == pa.string()
+    assert [tuple(row.values()) for row in table.to_pylist()] == ROWS
+
+
+def test_export_without_rows() -> None:
+    pa = pytest.importorskip("pyarrow")
+    writer = ArrowExportWriter("arrow")
+    table = pa.ipc.open_stream(writer.close(COLUMNS)).read_all()
+    assert table.column_names == COLUMNS
+    assert table.num_rows == 0
+
+
+def test_later_batches_that_do_not_match_the_schema() -> None:
+    pa = pytest.importorskip("pyarrow")
+    writer = ArrowExportWriter("arrow")
+    columns = ["count", "ratio"]
+    chunks = [
+        writer.write(ColumnarResult.from_rows(columns, [(1, Decimal("0.5"))])),
+        # Lossless floats are kept, decimals are rounded to the scale of the column, the rest is left out
+        writer.write(ColumnarResult.from_rows(columns, [(2.0, Decimal("0.123456789012")), (2.5, None), ("x", None)])),
+        writer.close(columns),
+    ]
+    table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+    assert table.column("count").to_pylist() == [1, 2, None, None]
+    assert table.column("ratio").to_pylist() == [Decimal("0.5"), Decimal("0.123456789"), None, None]
@@ -0,0 +1,73 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+
+from dataline.models.llm_flow.schema import QueryRunData, SQLQueryRunResultContent
+from dataline.utils import columnar
+from dataline.utils.columnar import ColumnarResult
+
+COLUMNS = ["id", "name", "amount", "created_at"]
+ROWS = [
+    (1, "Alice", Decimal("10.50"), datetime(2024, 1, 1, 12, 30)),
+    (2, None, Decimal("3"), None),
+    (3, "Carol, Jr.", None, datetime(2024, 2, 1)),
+]
+
+
+def test_built_from_batches() -> None:
+    result = ColumnarResult(COLUMNS)
+    result.extend(ROWS[:2])
+    result.extend([])
+    result.extend(ROWS[2:])
+
+    assert result.num_rows == 3
+    assert result.arrays[1] == ["Alice", None, "Carol, Jr."]
+    assert result.rows() == ROWS
+    assert result.slice(1, 2).rows() == ROWS[1:2]
+    assert ColumnarResult(COLUMNS).rows() == []
+
+
+@pytest.mark.parametrize("chunk_rows", [10_000, 2, 1])
+def test_json_matches_pydantic_serialization(chunk_rows: int, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(columnar, "JSON_CHUNK_ROWS", chunk_rows)
+    result = ColumnarResult.from_rows(COLUMNS, ROWS)
+    content = SQLQueryRunResultContent(
+        data=QueryRunData(columns=COLUMNS, rows=ROWS), is_secure=False, for_chart=False
+    ).model_dump_json()
+
+    assert json.loads(result.to_json()) == json.loads(content)["data"]["rows"]
+    assert ColumnarResult(COLUMNS).to_json() == b"[]"
+    assert json.loads(result.to_json(orient="columns"))[2] == ["10.50", "3", None]
+
+
+def test_write_csv() -> None:
+    buffer = StringIO()
+    ColumnarResult.from_rows(COLUMNS, ROWS).write_csv(buffer)
+    assert buffer.getvalue().splitlines() == [
+        "id,name,amount,created_at",
+        "1,Alice,10.50,2024-01-01 12:30:00",
+        "2,,3,",
+        '3,"Carol, Jr.",,2024-02-01 00:00:00',
+    ]
+
+
+def test_query_run_data_from_columnar() -> None:
+    result = ColumnarResult.from_rows(COLUMNS, ROWS)
+    data = QueryRunData.from_columnar(result, has_more=True)
+    expected = QueryRunData(columns=COLUMNS, rows=[list(row) for row in ROWS], has_more=True)
+    assert data == expected
+    assert data.model_dump() == expected.model_dump()
+    assert data.model_dump_json() == expected.model_dump_json()
+    assert data.num_rows == 3
+    assert data.columnar().arrays == result.arrays
+
+
+def test_to_arrow() -> None:
+    pytest.importorskip("pyarrow")
+    mixed = ColumnarResult.from_rows(["id", "value"], [(1, "a"), (2, 3)])
+    table = mixed.to_arrow()
+    assert table.column_names == ["id", "value"]
+    assert table.column("value").to_pylist() == ["a", "3"]
@@ -0,0 +1,23 @@
+import pytest
+
+from dataline.utils.result_codec import MAGIC, decode_result_content, encode_result_content
+
+
+def test_encoded_content_is_decoded() -> None:
+    content = '{"data":{"columns":["id","name"],"rows":[' + ",".join(f'[{i},"name {i}"]' for i in range(1000)) + "]}}"
+    encoded = encode_result_content(content)
+    assert encoded.startswith(MAGIC)
+    assert len(encoded) < len(content) / 3
+    assert decode_result_content(encoded) == content
+
+
+def test_text_content_is_returned_as_is() -> None:
+    # Stored before contents were encoded
+    assert decode_result_content('{"sql":"SELECT 1"}') == '{"sql":"SELECT 1"}'
+
+
+def test_unknown_encodings_are_rejected() -> None:
+    with pytest.raises(ValueError, match="unknown version 9"):
+        decode_result_content(MAGIC + bytes([9]) + b"payload")
+    with pytest.raises(ValueError, match="not in a known encoding"):
+        decode_result_content(b"\x89PNG")
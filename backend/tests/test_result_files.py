@@ -0,0 +1,53 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from dataline.config import config
+from dataline.utils.columnar import ColumnarResult
+from dataline.utils.result_files import (
+    ResultFile,
+    remove_unreferenced_result_files,
+    result_files_directory,
+    write_result_file,
+)
+
+
+def test_result_file_reads_row_ranges(tmp_path: Path) -> None:
+    rows = [(i, f"name {i}", None if i % 2 else 1.5) for i in range(25)]
+    path = tmp_path / "result.dlres"
+    write_result_file(ColumnarResult.from_rows(["id", "name", "value"], rows), path, row_group_size=10)
+
+    with ResultFile(path) as file:
+        assert file.columns == ["id", "name", "value"]
+        assert file.num_rows == 25
+        assert file.read().rows() == rows
+        # Across row groups
+        assert file.read(8, 12).rows() == rows[8:12]
+        assert file.read(20, 100).rows() == rows[20:]
+        assert file.read(30).rows() == []
+
+    empty_path = tmp_path / "empty.dlres"
+    write_result_file(ColumnarResult(["id"]), empty_path)
+    with ResultFile(empty_path) as file:
+        assert file.num_rows == 0
+        assert file.read().rows() == []
+
+
+def test_invalid_result_file(tmp_path: Path) -> None:
+    path = tmp_path / "invalid.dlres"
+    path.write_bytes(b"not a result file")
+    with pytest.raises(ValueError):
+        ResultFile(path)
+
+
+def test_remove_unreferenced_result_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "data_directory", str(tmp_path))
+    directory = result_files_directory()
+    for name in ["kept.dlres", "deleted.dlres", "recent.dlres", "other.txt"]:
+        write_result_file(ColumnarResult(["id"]), directory / name)
+        if name != "recent.dlres":
+            os.utime(directory / name, (0, 0))
+
+    assert remove_unreferenced_result_files({"kept.dlres"}) == 1
+    assert sorted(path.name for path in directory.iterdir()) == ["kept.dlres", "other.txt", "recent.dlres"]
@@ -1,9 +1,13 @@
+import asyncio
 import os
+from typing import AsyncGenerator
 
+import pytest
 from fastapi import UploadFile
+from fastapi.responses import StreamingResponse
 
 from dataline.config import config
-from dataline.utils.utils import generate_short_uuid, is_valid_sqlite_file
+from dataline.utils.utils import generate_short_uuid, generate_with_errors, is_valid_sqlite_file
 
 
 def test_valid_sqlite_file_validation() -> None:
@@ -39,3 +43,32 @@ def test_generate_short_uuid_uniqueness() -> None:
     short_uuid = generate_short_uuid()
     short_uuid2 = generate_short_uuid()
     assert short_uuid != short_uuid2
+
+
+@pytest.mark.asyncio
+async def test_generate_with_errors_stops_on_client_disconnect() -> None:
+    cancelled = asyncio.Event()
+
+    async def generator() -> AsyncGenerator[str, None]:
+        yield "first"
+        try:
+            # ex. waiting for the LLM or a query
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        yield "second"
+
+    async def receive() -> dict:
+        await asyncio.sleep(0.1)
+        return {"type": "http.disconnect"}
+
+    sent: list[dict] = []
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    response = StreamingResponse(generate_with_errors(generator()), media_type="text/event-stream")
+    await asyncio.wait_for(response({"type": "http"}, receive, send), timeout=2)
+    assert cancelled.is_set()
+    assert [message.get("body") for message in sent if message["type"] == "http.response.body"] == [b"first"]
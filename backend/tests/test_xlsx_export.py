@@ -0,0 +1,50 @@
+import io
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
+
+from openpyxl import load_workbook  # type: ignore[import-untyped]
+
+from dataline.utils.xlsx_export import write_xlsx
+
+
+def test_sheets_roll_over_at_the_row_limit() -> None:
+    batches = [[(i, f"row {i}") for i in range(start, start + 4)] for start in range(0, 12, 4)]
+    file = io.BytesIO()
+    write_xlsx(["id", "name"], iter(batches), file, sheet_rows=5)
+
+    workbook = load_workbook(file, read_only=True)
+    assert workbook.sheetnames == ["Results", "Results 2", "Results 3"]
+    sheets = [list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets]
+    # Header and 4 rows per sheet
+    assert all(sheet[0] == ("id", "name") for sheet in sheets)
+    assert [row for sheet in sheets for row in sheet[1:]] == [(i, f"row {i}") for i in range(12)]
+
+
+def test_values_excel_can_not_store_are_converted() -> None:
+    row = (
+        '=HYPERLINK("http://example.com")',
+        "bell\x07",
+        float("nan"),
+        Decimal("1.50"),
+        datetime(2024, 5, 1, 12, 30, tzinfo=timezone(timedelta(hours=2))),
+        UUID(int=1),
+        None,
+    )
+    file = io.BytesIO()
+    write_xlsx([f"c{i}" for i in range(len(row))], [[row]], file)
+
+    sheet = load_workbook(file).active
+    values = [cell.value for cell in sheet[2]]
+    assert values[0] == '=HYPERLINK("http://example.com")'
+    assert sheet["A2"].data_type == "s"
+    assert values[1:4] == ["bell", "nan", 1.5]
+    assert values[4] == datetime(2024, 5, 1, 10, 30)
+    assert values[5:] == [str(UUID(int=1)), None]
+
+
+def test_empty_result_has_the_header() -> None:
+    file = io.BytesIO()
+    write_xlsx(["id"], [], file)
+    workbook = load_workbook(file, read_only=True)
+    assert list(workbook.active.iter_rows(values_only=True)) == [("id",)]
@@ -2,6 +2,7 @@ import { isAxiosError } from "axios";
 import {
   IConnection,
   DatabaseFileType,
+  IConversationSummary,
   IConversationWithMessagesWithResultsOut,
   IMessageOptions,
   IMessageOut,
@@ -221,6 +222,22 @@ const deleteConversation = async (conversationId: string) => {
   return response.data;
 };
 
+export type GetConversationResult = ApiResponse<{
+  id: string;
+  connection_id: string;
+  name: string;
+  created_at: string;
+}>;
+const getConversation = async (
+  conversationId: string
+): Promise<GetConversationResult> => {
+  return (
+    await backendApi<GetConversationResult>({
+      url: `/conversation/${conversationId}`,
+    })
+  ).data;
+};
+
 export type ListConversations = ApiResponse<
   IConversationWithMessagesWithResultsOut[]
 >;
@@ -228,13 +245,31 @@ const listConversations = async (): Promise<ListConversations> => {
   return (await backendApi<ListConversations>({ url: "/conversations" })).data;
 };
 
+export type ListConversationSummaries = ApiResponse<{
+  conversations: IConversationSummary[];
+  next_cursor: string | null;
+}>;
+const listConversationSummaries = async (
+  cursor?: string
+): Promise<ListConversationSummaries> => {
+  return (
+    await backendApi<ListConversationSummaries>({
+      url: "/conversations/summary",
+      params: { cursor, limit: 50 },
+    })
+  ).data;
+};
+
 export type GetMessagesResponse = ApiResponse<IMessageWithResultsOut[]>;
 const getMessages = async (
-  conversationId: string
+  conversationId: string,
+  limit?: number,
+  before?: string
 ): Promise<GetMessagesResponse> => {
   return (
     await backendApi<GetMessagesResponse>({
       url: `/conversation/${conversationId}/messages`,
+      params: { limit, before },
     })
   ).data;
 };
@@ -306,6 +341,8 @@ const streamingQuery = async ({
 };
 
 export type RunSQLResult = ApiResponse<IResult>;
+// Rows fetched when re-running a query, the backend reports has_more if there are more
+const RUN_SQL_ROW_LIMIT = 1000;
 const runSQL = async (
   conversationId: string,
   code: string,
@@ -314,7 +351,7 @@ const runSQL = async (
   return (
     await backendApi<RunSQLResult>({
       url: `/conversation/${conversationId}/run-sql`,
-      params: { sql: code, linked_id: linkedId },
+      params: { sql: code, linked_id: linkedId, limit: RUN_SQL_ROW_LIMIT },
     })
   ).data;
 };
@@ -446,10 +483,29 @@ const logout = async () => {
   return response;
 };
 
+export type ResultPage = {
+  columns: string[];
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  rows: any[][];
+  total_rows: number | null;
+  next_cursor: string | null;
+};
+export type GetResultRowsResult = ApiResponse<ResultPage>;
+// Stored rows of a query run result, a page at a time
+const getResultRows = async (resultId: string, cursor?: string) => {
+  return (
+    await backendApi<GetResultRowsResult>({
+      url: `/result/${resultId}/rows`,
+      params: { cursor },
+    })
+  ).data;
+};
+
 export type GetExportDataUrlResult = ApiResponse<string>;
-const getExportDataUrl = (resultId: string) => {
+export type ExportFormat = "csv" | "xlsx";
+const getExportDataUrl = (resultId: string, format: ExportFormat = "csv") => {
   const baseURL = apiURL.endsWith("/") ? apiURL : apiURL + "/";
-  return `${baseURL}result/${resultId}/export-csv`;
+  return `${baseURL}result/${resultId}/export-${format}`;
 };
 
 export const api = {
@@ -464,7 +520,9 @@ export const api = {
   deleteConnection,
   refreshConnectionSchema,
   listConnections,
+  getConversation,
   listConversations,
+  listConversationSummaries,
   generateConversationTitle,
   login,
   logout,
@@ -481,5 +539,6 @@ export const api = {
   updateUserInfo,
   getUserInfo,
   refreshChart,
+  getResultRows,
   getExportDataUrl,
 };
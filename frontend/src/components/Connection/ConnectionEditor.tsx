@@ -43,6 +43,7 @@ const SchemaEditor = ({
                 onChange={(checked) =>
                   // Check/Uncheck schema and its tables
                   setOptions({
+                    ...options,
                     schemas: options.schemas.map((prev_schema, prev_idx) =>
                       prev_idx === schema_index
                         ? {
@@ -99,6 +100,7 @@ const SchemaEditor = ({
                         onChange={(checked) =>
                           // Check/Uncheck table
                           setOptions({
+                            ...options,
                             schemas: options.schemas.map(
                               (prev_schema, prev_idx) =>
                                 prev_idx === schema_index
@@ -151,7 +153,9 @@ export const ConnectionEditor = () => {
   const [showDeleteAlert, setShowDeleteAlert] = useState<boolean>(false);
 
   const { data, isLoading } = useGetConnection(connectionId);
-  const { data: conversationsData } = useGetConversations();
+  const { data: conversationsData, hasNextPage: moreConversations } =
+    useGetConversations();
+  // Among the conversations loaded so far, older ones may be related as well
   const relatedConversations =
     conversationsData?.filter(
       (conversation) => conversation.connection_id === connectionId
@@ -270,7 +274,11 @@ export const ConnectionEditor = () => {
       <AlertModal
         isOpen={showDeleteAlert}
         title="Delete Connection?"
-        message={`This will delete ${relatedConversations.length} related conversation(s)!`}
+        message={
+          moreConversations
+            ? "This will delete all its related conversations!"
+            : `This will delete ${relatedConversations.length} related conversation(s)!`
+        }
         okText="Delete"
         icon={AlertIcon.Warning}
         onSuccess={() => {
@@ -320,6 +328,46 @@ export const ConnectionEditor = () => {
             </div>
           </div>
 
+          {editFields.options && (
+            <div className="sm:col-span-3">
+              <label
+                htmlFor="statement_timeout"
+                className="block text-sm font-medium leading-6 text-white"
+              >
+                Query timeout (seconds)
+              </label>
+              <div className="mt-2">
+                <input
+                  type="number"
+                  min={0}
+                  name="statement_timeout"
+                  id="statement_timeout"
+                  placeholder="Default"
+                  value={editFields.options.statement_timeout ?? ""}
+                  onChange={(e) => {
+                    setEditFields((prev) => ({
+                      ...prev,
+                      options: prev.options && {
+                        ...prev.options,
+                        statement_timeout:
+                          e.target.value === ""
+                            ? null
+                            : Number(e.target.value),
+                      },
+                    }));
+                    setUnsavedChanges(true);
+                  }}
+                  className={classNames(
+                    isLoading
+                      ? "animate-pulse bg-gray-900 text-gray-400"
+                      : "bg-white/5 text-white",
+                    "block w-full rounded-md border-0 py-1.5 shadow-sm ring-1 ring-inset ring-white/10 focus:ring-2 focus:ring-inset focus:ring-indigo-500 sm:text-sm sm:leading-6"
+                  )}
+                />
+              </div>
+            </div>
+          )}
+
           <div className="sm:col-span-6">
             <label
               htmlFor="name"
@@ -388,7 +436,7 @@ export const ConnectionEditor = () => {
               color="dark/zinc/red"
               // className=" hover:bg-red-700 px-3 py-2 text-sm font-medium text-red-400 hover:text-white border border-gray-600 hover:border-red-600 focus-visible:outline focus-visible:outline-2 focus-visible:outline-offset-2 focus-visible:outline-gray-600 transition-colors duration-150"
               onClick={() => {
-                if (relatedConversations.length > 0) {
+                if (relatedConversations.length > 0 || moreConversations) {
                   setShowDeleteAlert(true);
                 } else {
                   handleDelete();
@@ -8,9 +8,11 @@ import { Transition } from "@headlessui/react";
 import MessageTemplate from "./MessageTemplate";
 import {
   getMessagesQuery,
+  MESSAGES_PAGE_SIZE,
   useGenerateConversationTitle,
   useGetConnections,
-  useGetConversations,
+  useGetConversation,
+  useLoadEarlierMessages,
   useSendMessageStreaming,
 } from "@/hooks";
 import { Spinner } from "../Spinner/Spinner";
@@ -36,7 +38,9 @@ export const Conversation = () => {
   const params = useParams({ from: "/_app/chat/$conversationId" });
   // Load messages from conversation via API on load
   const { data: connectionsData } = useGetConnections();
-  const { data: conversationsData } = useGetConversations();
+  const { data: currConversation } = useGetConversation(
+    params.conversationId
+  );
 
   const [streamedResults, setStreamedResults] = useState<IResultType[]>([]);
   const {
@@ -47,9 +51,32 @@ export const Conversation = () => {
   } = useQuery(
     getMessagesQuery({ conversationId: params.conversationId ?? "" })
   );
-  const currConversation = conversationsData?.find(
-    (conv) => conv.id === params.conversationId
-  );
+  const { mutate: loadEarlierMessages, isPending: isLoadingEarlierMessages } =
+    useLoadEarlierMessages();
+  // Whether the last page of earlier messages loaded was full, per conversation
+  const [earlierMessagesLoaded, setEarlierMessagesLoaded] = useState<{
+    conversationId: string;
+    hasMore: boolean;
+  } | null>(null);
+  const hasEarlierMessages =
+    earlierMessagesLoaded?.conversationId === params.conversationId
+      ? earlierMessagesLoaded.hasMore
+      : (messages?.length ?? 0) >= MESSAGES_PAGE_SIZE;
+  const handleLoadEarlierMessages = () => {
+    const before = messages?.[0]?.message.id;
+    if (!params.conversationId || !before) return;
+    const conversationId = params.conversationId;
+    loadEarlierMessages(
+      { conversationId, before },
+      {
+        onSuccess: (earlierMessages) =>
+          setEarlierMessagesLoaded({
+            conversationId,
+            hasMore: (earlierMessages?.length ?? 0) >= MESSAGES_PAGE_SIZE,
+          }),
+      }
+    );
+  };
   const { mutate: generateConversationTitle } = useGenerateConversationTitle();
   const {
     mutate: sendMessageMutation,
@@ -156,6 +183,19 @@ export const Conversation = () => {
         appear={true}
       >
         <div className="overflow-y-auto pb-36 bg-gray-900">
+          {hasEarlierMessages && (
+            <div className="flex justify-center py-4">
+              <button
+                onClick={handleLoadEarlierMessages}
+                disabled={isLoadingEarlierMessages}
+                className="text-sm text-gray-300 hover:text-white disabled:opacity-50"
+              >
+                {isLoadingEarlierMessages
+                  ? "Loading..."
+                  : "Load earlier messages"}
+              </button>
+            </div>
+          )}
           {messages.map((message) => (
             <Message
               key={(params.conversationId as string) + message.message.id}
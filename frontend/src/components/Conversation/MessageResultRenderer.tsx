@@ -255,6 +255,7 @@ export const MessageResultRenderer = ({
                   data={result.content}
                   initialCreatedAt={new Date(result.created_at as string)}
                   linked_id={result.linked_id}
+                  result_id={result.result_id}
                 />
               )) ||
               (result.type === "SQL_QUERY_STRING_RESULT" && (
@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from "react";
+import { useCallback, useEffect, useMemo, useRef, useState } from "react";
 import {
   Dialog,
   DialogPanel,
@@ -21,13 +21,14 @@ import { useNavigate } from "@tanstack/react-router";
 import {
   useDeleteConversation,
   useGetConnections,
+  useGetConversation,
   useGetConversations,
   useUpdateConversation,
 } from "@/hooks";
 import {
   IConversation,
   IConnection,
-  IConversationWithMessagesWithResultsOut,
+  IConversationSummary,
 } from "@components/Library/types";
 
 const LShapedChar = (
@@ -50,11 +51,45 @@ function classNames(...classes: string[]) {
   return classes.filter(Boolean).join(" ");
 }
 
+/** Calls onVisible when scrolled into view, placed at the end of a list to load its next page */
+const LoadMore = ({ onVisible }: { onVisible: () => void }) => {
+  const ref = useRef<HTMLLIElement>(null);
+
+  useEffect(() => {
+    const element = ref.current;
+    if (!element) return;
+    // Also called once when observing starts, ex. when the list is shorter than its container
+    const observer = new IntersectionObserver((entries) => {
+      if (entries.some((entry) => entry.isIntersecting)) {
+        onVisible();
+      }
+    });
+    observer.observe(element);
+    return () => observer.disconnect();
+  }, [onVisible]);
+
+  return <li ref={ref} aria-hidden="true" className="h-px" />;
+};
+
 export const Sidebar = () => {
   const params = useParams({ strict: false });
   const [sidebarOpen, setSidebarOpen] = useState(false);
-  const { data: conversationsData } = useGetConversations();
+  const {
+    data: conversationsData,
+    hasNextPage,
+    isFetchingNextPage,
+    fetchNextPage,
+  } = useGetConversations();
   const { data: connectionsData } = useGetConnections();
+  // Not necessarily in the pages loaded so far
+  const { data: selectedConversation } = useGetConversation(
+    params.conversationId
+  );
+  const loadMoreConversations = useCallback(() => {
+    if (hasNextPage && !isFetchingNextPage) {
+      fetchNextPage();
+    }
+  }, [hasNextPage, isFetchingNextPage, fetchNextPage]);
   const { mutate: deleteConversation } = useDeleteConversation({
     onSuccess() {
       navigate({ to: "/" });
@@ -62,7 +97,7 @@ export const Sidebar = () => {
   });
 
   const conversations = useMemo<
-    (IConversationWithMessagesWithResultsOut & {
+    (IConversationSummary & {
       connection?: IConnection;
     })[]
   >(() => {
@@ -120,26 +155,21 @@ export const Sidebar = () => {
 
   useEffect(() => {
     // TODO - revist this logic
-    // Update current conversation when we get the list of conversations
-    if (conversations.length > 0) {
-      if (params.conversationId) {
-        const conversation = conversations.find(
-          (c) => c.id === params.conversationId
-        );
-        if (conversation) {
-          setCurrentConversation({
-            id: conversation.id,
-            name: conversation.name,
-          });
+    // Update current conversation when it is loaded
+    if (params.conversationId) {
+      if (selectedConversation?.id === params.conversationId) {
+        setCurrentConversation({
+          id: selectedConversation.id,
+          name: selectedConversation.name,
+        });
 
-          // Update edited name when conversation changes
-          setEditedName(conversation.name || "");
-        }
-      } else {
-        setCurrentConversation(null);
+        // Update edited name when conversation changes
+        setEditedName(selectedConversation.name || "");
       }
+    } else {
+      setCurrentConversation(null);
     }
-  }, [conversations, params]);
+  }, [selectedConversation, params]);
 
   const handleCancelEdit = () => {
     setIsEditing(false);
@@ -264,6 +294,9 @@ export const Sidebar = () => {
                               </Link>
                             </li>
                           ))}
+                          {hasNextPage && (
+                            <LoadMore onVisible={loadMoreConversations} />
+                          )}
                         </ul>
                       </li>
 
@@ -412,6 +445,7 @@ export const Sidebar = () => {
                   )}
                 </li>
               ))}
+              {hasNextPage && <LoadMore onVisible={loadMoreConversations} />}
             </ul>
           </div>
           {/* Section for saved queries and dashboards */}
@@ -13,21 +13,47 @@ import {
   ArrowsPointingOutIcon,
   MinusIcon,
   ArrowDownTrayIcon,
+  TableCellsIcon,
 } from "@heroicons/react/24/outline";
 import Minimizer from "../Minimizer/Minimizer";
-import { useExportData } from "@/hooks/messages";
+import { useExportData, useLoadResultRows } from "@/hooks/messages";
 
 // TODO: Remove after defining this better on backend
 export const DynamicTable: React.FC<{
-  // eslint-disable-next-line @typescript-eslint/no-explicit-any
-  data: { columns: string[]; rows: any[][] };
+  data: {
+    columns: string[];
+    // eslint-disable-next-line @typescript-eslint/no-explicit-any
+    rows: any[][];
+    total_rows?: number;
+    next_cursor?: string;
+  };
   initialCreatedAt?: Date;
   minimize?: boolean;
   linked_id?: string;
-}> = ({ data, minimize, linked_id }) => {
+  result_id?: string;
+}> = ({ data, minimize, linked_id, result_id }) => {
   const [minimized, setMinimized] = useState(minimize || false);
   const [limitedView, setLimitedView] = useState(true);
   const { mutate: exportData } = useExportData();
+  // Large stored results come with their first page only
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  const [loadedRows, setLoadedRows] = useState<any[][]>([]);
+  const [cursor, setCursor] = useState(data.next_cursor);
+  const { mutate: loadRows, isPending: isLoadingRows } = useLoadResultRows();
+  const rows = loadedRows.length ? data.rows.concat(loadedRows) : data.rows;
+
+  const handleLoadMore = () => {
+    if (!result_id || !cursor) return;
+    loadRows(
+      { resultId: result_id, cursor },
+      {
+        onSuccess(page) {
+          setLoadedRows((previous) => previous.concat(page.rows));
+          setCursor(page.next_cursor ?? undefined);
+        },
+      }
+    );
+  };
 
   const handleExpand = () => {
     if (minimized) setMinimized(false);
@@ -47,7 +73,7 @@ export const DynamicTable: React.FC<{
           bleed
           striped
           dense
-          maxRows={limitedView ? 5 : data.rows.length + 10}
+          maxRows={limitedView ? 5 : rows.length + 10}
           className="ml-0 mr-0 [--gutter:theme(spacing.6)]"
         >
           <TableHead>
@@ -58,7 +84,7 @@ export const DynamicTable: React.FC<{
             </TableRow>
           </TableHead>
           <TableBody>
-            {data.rows.map((row: string[] | number[], index: number) => {
+            {rows.map((row: string[] | number[], index: number) => {
               return (
                 <TableRow key={index}>
                   {row.map((item: string | number, cellIndex: number) => (
@@ -72,6 +98,20 @@ export const DynamicTable: React.FC<{
           </TableBody>
         </Table>
 
+        {!limitedView && cursor && result_id && (
+          <div className="flex justify-center py-2">
+            <button
+              onClick={handleLoadMore}
+              disabled={isLoadingRows}
+              className="text-sm text-gray-300 hover:text-white disabled:opacity-50"
+            >
+              {isLoadingRows
+                ? "Loading..."
+                : `Load more rows (${rows.length} of ${data.total_rows})`}
+            </button>
+          </div>
+        )}
+
         <div className="absolute bottom-0 right-0 m-2 flex gap-1">
           {/* Minimize Icon */}
           <CustomTooltip hoverText="Minimize">
@@ -87,7 +127,7 @@ export const DynamicTable: React.FC<{
               <MinusIcon className="w-6 h-6 [&>path]:stroke-[2]" />
             </button>
           </CustomTooltip>
-          {data.rows.length > 4 && // 4 data rows + 1 header (columns) row
+          {rows.length > 4 && // 4 data rows + 1 header (columns) row
             (limitedView ? (
               /* Expand Icon */
               <CustomTooltip hoverText="Expand">
@@ -107,17 +147,30 @@ export const DynamicTable: React.FC<{
                 </button>
               </CustomTooltip>
             ))}
-          {data.rows.length > 1 && linked_id && (
+          {rows.length > 1 && linked_id && (
             <CustomTooltip hoverText="Export">
               <button
                 tabIndex={-1}
-                onClick={() => exportData(linked_id)}
+                onClick={() => exportData({ linkedId: linked_id })}
                 className="p-1"
               >
                 <ArrowDownTrayIcon className="w-6 h-6 [&>path]:stroke-[2]" />
               </button>
             </CustomTooltip>
           )}
+          {rows.length > 1 && linked_id && (
+            <CustomTooltip hoverText="Export to Excel">
+              <button
+                tabIndex={-1}
+                onClick={() =>
+                  exportData({ linkedId: linked_id, format: "xlsx" })
+                }
+                className="p-1"
+              >
+                <TableCellsIcon className="w-6 h-6 [&>path]:stroke-[2]" />
+              </button>
+            </CustomTooltip>
+          )}
         </div>
       </div>
     </Minimizer>
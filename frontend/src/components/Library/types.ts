@@ -65,6 +65,10 @@ export interface ISQLQueryRunResult extends IResult {
     columns: string[];
     // eslint-disable-next-line @typescript-eslint/no-explicit-any
     rows: any[][];
+    has_more?: boolean;
+    // Set when only the first page of rows was sent, see api.getResultRows
+    total_rows?: number;
+    next_cursor?: string;
   };
 }
 
@@ -102,6 +106,17 @@ export interface IConversationWithMessagesWithResultsOut {
   messages: IMessageWithResultsOut[];
 }
 
+export interface IConversationSummary {
+  id: string;
+  connection_id: string;
+  name: string;
+  created_at: string;
+  message_count: number;
+  last_message_at: string | null;
+  last_message_role: "ai" | "human" | null;
+  last_message_preview: string | null;
+}
+
 export interface IConversation {
   id: string;
   name: string;
@@ -116,6 +131,8 @@ export interface IConnectionOptions {
       enabled: boolean;
     }[];
   }[];
+  // Seconds before queries are aborted, null uses the server default and 0 disables it
+  statement_timeout?: number | null;
 }
 
 export interface IConnection {
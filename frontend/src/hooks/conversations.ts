@@ -2,6 +2,7 @@ import { enqueueSnackbar } from "notistack";
 import { ConversationCreationResult, api } from "@/api";
 import {
   MutationOptions,
+  useInfiniteQuery,
   useMutation,
   useQuery,
   useQueryClient,
@@ -16,9 +17,14 @@ export const CONVERSATIONS_QUERY_KEY = ["CONVERSATIONS"];
 
 export function useGetConversations() {
   const { isSuccess } = useQuery(getBackendStatusQuery());
-  const result = useQuery({
+  const result = useInfiniteQuery({
     queryKey: CONVERSATIONS_QUERY_KEY,
-    queryFn: async () => (await api.listConversations()).data,
+    // Only names and last messages, the next page is fetched when the list is scrolled to its end
+    queryFn: async ({ pageParam }) =>
+      (await api.listConversationSummaries(pageParam)).data,
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
+    select: (data) => data.pages.flatMap((page) => page.conversations),
     enabled: isSuccess,
   });
   const isError = result.isError;
@@ -35,6 +41,18 @@ export function useGetConversations() {
   return result;
 }
 
+/**
+ * Get a conversation by id, it may not be in the pages of conversations loaded so far
+ */
+export function useGetConversation(id?: string) {
+  const { isSuccess } = useQuery(getBackendStatusQuery());
+  return useQuery({
+    queryKey: [...CONVERSATIONS_QUERY_KEY, { id }],
+    queryFn: async () => (await api.getConversation(id ?? "")).data,
+    enabled: isSuccess && Boolean(id),
+  });
+}
+
 export function useCreateConversation(
   options: MutationOptions<
     ConversationCreationResult,
@@ -129,10 +147,7 @@ export function useGenerateConversationTitle(options = {}) {
 export function useGetRelatedConnection() {
   const params = useParams({ from: "/_app/chat/$conversationId" });
   const { data: connectionsData } = useGetConnections();
-  const { data: conversationsData } = useGetConversations();
-  const currConversation = conversationsData?.find(
-    (conv) => conv.id === params.conversationId
-  );
+  const { data: currConversation } = useGetConversation(params.conversationId);
   return connectionsData?.connections?.find(
     (conn) => conn.id === currConversation?.connection_id
   );
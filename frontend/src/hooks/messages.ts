@@ -1,4 +1,4 @@
-import { api, RefreshChartResult } from "@/api";
+import { api, ExportFormat, RefreshChartResult } from "@/api";
 import {
   IMessageOut,
   IMessageWithResultsOut,
@@ -21,7 +21,9 @@ import { useParams } from "@tanstack/react-router";
 
 const MESSAGES_QUERY_KEY = ["MESSAGES"];
 
-// Load everything
+// Messages loaded when opening a conversation, earlier ones are loaded on demand
+export const MESSAGES_PAGE_SIZE = 50;
+
 export function getMessagesQuery({
   conversationId,
 }: {
@@ -29,7 +31,34 @@ export function getMessagesQuery({
 }) {
   return queryOptions({
     queryKey: [...MESSAGES_QUERY_KEY, conversationId],
-    queryFn: async () => (await api.getMessages(conversationId)).data,
+    queryFn: async () =>
+      (await api.getMessages(conversationId, MESSAGES_PAGE_SIZE)).data,
+  });
+}
+
+export function useLoadEarlierMessages() {
+  const queryClient = useQueryClient();
+  return useMutation({
+    mutationFn: async ({
+      conversationId,
+      before,
+    }: {
+      conversationId: string;
+      before: string;
+    }) =>
+      (await api.getMessages(conversationId, MESSAGES_PAGE_SIZE, before)).data,
+    onSuccess(earlierMessages, variables) {
+      queryClient.setQueryData(
+        getMessagesQuery({ conversationId: variables.conversationId }).queryKey,
+        (oldData) => [...(earlierMessages ?? []), ...(oldData ?? [])]
+      );
+    },
+    onError() {
+      enqueueSnackbar({
+        variant: "error",
+        message: "Error loading earlier messages. Please try again.",
+      });
+    },
   });
 }
 
@@ -307,9 +336,33 @@ export function useRefreshChartData(
   });
 }
 
+export function useLoadResultRows() {
+  return useMutation({
+    mutationFn: async ({
+      resultId,
+      cursor,
+    }: {
+      resultId: string;
+      cursor: string;
+    }) => (await api.getResultRows(resultId, cursor)).data,
+    onError() {
+      enqueueSnackbar({
+        variant: "error",
+        message: "Error loading more rows. Please try again.",
+      });
+    },
+  });
+}
+
 export function useExportData() {
   return useMutation({
-    mutationFn: async (linkedId: string) => api.getExportDataUrl(linkedId),
+    mutationFn: async ({
+      linkedId,
+      format,
+    }: {
+      linkedId: string;
+      format?: ExportFormat;
+    }) => api.getExportDataUrl(linkedId, format),
     onSuccess(exportUrl) {
       // Create a hidden anchor element
       const a = document.createElement("a");